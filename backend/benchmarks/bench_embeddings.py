@@ -0,0 +1,88 @@
+"""Benchmark: embedding backends (sentence-transformers vs the ONNX bundle, float32 and int8)
+
+Each backend runs in a fresh worker process and reports its cold start (imports
+plus model load), single-query latency, batch throughput over the fixture texts
+and peak RSS. The embedding cache is bypassed so every call reaches the model.
+
+Usage (from backend/):
+    python benchmarks/bench_embeddings.py --bundle src/artifacts/embedding_bundle
+    python benchmarks/bench_embeddings.py --bundle /tmp/bundle --model /path/to/model --skip-st
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def run_backend(backend: str, model_name: str, bundle: Optional[str], queries: int, threads: Optional[int]) -> Dict:
+    start = time.perf_counter()
+    if backend == "sentence_transformers":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name, device="cpu")
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+    else:
+        from utils_app.onnx_embedder import OnnxEmbedder
+        model = OnnxEmbedder(bundle, quantized=backend == "onnx-int8", threads=threads)
+    model.encode("warm up")
+    cold_start = time.perf_counter() - start
+
+    from utils_app.export_embedding_bundle import load_fixture_texts
+    texts = load_fixture_texts()
+    latencies = []
+    for i in range(queries):
+        text = texts[i % len(texts)]
+        t = time.perf_counter()
+        model.encode(text)
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+
+    batch = texts * max(1, 512 // len(texts))
+    t = time.perf_counter()
+    model.encode(batch)
+    throughput = len(batch) / (time.perf_counter() - t)
+    return {
+        "cold_start": cold_start,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "throughput": throughput,
+        "peak_rss": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="sentence-transformers model the bundle came from")
+    parser.add_argument("--bundle", help="Exported bundle directory (see utils_app/export_embedding_bundle.py)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, help="Intra-op threads for every backend")
+    parser.add_argument("--skip-st", action="store_true", help="Skip the sentence-transformers baseline")
+    args = parser.parse_args()
+
+    backends = [] if args.skip_st else ["sentence_transformers"]
+    if args.bundle:
+        backends += ["onnx-float32", "onnx-int8"]
+
+    print(f"{'backend':<24} {'cold start s':>12} {'p50 ms':>8} {'p95 ms':>8} {'texts/sec':>10} {'peak RSS MB':>12}")
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            r = executor.submit(run_backend, backend, args.model, args.bundle, args.queries, args.threads).result()
+        print(
+            f"{backend:<24} {r['cold_start']:>12.2f} {r['p50'] * 1000:>8.2f} {r['p95'] * 1000:>8.2f} "
+            f"{r['throughput']:>10,.0f} {r['peak_rss']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
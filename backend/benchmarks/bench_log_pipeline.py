@@ -0,0 +1,193 @@
+"""Benchmark: fetch_and_analyze_logs end to end against a fake Loki, and log_analytics/utils.py
+
+Synthetic logs are generated with loggen.py and served by fake_loki.py in its own
+process. Every case runs in a fresh worker process, so the peak RSS reported is that
+case's alone (including any analysis pool it starts). Tool runs clear the report cache
+before each call and disable rolling state and metric queries, so every call fetches
+and analyses the full window. The fake server shares the machine, so its time to
+filter and serialise pages is part of the measured latency.
+
+Usage (from backend/):
+    python benchmarks/bench_log_pipeline.py --lines 200000 --windows "last 15 minutes,last 1 hour"
+    python benchmarks/bench_log_pipeline.py --data /tmp/synthetic-logs --skip-utils
+"""
+import argparse
+import asyncio
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("ADK_SUPPRESS_GEMINI_LITELLM_WARNINGS", "true")
+
+import loggen  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process or its largest child, in MB."""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak / 1024  # ru_maxrss is in KB on Linux
+
+
+def best_of(fn: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# --- Cases, each run in a fresh process ---
+
+class _ToolContext:
+    """Stands in for ADK's ToolContext so the tool stores its structured result."""
+
+    def __init__(self):
+        self.state: Dict = {}
+
+
+def run_tool_case(loki_url: str, window: str, repeat: int) -> Dict:
+    from core.config import config
+    config.loki.url = loki_url
+    config.loki.metric_queries = False
+    config.log_analysis.rolling_enabled = False
+
+    from agents.sub_agents.log_analytics.cache import get_report_cache
+    from agents.sub_agents.log_analytics.results import load_analysis
+    from agents.sub_agents.log_analytics.tools import fetch_and_analyze_logs
+
+    async def run() -> Dict:
+        latencies = []
+        context = _ToolContext()
+        for _ in range(repeat):
+            get_report_cache().clear()
+            start = time.perf_counter()
+            await fetch_and_analyze_logs(window, tool_context=context)
+            latencies.append(time.perf_counter() - start)
+        result = load_analysis(context.state)
+        return {"latencies": sorted(latencies), "lines": result["total_logs"] if result else 0}
+
+    setup_rss = peak_rss_mb()
+    result = asyncio.run(run())
+    result.update(setup_rss=setup_rss, peak_rss=peak_rss_mb())
+    return result
+
+
+def run_utils_case(name: str, lines: int, repeat: int, generator_args: Dict) -> Dict:
+    from agents.sub_agents.log_analytics import utils
+    from agents.sub_agents.log_analytics.batch import LogBatch
+
+    entries = [
+        {"timestamp": str(int(ts * 1e9)), "line": loggen.format_line(ts, host, message), "labels": {"hostname": host}}
+        for ts, host, message in loggen.generate(lines, **generator_args)
+    ]
+    batch = LogBatch.from_entries(entries)
+    patterns = utils.extract_error_patterns(batch)
+    calls = {
+        "parse_time_range": lambda: utils.parse_time_range("last 15 minutes"),
+        "build_loki_query": lambda: utils.build_loki_query(),
+        "as_log_batch": lambda: utils.as_log_batch(entries),
+        "extract_error_patterns": lambda: utils.extract_error_patterns(batch),
+        "calculate_anomaly_score": lambda: utils.calculate_anomaly_score(batch, patterns),
+        "extract_ip_addresses": lambda: utils.extract_ip_addresses(batch),
+        "get_top_error_sources": lambda: utils.get_top_error_sources(batch),
+        "count_error_sources": lambda: utils.count_error_sources(batch),
+    }
+    # Functions that do not scan the logs are timed per call over many calls
+    per_call = name in ("parse_time_range", "build_loki_query", "calculate_anomaly_score")
+    setup_rss = peak_rss_mb()
+    if per_call:
+        n = 10000
+        elapsed = best_of(lambda: [calls[name]() for _ in range(n)], repeat) / n
+    else:
+        elapsed = best_of(calls[name], repeat)
+    return {"elapsed": elapsed, "per_call": per_call, "lines": len(batch), "setup_rss": setup_rss, "peak_rss": peak_rss_mb()}
+
+
+def in_fresh_process(fn: Callable, *args) -> Dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(fn, *args).result()
+
+
+# --- Driver ---
+
+def start_fake_loki(data_dir: str) -> Tuple[subprocess.Popen, str]:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "fake_loki.py"), "--dir", data_dir, "--port", "0"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    banner = process.stdout.readline()
+    match = re.search(r"(http://\S+)", banner)
+    if not match:
+        process.kill()
+        raise RuntimeError(f"fake Loki did not start: {banner!r}")
+    print(banner.strip())
+    return process, match.group(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="Existing directory of log files (generated if omitted)")
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--duration", type=int, default=3600, help="Seconds covered by generated logs")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--mix", help="Error category weights, e.g. authentication_failure=5,database_error=1")
+    parser.add_argument("--ips", type=int, default=10000)
+    parser.add_argument("--windows", default="last 15 minutes,last 1 hour")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-tool", action="store_true")
+    parser.add_argument("--skip-utils", action="store_true")
+    args = parser.parse_args()
+
+    generator_args = dict(
+        hosts=args.hosts, duration_seconds=args.duration, error_rate=args.error_rate,
+        mix=loggen.parse_mix(args.mix), ips=args.ips,
+    )
+
+    if not args.skip_tool:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = args.data
+            if data_dir is None:
+                data_dir = tmp
+                loggen.write_files(data_dir, loggen.generate(args.lines, **generator_args))
+            process, url = start_fake_loki(data_dir)
+            try:
+                print(f"\n{'fetch_and_analyze_logs':<32} {'lines':>9} {'lines/sec':>12} {'p50 ms':>9} {'max ms':>9} {'peak RSS MB':>12}")
+                for window in (w.strip() for w in args.windows.split(",")):
+                    r = in_fresh_process(run_tool_case, url, window, args.repeat)
+                    p50 = r["latencies"][len(r["latencies"]) // 2]
+                    print(
+                        f"{window:<32} {r['lines']:>9} {r['lines'] / p50:>12,.0f} {p50 * 1000:>9.1f} "
+                        f"{r['latencies'][-1] * 1000:>9.1f} {r['peak_rss']:>12.1f}"
+                    )
+            finally:
+                process.kill()
+                process.wait()
+
+    if not args.skip_utils:
+        names = [
+            "parse_time_range", "build_loki_query", "as_log_batch", "extract_error_patterns",
+            "calculate_anomaly_score", "extract_ip_addresses", "get_top_error_sources", "count_error_sources",
+        ]
+        print(f"\n{'utils.py (' + str(args.lines) + ' lines)':<32} {'throughput':>22} {'peak RSS MB':>12} {'+ over setup':>13}")
+        for name in names:
+            r = in_fresh_process(run_utils_case, name, args.lines, args.repeat, generator_args)
+            throughput = f"{1 / r['elapsed']:,.0f} calls/sec" if r["per_call"] else f"{r['lines'] / r['elapsed']:,.0f} lines/sec"
+            print(f"{name:<32} {throughput:>22} {r['peak_rss']:>12.1f} {r['peak_rss'] - r['setup_rss']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
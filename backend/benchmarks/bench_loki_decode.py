@@ -0,0 +1,106 @@
+"""Benchmark: whole-body JSON decoding vs streaming decode of Loki query_range pages
+
+Usage (from backend/):
+    python benchmarks/bench_loki_decode.py --lines 200000 --streams 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("ADK_SUPPRESS_GEMINI_LITELLM_WARNINGS", "true")
+
+from agents.sub_agents.log_analytics.batch import LogBatchBuilder  # noqa: E402
+from agents.sub_agents.log_analytics.loki_json import QueryRangeDecoder, orjson  # noqa: E402
+
+
+def generate_body(lines: int, streams: int, seed: int = 7) -> bytes:
+    """A query_range response body shaped like Loki's, with syslog-style lines."""
+    rnd = random.Random(seed)
+    result = []
+    for s in range(streams):
+        ts = 1_700_000_000_000_000_000 + s
+        values = []
+        for _ in range(lines // streams):
+            ts += rnd.randint(1_000, 50_000_000)
+            values.append([str(ts), (
+                f"sshd[{rnd.randint(100, 65000)}]: Failed password for invalid user admin "
+                f"from 10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)} "
+                f"port {rnd.randint(1024, 65535)} ssh2 \"quoted\" \\path"
+            )])
+        result.append({"stream": {"job": "varlogs", "host": f"host{s}", "filename": "/var/log/auth.log"}, "values": values})
+    body = {"status": "success", "data": {"resultType": "streams", "result": result, "stats": {"summary": {"execTime": 0.1}}}}
+    return json.dumps(body).encode()
+
+
+def decode_whole(body: bytes, loads) -> LogBatchBuilder:
+    """The pre-streaming path: decode the full body, then copy streams into a builder."""
+    builder = LogBatchBuilder()
+    for stream in loads(body)["data"]["result"]:
+        builder.add_stream(stream["stream"], stream["values"])
+    return builder
+
+
+def decode_streaming(body: bytes, chunk_bytes: int) -> LogBatchBuilder:
+    builder = LogBatchBuilder()
+    decoder = QueryRangeDecoder(builder)
+    for offset in range(0, len(body), chunk_bytes):
+        decoder.feed(body[offset:offset + chunk_bytes])
+    decoder.close()
+    return builder
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_bytes(fn) -> int:
+    """Peak traced allocation while fn runs (the body itself is allocated beforehand)."""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--chunk-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    body = generate_body(args.lines, args.streams)
+    expected = decode_whole(body, json.loads).build()
+    streamed = decode_streaming(body, args.chunk_bytes).build()
+    assert streamed.lines() == expected.lines(), "streamed lines diverged"
+    assert (streamed.timestamps == expected.timestamps).all(), "streamed timestamps diverged"
+
+    candidates = [("json.loads (before)", lambda: decode_whole(body, json.loads))]
+    if orjson is not None:
+        candidates.append(("orjson.loads", lambda: decode_whole(body, orjson.loads)))
+    candidates.append((f"streaming {args.chunk_bytes // 1024}KB", lambda: decode_streaming(body, args.chunk_bytes)))
+
+    lines = len(expected)
+    print(f"lines:  {lines}")
+    print(f"body:   {len(body) / 2**20:.1f} MB")
+    for name, fn in candidates:
+        elapsed = best_of(fn, args.repeat)
+        # Whole-body decoders also need the full body in memory; the streaming one only a chunk
+        held = args.chunk_bytes if name.startswith("streaming") else len(body)
+        peak = peak_bytes(fn) + held
+        print(f"{name:<20} {lines / elapsed:>12,.0f} lines/sec  peak {peak / 2**20:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Minimal fake Loki HTTP server serving log files, for benchmarks
+
+Serves /loki/api/v1/query_range, /labels, /label/<name>/values and /series from a
+directory of log files (e.g. written by loggen.py). Each file is one stream labelled
+{job, hostname=<file stem>, filename}. Stream selectors and the |=, !=, |~ and !~
+line filters are supported; metric queries are not (/query answers 400, so the
+analytics tools fall back to raw lines). By default timestamps are shifted so the
+newest line is "now", letting "last N minutes" windows hit the data.
+
+Usage (from backend/):
+    python benchmarks/fake_loki.py --dir /tmp/synthetic-logs --port 3100
+"""
+import argparse
+import bisect
+import calendar
+import heapq
+import itertools
+import json
+import os
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_ISO = re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,9}))?')
+_SYSLOG = re.compile(r'([A-Z][a-z]{2}) {1,2}(\d{1,2}) (\d{2}):(\d{2}):(\d{2})')
+_MONTHS = {name: i for i, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+_STRING = r'"(?:[^"\\]|\\.)*"|`[^`]*`'
+_MATCHER = re.compile(rf'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*(=~|!~|!=|=)\s*({_STRING})\s*,?')
+_FILTER = re.compile(rf'\s*(\|=|!=|\|~|!~)\s*({_STRING})')
+
+
+def _timestamp_ns(line: str, year: int) -> Optional[int]:
+    match = _ISO.match(line)
+    if match:
+        fields = [int(group) for group in match.groups()[:6]]
+        fraction = (match.group(7) or '').ljust(9, '0')
+        return calendar.timegm(tuple(fields)) * 1_000_000_000 + int(fraction)
+    match = _SYSLOG.match(line)
+    if match and match.group(1) in _MONTHS:
+        fields = [year, _MONTHS[match.group(1)]] + [int(group) for group in match.groups()[1:]]
+        return calendar.timegm(tuple(fields)) * 1_000_000_000
+    return None
+
+
+def _unquote(text: str) -> str:
+    return text[1:-1] if text.startswith('`') else json.loads(text)
+
+
+def _regex(pattern: str) -> re.Pattern:
+    # RE2 and Python agree on the syntax LogQL queries here use
+    return re.compile(pattern)
+
+
+def parse_query(query: str) -> Tuple[Callable[[Dict], bool], Callable[[str], bool]]:
+    """
+    Parse a LogQL log query into a stream predicate and a line predicate.
+
+    Raises:
+        ValueError: for anything beyond a selector followed by line filters
+    """
+    query = query.strip()
+    if not query.startswith('{') or '}' not in query:
+        raise ValueError(f"unsupported query: {query}")
+    selector, pipeline = query[1:].split('}', 1)
+
+    matchers = []
+    pos = 0
+    while pos < len(selector.strip()):
+        match = _MATCHER.match(selector, pos)
+        if not match:
+            raise ValueError(f"unsupported selector: {{{selector}}}")
+        name, op, value = match.group(1), match.group(2), _unquote(match.group(3))
+        if op in ('=~', '!~'):
+            regex = _regex(value)
+            matchers.append((name, lambda v, r=regex, neg=op == '!~': bool(r.fullmatch(v)) != neg))
+        else:
+            matchers.append((name, lambda v, x=value, neg=op == '!=': (v == x) != neg))
+        pos = match.end()
+
+    filters = []
+    pos = 0
+    while pos < len(pipeline.strip()):
+        match = _FILTER.match(pipeline, pos)
+        if not match:
+            raise ValueError(f"unsupported pipeline: {pipeline}")
+        op, value = match.group(1), _unquote(match.group(2))
+        if op in ('|=', '!='):
+            filters.append(lambda line, x=value, neg=op == '!=': (x in line) != neg)
+        else:
+            regex = _regex(value)
+            filters.append(lambda line, r=regex, neg=op == '!~': bool(r.search(line)) != neg)
+        pos = match.end()
+
+    def stream_matches(labels: Dict) -> bool:
+        return all(check(labels.get(name, '')) for name, check in matchers)
+
+    def line_matches(line: str) -> bool:
+        return all(check(line) for check in filters)
+
+    return stream_matches, line_matches
+
+
+class Stream:
+    def __init__(self, labels: Dict[str, str], timestamps: List[int], lines: List[str]):
+        self.labels = labels
+        self.timestamps = timestamps
+        self.lines = lines
+
+    def entries(self, start: int, end: int, line_matches: Callable[[str], bool], backward: bool):
+        lo = bisect.bisect_left(self.timestamps, start)
+        hi = bisect.bisect_left(self.timestamps, end)
+        indexes = range(hi - 1, lo - 1, -1) if backward else range(lo, hi)
+        for i in indexes:
+            if line_matches(self.lines[i]):
+                yield self.timestamps[i], i, self
+
+
+class FakeLoki:
+    """In-memory streams loaded from a directory of log files."""
+
+    def __init__(self, directory: str, job: str = "varlogs", shift_to_now: bool = True):
+        self.streams: List[Stream] = []
+        year = time.gmtime().tm_year
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                continue
+            timestamps, lines = [], []
+            last = 0
+            with open(path, errors='replace') as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    ts = _timestamp_ns(line, year)
+                    # Lines without a timestamp (or out of order) inherit the previous one
+                    last = ts if ts is not None and ts >= last else last
+                    timestamps.append(last)
+                    lines.append(line)
+            labels = {"job": job, "hostname": os.path.splitext(name)[0], "filename": path}
+            self.streams.append(Stream(labels, timestamps, lines))
+
+        newest = max((s.timestamps[-1] for s in self.streams if s.timestamps), default=0)
+        if shift_to_now and newest:
+            offset = time.time_ns() - newest
+            for stream in self.streams:
+                stream.timestamps = [ts + offset for ts in stream.timestamps]
+
+    @property
+    def total_lines(self) -> int:
+        return sum(len(s.lines) for s in self.streams)
+
+    def query_range(self, query: str, start: int, end: int, limit: int, direction: str) -> Dict:
+        stream_matches, line_matches = parse_query(query)
+        backward = direction == "backward"
+        selected = [
+            s.entries(start, end, line_matches, backward) for s in self.streams if stream_matches(s.labels)
+        ]
+        merged = heapq.merge(*selected, key=lambda e: e[0], reverse=backward)
+        result: Dict[int, Dict] = {}
+        for ts, i, stream in itertools.islice(merged, limit):
+            entry = result.setdefault(id(stream), {"stream": stream.labels, "values": []})
+            entry["values"].append([str(ts), stream.lines[i]])
+        return {"status": "success", "data": {"resultType": "streams", "result": list(result.values())}}
+
+    def series(self, selector: str) -> List[Dict]:
+        stream_matches, _ = parse_query(selector)
+        return [s.labels for s in self.streams if stream_matches(s.labels)]
+
+    def label_values(self, name: str) -> List[str]:
+        return sorted({s.labels[name] for s in self.streams if name in s.labels})
+
+    def labels(self) -> List[str]:
+        return sorted({name for s in self.streams for name in s.labels})
+
+
+def make_handler(loki: FakeLoki):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: Dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            path = url.path
+            try:
+                if path == "/loki/api/v1/query_range":
+                    body = loki.query_range(
+                        params["query"], int(params.get("start", 0)), int(params.get("end", time.time_ns())),
+                        int(params.get("limit", 100)), params.get("direction", "backward"),
+                    )
+                elif path == "/loki/api/v1/labels":
+                    body = {"status": "success", "data": loki.labels()}
+                elif path.startswith("/loki/api/v1/label/") and path.endswith("/values"):
+                    body = {"status": "success", "data": loki.label_values(path.split("/")[-2])}
+                elif path == "/loki/api/v1/series":
+                    body = {"status": "success", "data": loki.series(params["match[]"])}
+                elif path == "/ready":
+                    body = {"status": "success"}
+                else:
+                    self._send(400, {"status": "error", "error": f"{path} is not supported by the fake server"})
+                    return
+            except (KeyError, ValueError, re.error) as e:
+                self._send(400, {"status": "error", "error": str(e)})
+                return
+            self._send(200, body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", required=True, help="Directory of log files, one stream per file")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--job", default="varlogs")
+    parser.add_argument("--no-shift", action="store_true", help="Serve the files' own timestamps")
+    args = parser.parse_args()
+
+    loki = FakeLoki(args.dir, job=args.job, shift_to_now=not args.no_shift)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(loki))
+    print(f"Serving {loki.total_lines} lines from {len(loki.streams)} streams on http://127.0.0.1:{server.server_port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Synthetic syslog/auth-log workload generator
+
+Writes one log file per host, lines in time order, with a configurable share of
+error lines, mix of error categories and cardinality of hosts, client IPs and users.
+
+Usage (from backend/):
+    python benchmarks/loggen.py --out /tmp/synthetic-logs --lines 500000 --hosts 4 \
+        --error-rate 0.2 --mix authentication_failure=5,connection_timeout=2 --ips 20000
+"""
+import argparse
+import os
+import random
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Message templates per analyzer error category (see analyzer.ERROR_RULES); each
+# template is classified into exactly its category by the default rule table
+ERROR_TEMPLATES: Dict[str, List[str]] = {
+    'authentication_failure': [
+        "sshd[{pid}]: pam_unix(sshd:auth): authentication failure; logname= uid=0 euid=0 tty=ssh ruser= rhost={ip} user={user}",
+        "sshd[{pid}]: pam_unix(sshd:auth): authentication failure; logname= uid=0 euid=0 tty=ssh ruser= rhost={ip}",
+    ],
+    'connection_timeout': [
+        "sshd[{pid}]: Timeout before authentication for {ip} port {port}",
+        "kernel: nfs: server storage{n} not responding, timed out",
+    ],
+    'permission_denied': [
+        "su[{pid}]: pam_unix(su:session): permission denied for user {user}",
+        "sshd[{pid}]: User {user} from {ip} not allowed because access denied",
+    ],
+    'service_unavailable': [
+        "systemd[1]: worker{n}.service: Service unavailable, retrying",
+        "haproxy[{pid}]: backend app{n} is DOWN, rhost={ip}",
+    ],
+    'database_error': [
+        "app[{pid}]: database connection error: could not connect to db{n} from {ip}",
+    ],
+    'unknown_user': [
+        "login[{pid}]: FAILED LOGIN 1 FROM {ip} FOR {user}, User unknown",
+    ],
+    'failed_login': [
+        "sshd[{pid}]: Failed login for {user} from {ip} port {port} ssh2",
+    ],
+    'alert_exit': [
+        "named[{pid}]: alert: exiting (due to fatal signal {n})",
+    ],
+    'other_errors': [
+        "kernel: EXT4-fs error (device sda{n}): ext4_find_entry: reading directory lblock 0",
+        "cron[{pid}]: critical: job {n} could not be scheduled",
+    ],
+}
+
+NORMAL_TEMPLATES: List[str] = [
+    "sshd[{pid}]: Accepted publickey for {user} from {ip} port {port} ssh2",
+    "sshd[{pid}]: Connection closed by {ip} port {port} [preauth]",
+    "sudo: pam_unix(sudo:session): session opened for user root by {user}(uid=0)",
+    "cron[{pid}]: ({user}) CMD (run-parts /etc/cron.hourly)",
+    "systemd[1]: Started Session {n} of user {user}.",
+    "kernel: [UFW BLOCK] IN=eth0 OUT= SRC={ip} DST=10.0.0.1 PROTO=TCP DPT={port}",
+    "ftpd[{pid}]: connection from {ip} () at {n}",
+]
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    """Parse "category=weight,..." into weights (all categories equally weighted by default)."""
+    if not text:
+        return {category: 1.0 for category in ERROR_TEMPLATES}
+    mix = {}
+    for part in text.split(','):
+        category, _, weight = part.partition('=')
+        if category.strip() not in ERROR_TEMPLATES:
+            raise ValueError(f"Unknown error category '{category}' (known: {', '.join(ERROR_TEMPLATES)})")
+        mix[category.strip()] = float(weight or 1)
+    return mix
+
+
+def generate(
+    lines: int,
+    hosts: int = 4,
+    duration_seconds: int = 3600,
+    end: Optional[float] = None,
+    error_rate: float = 0.1,
+    mix: Optional[Dict[str, float]] = None,
+    ips: int = 10000,
+    users: int = 500,
+    skew: float = 2.0,
+    seed: int = 7,
+) -> Iterator[Tuple[float, str, str]]:
+    """
+    Generate time-ordered synthetic log lines.
+
+    Args:
+        lines: Number of lines
+        hosts: Distinct hosts the lines are spread over
+        duration_seconds: Time span covered, ending at `end`
+        end: Timestamp of the newest line (seconds since epoch, default now)
+        error_rate: Share of lines that are errors
+        mix: Relative weight per error category (see parse_mix)
+        ips: Distinct client IPs
+        users: Distinct user names
+        skew: Popularity skew of IPs and users; 1 is uniform, larger values make a
+            few sources dominate (as in a brute-force attack)
+        seed: Random seed; the same arguments always give the same lines
+
+    Yields:
+        (timestamp in seconds, host, message) tuples, oldest first
+    """
+    rnd = random.Random(seed)
+    mix = mix or parse_mix(None)
+    categories = list(mix)
+    weights = [mix[category] for category in categories]
+    end = time.time() if end is None else end
+    start = end - duration_seconds
+    step = duration_seconds / max(1, lines)
+
+    def pick(n: int) -> int:
+        return int(n * rnd.random() ** skew)
+
+    for i in range(lines):
+        if rnd.random() < error_rate:
+            template = rnd.choice(ERROR_TEMPLATES[rnd.choices(categories, weights)[0]])
+        else:
+            template = rnd.choice(NORMAL_TEMPLATES)
+        ip = pick(ips)
+        message = template.format(
+            pid=rnd.randint(100, 65000),
+            ip=f"10.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}",
+            port=rnd.randint(1024, 65535),
+            user=f"user{pick(users)}",
+            n=rnd.randint(1, 50),
+        )
+        yield start + i * step, f"host{rnd.randrange(hosts)}", message
+
+
+def format_line(ts: float, host: str, message: str, fmt: str = "iso") -> str:
+    """Render one line as ISO 8601 ("2024-05-01T12:00:00.123456Z host ...") or syslog."""
+    seconds = time.gmtime(ts)
+    if fmt == "syslog":
+        return f"{time.strftime('%b', seconds)} {seconds.tm_mday:>2} {time.strftime('%H:%M:%S', seconds)} {host} {message}"
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', seconds)}.{int(ts % 1 * 1e6):06d}Z {host} {message}"
+
+
+def write_files(out_dir: str, entries: Iterator[Tuple[float, str, str]], fmt: str = "iso") -> List[str]:
+    """Write generated lines to <out_dir>/<host>.log, one file per host."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    try:
+        for ts, host, message in entries:
+            if host not in files:
+                files[host] = open(os.path.join(out_dir, f"{host}.log"), "w")
+            files[host].write(format_line(ts, host, message, fmt) + "\n")
+    finally:
+        for f in files.values():
+            f.close()
+    return sorted(f.name for f in files.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True, help="Directory to write <host>.log files to")
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--duration", type=int, default=3600, help="Seconds covered, ending now")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--mix", help="Error category weights, e.g. authentication_failure=5,database_error=1")
+    parser.add_argument("--ips", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--skew", type=float, default=2.0)
+    parser.add_argument("--format", choices=["iso", "syslog"], default="iso")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    entries = generate(
+        args.lines, args.hosts, args.duration, error_rate=args.error_rate, mix=parse_mix(args.mix),
+        ips=args.ips, users=args.users, skew=args.skew, seed=args.seed,
+    )
+    for path in write_files(args.out, entries, args.format):
+        print(f"{path}: {os.path.getsize(path) / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
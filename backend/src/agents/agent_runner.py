@@ -1,12 +1,13 @@
 """Agent runner for log monitoring system with session management"""
 import uuid
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 from core.config import config
 from fastapi import HTTPException
 from google.adk.agents import LlmAgent
 from google.adk.apps import App, ResumabilityConfig
 from google.adk.artifacts import FileArtifactService, InMemoryArtifactService
+from google.adk.events import Event, EventActions
 from google.adk.memory import InMemoryMemoryService
 from google.adk.plugins import LoggingPlugin, ReflectAndRetryToolPlugin
 from google.adk.plugins.context_filter_plugin import ContextFilterPlugin
@@ -175,6 +176,65 @@ async def _run_agent(
     return "Agent did not produce a final response."
 
 
+async def handle_direct_request(
+    user_id: str,
+    query: str,
+    answer: Callable[[str, dict], Awaitable[Optional[str]]],
+    agent: LlmAgent,
+    app_name: str = "log_monitoring_app",
+    session_id: Optional[str] = None,
+) -> Optional[tuple[str, str]]:
+    """
+    Handle a request without running the agent, recording it in the session.
+
+    `answer` gets the query and a copy of the session state to update. The question,
+    the answer and the state changes are appended to the session as if the agent had
+    produced them, so a follow-up handled by the agent sees them in its history and
+    state.
+
+    Args:
+        user_id: The user ID making the request
+        query: The user's query text
+        answer: Coroutine returning the response, or None to leave the request to the agent
+        agent: The agent the answer is attributed to
+        app_name: The application/project name for session isolation
+        session_id: Optional session ID for conversation continuity
+
+    Returns:
+        (response text, session ID), or None if `answer` declined
+    """
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    session = await _get_or_create_session(
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        initial_state={},
+    )
+    state = dict(session.state)
+    response = await answer(query, state)
+    if response is None:
+        return None
+    state_delta = {key: value for key, value in state.items() if session.state.get(key) != value}
+
+    session_service = get_session_service()
+    invocation_id = f"e-{uuid.uuid4()}"
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author="user",
+        content=types.Content(role="user", parts=[types.Part(text=query)]),
+    ))
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author=agent.name,
+        content=types.Content(role="model", parts=[types.Part(text=response)]),
+        actions=EventActions(state_delta=state_delta),
+    ))
+    logger.info(f"Direct request completed: user={user_id}")
+    return response, session.id
+
+
 async def handle_agent_request(
     user_id: str,
     query: str,
@@ -15,6 +15,15 @@ class LogMonitoringRequest(BaseModel):
     user_id: str = "default_user"
     session_id: Optional[str] = None
 
+@router.get("/log_analytics/cache")
+async def log_analytics_cache_stats():
+    """
+    Hit/miss counters for the log analysis report cache.
+    """
+    from agents.sub_agents.log_analytics.cache import get_report_cache
+
+    return get_report_cache().stats()
+
 @router.post("/log_monitoring")
 async def log_monitoring(req: LogMonitoringRequest):
     """
@@ -23,8 +32,28 @@ async def log_monitoring(req: LogMonitoringRequest):
     logger.info(f"Log monitoring request: {req.query}")
     
     try:
-        from agents.agent_runner import handle_agent_request
+        from agents.agent_runner import handle_agent_request, handle_direct_request
         from agents.agent import log_monitoring_agent
+        from agents import fast_path
+
+        # Common log questions are answered by the tools directly, without the agent
+        direct = None
+        if fast_path.recognize(req.query):
+            direct = await handle_direct_request(
+                user_id=req.user_id,
+                query=req.query,
+                answer=fast_path.answer,
+                agent=log_monitoring_agent,
+                app_name="log_monitoring_app",
+                session_id=req.session_id,
+            )
+        if direct is not None:
+            response, actual_session_id = direct
+            return {
+                "status": "success",
+                "response": response,
+                "session_id": actual_session_id
+            }
         
         # Use the agent runner with proper session management
         response, actual_session_id = await handle_agent_request(
@@ -0,0 +1,132 @@
+"""Deterministic answers for common log questions, without model round trips"""
+import re
+from typing import Any, MutableMapping, Optional, Tuple
+
+from core.config import config
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("log_monitoring_fast_path")
+
+_TIME_RANGE = re.compile(
+    r'\b(?:in\s+the\s+|over\s+the\s+|for\s+the\s+|during\s+the\s+|within\s+the\s+)?'
+    r'(?:last|past|previous)\s+(?:(\d+|an?|one)\s*)?'
+    r'(seconds?|secs?|minutes?|mins?|hours?|hrs?|days?|weeks?|[smhdw])\b'
+)
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# The tools end their report with a handle for the sub-agents; it means nothing to users
+_HANDLE_LINE = re.compile(r'\n*^Analysis handle: `[^`\n]*`[ \t]*$', re.MULTILINE)
+
+# A question is only answered here if every word is in one of these sets, so anything
+# naming a service, host, file or other specific (or asking something else entirely)
+# goes to the agent graph instead
+_LOG_WORDS = {
+    'error', 'errors', 'issue', 'issues', 'problem', 'problems', 'anomaly', 'anomalies',
+    'failure', 'failures', 'warning', 'warnings', 'log', 'logs', 'health', 'healthy',
+    'status', 'system', 'incident', 'incidents', 'alert', 'alerts', 'unusual', 'wrong',
+}
+_SOLUTION_WORDS = {
+    'fix', 'solve', 'resolve', 'solution', 'solutions', 'root', 'cause', 'causes', 'causing',
+    'remediate', 'remediation', 'troubleshoot', 'recommend', 'recommendation',
+    'recommendations', 'steps', 'mitigate', 'why', 'address', 'handle',
+}
+_FILLER_WORDS = {
+    'a', 'all', 'an', 'analyse', 'analyze', 'and', 'any', 'anything', 'are', 'as', 'at',
+    'be', 'been', 'can', 'check', 'could', 'detected', 'did', 'do', 'does', 'everything',
+    'fine', 'find', 'for', 'from', 'get', 'give', 'going', 'happened', 'happening', 'has',
+    'have', 'how', 'i', 'in', 'is', 'it', "it's", 'its', 'look', 'me', 'my', 'now', 'of',
+    'ok', 'okay', 'on', 'our', 'please', 'recent', 'recently', 'report', 'right', 'see',
+    'seen', 'should', 'show', 'so', 'summarise', 'summarize', 'summary', 'the', 'them',
+    'there', 'these', 'they', 'this', 'those', 'to', 'today', 'up', 'us', 'was', 'we',
+    'went', 'were', 'what', "what's", 'whats', 'with', 'you',
+}
+
+_UNITS = {
+    's': 'seconds', 'sec': 'seconds', 'second': 'seconds',
+    'm': 'minutes', 'min': 'minutes', 'minute': 'minutes',
+    'h': 'hours', 'hr': 'hours', 'hour': 'hours',
+    'd': 'days', 'day': 'days',
+    'w': 'weeks', 'week': 'weeks',
+}
+_UNIT_SECONDS = {'seconds': 1, 'minutes': 60, 'hours': 3600, 'days': 86400, 'weeks': 604800}
+
+
+class _FastPathContext:
+    """Stands in for an ADK ToolContext; tools only use its state."""
+
+    def __init__(self, state: MutableMapping[str, Any]):
+        self.state = state
+
+
+def recognize(query: str) -> Optional[Tuple[str, str]]:
+    """
+    Classify a question as one the fast path can answer.
+
+    Args:
+        query: The user's question
+
+    Returns:
+        (intent, time_range) with intent "health" or "solution", or None to use the
+        agent (always None when the fast path is disabled)
+    """
+    if not config.log_analysis.fast_path_enabled:
+        return None
+    text = query.lower().strip()
+    time_range = config.log_analysis.fast_path_default_range
+    match = _TIME_RANGE.search(text)
+    if match:
+        amount, unit = match.groups()
+        amount = 1 if amount in (None, 'a', 'an', 'one') else int(amount)
+        unit = _UNITS[unit if len(unit) == 1 else unit.rstrip('s')]
+        if not 0 < amount * _UNIT_SECONDS[unit] <= config.loki.retention_seconds:
+            return None  # an empty window, or one reaching past retention; let the agent explain
+        time_range = f"last {amount} {unit}"
+        text = text[:match.start()] + ' ' + text[match.end():]
+        if _TIME_RANGE.search(text):
+            return None  # more than one window, e.g. a comparison
+
+    words = _WORD.findall(text)
+    if re.search(r'\d', text) or not words:
+        return None
+    if any(word not in _LOG_WORDS and word not in _SOLUTION_WORDS and word not in _FILLER_WORDS for word in words):
+        return None
+    if not any(word in _LOG_WORDS for word in words):
+        return None
+    return ('solution' if any(word in _SOLUTION_WORDS for word in words) else 'health'), time_range
+
+
+async def answer(query: str, state: MutableMapping[str, Any]) -> Optional[str]:
+    """
+    Answer a well-understood log question with the log analytics and solution tools directly.
+
+    "Any errors in the last hour?" runs fetch_and_analyze_logs; "how do I fix the errors
+    from the past 30 minutes?" also runs the rule-based root cause and solution tools.
+
+    Args:
+        query: The user's question
+        state: Session state; the analysis result is stored in it as the tools would
+
+    Returns:
+        Response text, or None if the question should go to the agent graph
+    """
+    recognized = recognize(query)
+    if recognized is None:
+        return None
+    intent, time_range = recognized
+
+    from agents.sub_agents.log_analytics.results import LATEST_KEY
+    from agents.sub_agents.log_analytics.tools import fetch_and_analyze_logs
+    from agents.sub_agents.solution.tools import analyze_root_cause, generate_solution
+
+    logger.info(f"Fast path: {intent} for {time_range}")
+    context = _FastPathContext(state)
+    previous = state.get(LATEST_KEY)
+    report = _HANDLE_LINE.sub('', await fetch_and_analyze_logs(time_range, tool_context=context))
+    # No new result means there were no logs or the fetch failed; the report says which
+    if intent == 'health' or state.get(LATEST_KEY) == previous:
+        return report
+
+    root_cause = analyze_root_cause('latest', context)
+    if root_cause.startswith("No anomalies detected"):
+        return f"{report}\n\n{root_cause}"
+    return f"{report}\n\n{generate_solution(root_cause, 'latest', context)}"
@@ -1,3 +1,33 @@
-def search_knowledge_base(query: str) -> str:
-    """Searches the document knowledge base for relevant information."""
-    return f"Knowledge Base placeholder: No relevant documentation found for '{query}' at this time."
\ No newline at end of file
+"""Tools for knowledge base agent"""
+from core.config import config
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("knowledge_base_agent")
+
+
+async def search_knowledge_base(query: str) -> str:
+    """
+    Searches the document knowledge base for relevant information.
+
+    Args:
+        query: What to look up, e.g. "how to rotate the database credentials"
+
+    Returns:
+        The most relevant documentation passages with their sources
+    """
+    try:
+        from utils_app.vector_store import query_vectors_async
+        passages = await query_vectors_async(query, top_k=config.knowledge_base.top_k)
+    except Exception as e:
+        logger.error(f"Error in search_knowledge_base: {e}")
+        return f"Error searching the knowledge base: {str(e)}"
+
+    if not passages:
+        return f"No relevant documentation found for '{query}'."
+
+    sections = []
+    for i, passage in enumerate(passages, 1):
+        source = passage["metadata"].get("source", "Unknown")
+        sections.append(f"**[{i}] {source}** (relevance {passage['score']:.2f})\n{passage['text']}")
+    logger.info(f"Knowledge base search returned {len(passages)} passages for '{query}'")
+    return "\n\n".join(sections)
@@ -11,6 +11,7 @@ log_analytics_agent = Agent(
     instruction=prompt.INSTRUCTION,
     tools=[
         tools.fetch_and_analyze_logs,
+        tools.analyze_log_file,
     ],
     generate_content_config=genai_types.GenerateContentConfig(
         temperature=0.1,
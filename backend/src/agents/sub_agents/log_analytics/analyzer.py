@@ -0,0 +1,352 @@
+"""Single-pass log analyzer engine"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from core.config import config
+from agents.sub_agents.log_analytics.batch import LogBatch
+from agents.sub_agents.log_analytics.sketches import HeavyHitters, HyperLogLog
+from agents.sub_agents.log_analytics.templates import TemplateMiner
+
+# Ordered rule table: the first category whose condition matches wins. Each condition
+# is a list of alternatives, and each alternative is a tuple of keywords that must all
+# appear in the lowercased line.
+ERROR_RULES: List[Tuple[str, List[Tuple[str, ...]]]] = [
+    ('authentication_failure', [('authentication failure',), ('auth', 'fail')]),
+    ('connection_timeout', [('timeout',), ('timed out',)]),
+    ('permission_denied', [('permission denied',), ('denied',)]),
+    ('service_unavailable', [('unavailable',), ('down',)]),
+    ('database_error', [('database', 'error'), ('database', 'fail')]),
+    ('unknown_user', [('user unknown',), ('unknown user',)]),
+    ('failed_login', [('failed', 'login'), ('failed', 'logon')]),
+    ('alert_exit', [('alert', 'exit')]),
+    ('other_errors', [('error',), ('fail',), ('critical',)]),
+]
+
+CRITICAL_PATTERNS = ('authentication_failure', 'database_error', 'service_unavailable')
+
+RHOST_PATTERN = re.compile(r'rhost=([^\s]+)')
+
+# The last three octets of an IPv4 address. Starting the pattern with a literal dot lets
+# the regex engine jump between dots instead of trying every position in the text; the
+# leading octet is then validated by hand in find_ip_addresses.
+_IP_TAIL_PATTERN = re.compile(r'\.\d{1,3}\.\d{1,3}\.\d{1,3}\b')
+
+
+class RuleSet:
+    """
+    An ordered rule table compiled into a single keyword alternation.
+
+    One regex pass finds every keyword of the table; the first category whose
+    condition is satisfied by the keywords found wins. Adding a category adds
+    alternatives to the one pattern rather than another scan of the text.
+
+    The keywords are factored into a trie, so at each position the engine compares
+    each character once rather than once per keyword, and the longest keyword wins.
+    A match also counts for every keyword it contains ("permission denied" for
+    "denied"), and the scan resumes one character after each match start, so a
+    keyword starting inside another ("user unknown user") is found too.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, List[Tuple[str, ...]]]] = ERROR_RULES):
+        self.rules = list(rules)
+        self.categories = [name for name, _ in rules]
+        keywords = sorted(
+            {keyword for _, alternatives in rules for alternative in alternatives for keyword in alternative}
+        )
+        self._pattern = re.compile(_trie_pattern(keywords))
+        # Keyword sets are bitmasks, bit i standing for keywords[i]; a match of a keyword
+        # sets the bits of every keyword it contains
+        bit = {keyword: 1 << i for i, keyword in enumerate(keywords)}
+        self._implied = {
+            keyword: sum(bit[other] for other in keywords if other in keyword) for keyword in keywords
+        }
+        self._mask_dtype = np.uint64 if len(keywords) <= 64 else object
+        self._conditions = [
+            [sum(bit[keyword] for keyword in alternative) for alternative in alternatives]
+            for _, alternatives in rules
+        ]
+        self._resolved: Dict[int, int] = {}
+
+    def _category_index(self, mask: int) -> int:
+        """Index of the first category satisfied by a keyword mask, or -1."""
+        index = self._resolved.get(mask)
+        if index is None:
+            index = next(
+                (i for i, alternatives in enumerate(self._conditions)
+                 if any(mask & keywords == keywords for keywords in alternatives)),
+                -1,
+            )
+            self._resolved[mask] = index
+        return index
+
+    def _matches(self, text: str) -> List[Tuple[int, int]]:
+        """(position, keyword mask) of every keyword occurrence in lowercased text."""
+        search, implied = self._pattern.search, self._implied
+        hits = []
+        match = search(text)
+        while match:
+            start = match.start()
+            hits.append((start, implied[match.group()]))
+            match = search(text, start + 1)
+        return hits
+
+    def classify(self, line: str) -> Optional[str]:
+        """The category of a lowercased line, or None if no rule matches."""
+        mask = 0
+        for _, bits in self._matches(line):
+            mask |= bits
+        index = self._category_index(mask) if mask else -1
+        return self.categories[index] if index >= 0 else None
+
+    def classify_text(self, text: str, offsets: np.ndarray) -> np.ndarray:
+        """
+        Classify every line of a newline-joined text buffer in one regex pass.
+
+        Args:
+            text: Lines joined with '\\n' (original case)
+            offsets: Start offset of each line in text, plus one end sentinel
+
+        Returns:
+            int64 array holding each line's index into `categories`, or -1
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters change length when lowercased, which would shift offsets
+            bounds = offsets.tolist()
+            lines = [text[bounds[i]:bounds[i + 1] - 1].lower() for i in range(len(bounds) - 1)]
+            lowered = '\n'.join(lines)
+            offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+            np.cumsum([len(line) + 1 for line in lines], out=offsets[1:])
+
+        hits = self._matches(lowered)
+        if not hits:
+            return np.full(len(offsets) - 1, -1, dtype=np.int64)
+        positions, bits = zip(*hits)
+        # Matches come in text order, so each line's matches are one run of rows
+        rows = np.searchsorted(offsets, positions, side='right') - 1
+        starts = np.flatnonzero(np.diff(rows, prepend=-1))
+        masks = np.zeros(len(offsets) - 1, dtype=self._mask_dtype)
+        masks[rows[starts]] = np.bitwise_or.reduceat(np.array(bits, dtype=self._mask_dtype), starts)
+        unique, inverse = np.unique(masks, return_inverse=True)
+        resolved = np.array([self._category_index(int(mask)) if mask else -1 for mask in unique], dtype=np.int64)
+        return resolved[inverse.reshape(-1)]
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    """A regex matching any of the words, with common prefixes factored out."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'  # greedy, so longer keywords win
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+DEFAULT_RULES = RuleSet()
+
+
+def find_ip_addresses(text: str) -> Set[str]:
+    """
+    Find every IPv4-looking address in a block of text.
+
+    Matches exactly what r'\\b(?:\\d{1,3}\\.){3}\\d{1,3}\\b' matches, but scans
+    roughly an order of magnitude faster on log text.
+
+    Args:
+        text: One or more log lines
+
+    Returns:
+        Set of addresses found
+    """
+    ips = set()
+    search = _IP_TAIL_PATTERN.search
+    pos = floor = 0
+    match = search(text, pos)
+    while match:
+        start = match.start()
+        head = start
+        # A regex scan resumes after its previous match, so digits consumed by that
+        # match cannot start a new one
+        while head > floor and start - head < 4 and text[head - 1].isdecimal():
+            head -= 1
+        digits = start - head
+        before = text[head - 1] if head > 0 else ''
+        if 0 < digits <= 3 and not (before.isalnum() or before == '_'):
+            ips.add(text[head:match.end()])
+            pos = floor = match.end()
+        else:
+            pos = start + 1
+        match = search(text, pos)
+    return ips
+
+
+def anomaly_score_from_counts(total_logs: int, error_patterns: Dict) -> float:
+    """
+    Calculate anomaly score from a log count and error pattern counts.
+
+    Args:
+        total_logs: Number of log entries analyzed
+        error_patterns: Dictionary of error patterns and counts
+
+    Returns:
+        Anomaly score (0-100)
+    """
+    if not total_logs:
+        return 0.0
+
+    total_errors = sum(error_patterns.values())
+
+    # Calculate error rate
+    error_rate = (total_errors / total_logs) * 100
+
+    # Weight certain critical errors higher
+    critical_errors = sum(error_patterns.get(p, 0) for p in CRITICAL_PATTERNS)
+    critical_rate = (critical_errors / total_logs) * 100
+
+    # Anomaly score: weighted combination
+    anomaly_score = min(100, (error_rate * 0.6) + (critical_rate * 0.4))
+
+    return round(anomaly_score, 2)
+
+
+class LogAnalyzer:
+    """
+    Fills every log statistic in one pass over the lines.
+
+    Analyzers are mergeable, so pages, shards and time buckets can each be analysed
+    separately and combined afterwards. Lines that match an error rule are also mined
+    into templates, so the report can show what the errors look like, not just how
+    many there are. Mining costs more per line than everything else, so at most
+    `template_lines` error lines of each batch are mined: beyond that an evenly spaced
+    sample is, each sampled line standing for the lines skipped after it, and the
+    template counts become estimates (`templates_exact` is False).
+
+    Unique IPs and error sources are kept in fixed-size sketches (see sketches.py), so
+    memory stays bounded during scans and brute-force storms; both are exact until
+    the number of distinct values passes the sketch's limit.
+    """
+
+    def __init__(
+        self,
+        rules: RuleSet = DEFAULT_RULES,
+        mine_templates: Optional[bool] = None,
+        template_lines: Optional[int] = None,
+    ):
+        if mine_templates is None:
+            mine_templates = config.log_analysis.template_mining
+        self.rules = rules
+        self.total_logs = 0
+        self.error_patterns = Counter()
+        self.ip_addresses = HyperLogLog()
+        self.error_sources = HeavyHitters()
+        self.templates: Optional[TemplateMiner] = TemplateMiner() if mine_templates else None
+        self.template_lines = template_lines or config.log_analysis.template_lines_per_batch
+        self.templates_exact = True
+
+    def update(self, lines: Iterable[str]) -> "LogAnalyzer":
+        """Fold a batch of raw log lines into the statistics."""
+        if not isinstance(lines, list):
+            lines = list(lines)
+        self._count_text('\n'.join(lines), _line_offsets(lines))
+        return self
+
+    def update_batch(self, batch: LogBatch) -> "LogAnalyzer":
+        """Fold a LogBatch into the statistics, scanning its text buffer in place."""
+        self._count_text(batch.text, batch.offsets)
+        return self
+
+    def update_text(self, text: str) -> "LogAnalyzer":
+        """Fold a block of newline-separated log text into the statistics."""
+        if text.endswith('\n'):
+            text = text[:-1]
+        lines = text.split('\n') if text else []
+        self._count_text(text, _line_offsets(lines))
+        return self
+
+    def _count_text(self, text: str, offsets: np.ndarray) -> None:
+        # Every statistic comes from a whole-buffer scan: one regex pass classifies all
+        # lines, and rhost= values and IPs are found in the joined text directly
+        codes = self.rules.classify_text(text, offsets)
+        counts = np.bincount(codes + 1, minlength=len(self.rules.categories) + 1)[1:]
+        for category, count in zip(self.rules.categories, counts.tolist()):
+            if count:
+                self.error_patterns[category] += count
+
+        if self.templates is not None:
+            self._mine(text, offsets, np.flatnonzero(codes >= 0))
+
+        # Like a per-line search, only the first rhost= of each line counts
+        matches = [(match.start(), match.group(1)) for match in RHOST_PATTERN.finditer(text)]
+        if matches:
+            rows = np.searchsorted(offsets, [start for start, _ in matches], side='right') - 1
+            _, first = np.unique(rows, return_index=True)
+            self.error_sources.update(Counter(matches[i][1] for i in first.tolist()))
+
+        self.ip_addresses.update(find_ip_addresses(text))
+        self.total_logs += len(offsets) - 1
+
+    def _mine(self, text: str, offsets: np.ndarray, rows: np.ndarray) -> None:
+        if not len(rows):
+            return
+        stride = -(-len(rows) // self.template_lines)
+        sampled = rows[::stride]
+        weights = [stride] * len(sampled)
+        # The last sampled line stands for only the lines left after it
+        weights[-1] = len(rows) - stride * (len(sampled) - 1)
+        if stride > 1:
+            self.templates_exact = False
+        mine = self.templates.add
+        for start, end, weight in zip(offsets[sampled].tolist(), offsets[sampled + 1].tolist(), weights):
+            mine(text[start:end - 1], weight)
+
+    def merge(self, other: "LogAnalyzer") -> "LogAnalyzer":
+        """Add another analyzer's statistics into this one."""
+        self.total_logs += other.total_logs
+        self.error_patterns.update(other.error_patterns)
+        self.ip_addresses.merge(other.ip_addresses)
+        self.error_sources.merge(other.error_sources)
+        if self.templates is not None and other.templates is not None:
+            self.templates.merge(other.templates)
+            self.templates_exact = self.templates_exact and other.templates_exact
+        return self
+
+    def report(self, top_n: int = 5, top_templates: int = 10) -> Dict:
+        """Return the combined analysis for every line seen so far."""
+        error_patterns = dict(_ranked(self.error_patterns))
+        report = {
+            'total_logs': self.total_logs,
+            'error_patterns': error_patterns,
+            'anomaly_score': anomaly_score_from_counts(self.total_logs, error_patterns),
+            'unique_ips': self.ip_addresses.count(),
+            'unique_ips_exact': self.ip_addresses.exact,
+            'top_error_sources': self.error_sources.top(top_n),
+        }
+        if self.templates is not None:
+            report['top_templates'] = self.templates.top(top_templates)
+            report['templates_exact'] = self.templates_exact
+        return report
+
+
+def _line_offsets(lines: List[str]) -> np.ndarray:
+    """Start offset of each line once joined with '\\n', plus one end sentinel."""
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter((len(line) + 1 for line in lines), dtype=np.int64, count=len(lines)), out=offsets[1:])
+    return offsets
+
+
+def _ranked(counter: Counter) -> List[Tuple[str, int]]:
+    # Ties are broken by key so merged partials rank the same as one serial pass
+    return sorted(counter.items(), key=lambda item: (-item[1], item[0]))
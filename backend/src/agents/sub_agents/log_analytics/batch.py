@@ -0,0 +1,221 @@
+"""Columnar log batch representation"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class LabelTable:
+    """
+    Dictionary encoding for stream label sets.
+
+    Each distinct label set is stored once and referred to by a small integer code.
+    Share one table between batches when their codes need to be comparable, e.g.
+    across the pages of a single fetch.
+    """
+
+    def __init__(self):
+        self.labels: List[Dict[str, str]] = []
+        self._codes: Dict[Tuple, int] = {}
+
+    def intern(self, labels: Dict[str, str]) -> int:
+        """Return the code for a label set, assigning a new one if unseen."""
+        key = tuple(sorted(labels.items()))
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.labels)
+            self._codes[key] = code
+            self.labels.append(dict(labels))
+        return code
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class LogBatch:
+    """
+    A batch of log entries stored column by column.
+
+    - timestamps: int64 nanosecond timestamps
+    - label_codes: int32 codes into a shared LabelTable
+    - text: every line joined with '\\n' into one string
+    - offsets: int64 start offset of each line in text, plus one end sentinel
+
+    Line i is text[offsets[i]:offsets[i + 1] - 1].
+    """
+
+    __slots__ = ("timestamps", "label_codes", "label_table", "text", "offsets", "_multiline")
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        label_codes: np.ndarray,
+        label_table: LabelTable,
+        text: str,
+        offsets: np.ndarray,
+        multiline: bool = False,
+    ):
+        self.timestamps = timestamps
+        self.label_codes = label_codes
+        self.label_table = label_table
+        self.text = text
+        self.offsets = offsets
+        self._multiline = multiline
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def empty(cls, label_table: Optional[LabelTable] = None) -> "LogBatch":
+        return LogBatchBuilder(label_table).build()
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict], label_table: Optional[LabelTable] = None) -> "LogBatch":
+        """Build a batch from the legacy {'timestamp', 'line', 'labels'} dicts."""
+        builder = LogBatchBuilder(label_table)
+        for entry in entries:
+            builder.add(int(entry.get('timestamp', 0)), entry.get('line', ''), entry.get('labels', {}))
+        return builder.build()
+
+    def line(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def lines(self) -> List[str]:
+        """All lines as a list of strings."""
+        if not len(self):
+            return []
+        if not self._multiline:
+            return self.text.split('\n')
+        offsets = self.offsets.tolist()
+        text = self.text
+        return [text[offsets[i]:offsets[i + 1] - 1] for i in range(len(offsets) - 1)]
+
+    def labels(self, i: int) -> Dict[str, str]:
+        return self.label_table.labels[self.label_codes[i]]
+
+    def entry_key(self, i: int) -> Tuple[int, str]:
+        """Identity of an entry within one timestamp: (label code, line)."""
+        return int(self.label_codes[i]), self.line(i)
+
+    def select(self, indices: Sequence[int]) -> "LogBatch":
+        """Return a new batch holding the given rows, in the given order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        builder = LogBatchBuilder(self.label_table)
+        builder.extend_coded(
+            self.timestamps[indices],
+            self.label_codes[indices],
+            [self.line(i) for i in indices.tolist()],
+        )
+        return builder.build()
+
+    def slice(self, start: int, stop: int) -> "LogBatch":
+        """Rows start..stop as a new batch sharing this batch's columns where possible."""
+        stop = min(stop, len(self))
+        text_start = int(self.offsets[start])
+        text_stop = max(int(self.offsets[stop]) - 1, text_start)
+        return LogBatch(
+            timestamps=self.timestamps[start:stop],
+            label_codes=self.label_codes[start:stop],
+            label_table=self.label_table,
+            text=self.text[text_start:text_stop],
+            offsets=self.offsets[start:stop + 1] - text_start,
+            multiline=self._multiline,
+        )
+
+    def split(self, size: int) -> List["LogBatch"]:
+        """Cut the batch into consecutive slices of at most size rows."""
+        return [self.slice(start, start + size) for start in range(0, len(self), size)]
+
+    def drop(self, indices: Sequence[int]) -> "LogBatch":
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(indices, dtype=np.int64)] = False
+        return self.select(np.flatnonzero(keep))
+
+    def oldest(self, n: int) -> "LogBatch":
+        """The n oldest entries, in timestamp order."""
+        return self.select(np.argsort(self.timestamps, kind='stable')[:n])
+
+    def newest(self, n: int) -> "LogBatch":
+        """The n newest entries, in timestamp order."""
+        return self.select(np.argsort(self.timestamps, kind='stable')[max(len(self) - n, 0):])
+
+    def bucket_index(self, start_ns: int, bucket_ns: int) -> np.ndarray:
+        """Time bucket number of every entry relative to start_ns."""
+        return (self.timestamps - start_ns) // bucket_ns
+
+    def bucket_counts(self, start_ns: int, end_ns: int, bucket_ns: int) -> np.ndarray:
+        """Number of entries per time bucket between start_ns and end_ns."""
+        n_buckets = max(1, -(-(end_ns - start_ns) // bucket_ns))
+        index = self.bucket_index(start_ns, bucket_ns)
+        index = index[(index >= 0) & (index < n_buckets)]
+        return np.bincount(index, minlength=n_buckets)
+
+    def group_by_bucket(self, bucket_ns: int) -> Iterator[Tuple[int, "LogBatch"]]:
+        """Yield (bucket start, rows in that bucket) for every epoch-aligned bucket present."""
+        if not len(self):
+            return
+        buckets = self.timestamps // bucket_ns
+        first, last = int(buckets.min()), int(buckets.max())
+        if first == last:
+            yield first * bucket_ns, self
+            return
+        order = np.argsort(buckets, kind='stable')
+        keys, starts = np.unique(buckets[order], return_index=True)
+        ends = list(starts[1:]) + [len(order)]
+        for key, start, end in zip(keys.tolist(), starts.tolist(), ends):
+            yield key * bucket_ns, self.select(order[start:end])
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch's columns."""
+        return (
+            self.timestamps.nbytes + self.label_codes.nbytes + self.offsets.nbytes
+            + len(self.text.encode('utf-8', 'surrogatepass'))
+        )
+
+
+class LogBatchBuilder:
+    """Accumulates entries into typed buffers and freezes them into a LogBatch."""
+
+    def __init__(self, label_table: Optional[LabelTable] = None):
+        self.label_table = label_table if label_table is not None else LabelTable()
+        self._timestamps = array('q')
+        self._codes = array('i')
+        self._lines: List[str] = []
+
+    def add(self, timestamp: int, line: str, labels: Dict[str, str]) -> None:
+        self._timestamps.append(timestamp)
+        self._codes.append(self.label_table.intern(labels))
+        self._lines.append(line)
+
+    def add_stream(self, labels: Dict[str, str], values: List[List[str]]) -> None:
+        """Add one Loki stream: a label set and its [timestamp, line] pairs."""
+        code = self.label_table.intern(labels)
+        self._timestamps.extend(int(value[0]) for value in values)
+        self._codes.extend([code] * len(values))
+        self._lines.extend(value[1] for value in values)
+
+    def extend_coded(self, timestamps: Iterable[int], codes: Iterable[int], lines: List[str]) -> None:
+        """Add rows whose label codes already belong to this builder's table."""
+        self._timestamps.extend(int(ts) for ts in timestamps)
+        self._codes.extend(int(code) for code in codes)
+        self._lines.extend(lines)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def build(self) -> LogBatch:
+        lines = self._lines
+        lengths = np.fromiter((len(line) + 1 for line in lines), dtype=np.int64, count=len(lines))
+        offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        text = '\n'.join(lines)
+        multiline = text.count('\n') != max(len(lines) - 1, 0)
+
+        return LogBatch(
+            timestamps=np.frombuffer(self._timestamps, dtype=np.int64).copy(),
+            label_codes=np.frombuffer(self._codes, dtype=np.int32).copy(),
+            label_table=self.label_table,
+            text=text,
+            offsets=offsets,
+            multiline=multiline,
+        )
@@ -0,0 +1,95 @@
+"""Time-aligned TTL cache for log analysis reports"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from core.config import config
+
+
+def snap_window(start_ns: int, end_ns: int, bucket_seconds: int) -> Tuple[int, int]:
+    """
+    Align a window to bucket boundaries, keeping its duration.
+
+    The end is snapped down to the bucket boundary, so every "last N minutes" question
+    asked within the same bucket resolves to the same window.
+    """
+    bucket_ns = bucket_seconds * 1_000_000_000
+    snapped_end = end_ns - end_ns % bucket_ns
+    return snapped_end - (end_ns - start_ns), snapped_end
+
+
+class ReportCache:
+    """
+    LRU cache with a TTL, keyed by aligned window and query.
+
+    Concurrent requests for the same key share one in-flight computation, so a burst
+    of identical questions results in a single Loki round trip.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, asyncio.Future]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Return the cached value for key, computing and storing it on a miss."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return await asyncio.shield(entry[1])
+
+        self.misses += 1
+        future = asyncio.ensure_future(compute())
+        self._entries[key] = (now, future)
+        self._entries.move_to_end(key)
+        self._evict(now)
+
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # Never cache failures
+            if self._entries.get(key, (None, None))[1] is future:
+                del self._entries[key]
+            raise
+
+    def _evict(self, now: float) -> None:
+        expired = [k for k, (created, _) in self._entries.items() if now - created >= self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        self.evictions += len(expired)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_report_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Get or create the shared report cache."""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache(
+            ttl_seconds=config.log_analysis.cache_ttl_seconds,
+            max_entries=config.log_analysis.cache_max_entries,
+        )
+    return _report_cache
@@ -0,0 +1,89 @@
+"""Background consumer that keeps live log state precomputed"""
+import asyncio
+import time
+from typing import Optional
+
+from core.config import config
+from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.rolling import RollingWindowStore, get_rolling_store
+from agents.sub_agents.log_analytics.utils import build_loki_query
+
+logger = get_service_logger("log_analytics_live")
+
+
+class LiveLogConsumer:
+    """
+    Polls Loki in short increments and keeps a query's per-bucket state current.
+
+    Each poll only fetches the lines since the previous one (plus the buckets still
+    open to late lines), so the rolling store always holds per-minute counts, templates
+    and sources for the last retention period. Requests for windows inside that period
+    are then answered from memory.
+    """
+
+    def __init__(self, store: RollingWindowStore, query: str, poll_seconds: float):
+        self.store = store
+        self.query = query
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Live log consumer following {self.query} every {self.poll_seconds}s")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.store.unfollow(self.query)
+
+    async def _run(self) -> None:
+        # A window is answered from memory if the state is at most one poll (plus
+        # slack for the poll itself) behind
+        staleness_ns = int(self.poll_seconds * 2 * 1_000_000_000)
+        delay = self.poll_seconds
+        while True:
+            try:
+                current = await self.store.follow(self.query, time.time_ns(), staleness_ns)
+                # Back off while the state cannot be built (e.g. the window exceeds the
+                # line budget), rather than re-fetching the full retention every poll
+                delay = self.poll_seconds if current else min(delay * 2, 300.0)
+            except Exception as e:
+                logger.warning(f"Live log poll failed: {e}")
+                delay = min(delay * 2, 300.0)
+            await asyncio.sleep(delay)
+
+
+_live_consumer: Optional[LiveLogConsumer] = None
+
+
+def start_live_consumer() -> Optional[LiveLogConsumer]:
+    """Start the background consumer if it is enabled in config."""
+    global _live_consumer
+    if not (config.log_analysis.live_enabled and config.log_analysis.rolling_enabled):
+        return None
+    if _live_consumer is None:
+        _live_consumer = LiveLogConsumer(
+            store=get_rolling_store(),
+            query=build_loki_query(),
+            poll_seconds=config.log_analysis.live_poll_seconds,
+        )
+    _live_consumer.start()
+    return _live_consumer
+
+
+async def stop_live_consumer() -> None:
+    """Stop the background consumer if it was started."""
+    global _live_consumer
+    if _live_consumer is not None:
+        await _live_consumer.stop()
+        _live_consumer = None
@@ -0,0 +1,397 @@
+"""Direct analysis of local log files (plain or gzip), bypassing Loki"""
+import bisect
+import calendar
+import glob
+import gzip
+import itertools
+import mmap
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from core.config import config
+from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.analyzer import DEFAULT_RULES, LogAnalyzer, RuleSet
+from agents.sub_agents.log_analytics.parallel import analysis_workers, get_analysis_executor
+
+logger = get_service_logger("log_analytics_files")
+
+# A file's contents, or a newline-aligned piece of them: a read-only mmap for plain
+# files, decompressed bytes for gzip
+Buffer = Union[mmap.mmap, bytes]
+
+# One unit of analysis work: a (path, start, stop) byte range of a plain file, which
+# the worker maps itself, or a decompressed gzip chunk
+Work = Union[Tuple[str, int, int], bytes]
+
+_ISO_TIMESTAMP = re.compile(rb'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})')
+_SYSLOG_TIMESTAMP = re.compile(rb'([A-Z][a-z]{2}) {1,2}(\d{1,2}) (\d{2}):(\d{2}):(\d{2})')
+_MONTHS = {
+    name: number for number, name in enumerate(
+        (b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun', b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec'), 1
+    )
+}
+
+
+def line_timestamp(line: bytes, year: int) -> Optional[int]:
+    """
+    Parse the timestamp at the start of a log line.
+
+    Understands ISO 8601 ("2024-05-01T12:00:00") and syslog ("May  1 12:00:00")
+    prefixes; syslog omits the year, so `year` is used. Times are treated as UTC.
+
+    Returns:
+        Seconds since epoch, or None if the line has no recognised timestamp
+    """
+    match = _ISO_TIMESTAMP.match(line)
+    if match:
+        fields = [int(group) for group in match.groups()]
+    else:
+        match = _SYSLOG_TIMESTAMP.match(line)
+        if not match or match.group(1) not in _MONTHS:
+            return None
+        fields = [year, _MONTHS[match.group(1)]] + [int(group) for group in match.groups()[1:]]
+    try:
+        return calendar.timegm(tuple(fields))
+    except ValueError:
+        return None
+
+
+_SEEK_SCAN_BYTES = 16 * 1024
+
+
+def _line_start(buf: Buffer, pos: int) -> int:
+    """Offset of the first line starting at or after pos."""
+    if pos <= 0:
+        return 0
+    newline = buf.find(b'\n', pos - 1)
+    return len(buf) if newline == -1 else newline + 1
+
+
+def _read_line(buf: Buffer, start: int) -> Tuple[bytes, int]:
+    newline = buf.find(b'\n', start)
+    end = len(buf) if newline == -1 else newline + 1
+    return buf[start:end], end
+
+
+class TimeIndex:
+    """
+    Sparse (timestamp, offset) index over a time-ordered log file.
+
+    One timestamped line is sampled every `stride` bytes, so building the index reads
+    a handful of lines rather than the whole file. A time is located by bisecting the
+    samples, then bisecting byte offsets between the two neighbouring samples.
+
+    A gzip file cannot be mapped, so its index is built from its decompressed chunks
+    (see from_chunks) and only the samples are kept.
+    """
+
+    def __init__(self, buf: Optional[Buffer], year: int, stride: int):
+        self.year = year
+        self.stride = stride
+        self.offsets: List[int] = []
+        self.timestamps: List[int] = []
+        self.last_timestamp: Optional[int] = None
+        if buf is not None:
+            self._sample(buf, 0)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Tuple[int, bytes]], year: int, stride: int) -> "TimeIndex":
+        """Index a file given as consecutive (offset, newline-aligned chunk) pieces."""
+        index = cls(None, year, stride)
+        for base, chunk in chunks:
+            index._sample(chunk, base)
+        return index
+
+    def _sample(self, buf: Buffer, base: int) -> None:
+        """Add the samples of a newline-aligned piece of the file starting at offset base."""
+        stride = self.stride
+        pos = 0
+        while pos < len(buf):
+            found = self._next_timestamped(buf, _line_start(buf, pos), pos + stride)
+            if found is not None and (not self.offsets or base + found[0] > self.offsets[-1]):
+                offset, ts = found
+                # Keep samples monotonic so bisecting stays valid on slightly unordered files
+                if not self.timestamps or ts >= self.timestamps[-1]:
+                    self.offsets.append(base + offset)
+                    self.timestamps.append(ts)
+            pos += stride
+
+        last = self._last_timestamp(buf, stride)
+        if last is not None:
+            self.last_timestamp = last
+
+    def _next_timestamped(self, buf: Buffer, start: int, limit: int) -> Optional[Tuple[int, int]]:
+        while start < min(limit, len(buf)):
+            line, end = _read_line(buf, start)
+            ts = line_timestamp(line, self.year)
+            if ts is not None:
+                return start, ts
+            start = end
+        return None
+
+    def _last_timestamp(self, buf: Buffer, stride: int) -> Optional[int]:
+        end = len(buf)
+        while end > 0:
+            start = _line_start(buf, max(0, end - stride))
+            last = None
+            pos = start
+            while pos < end:
+                line, pos = _read_line(buf, pos)
+                ts = line_timestamp(line, self.year)
+                if ts is not None:
+                    last = ts
+            if last is not None:
+                return last
+            end = start
+        return None
+
+    def seek(self, buf: Buffer, ts: int) -> int:
+        """Offset of the first line whose timestamp is at or after ts."""
+        i = bisect.bisect_left(self.timestamps, ts)
+        pos = self.offsets[i - 1] if i > 0 else 0
+        limit = self.offsets[i] if i < len(self.offsets) else len(buf)
+
+        # The answer lies in [pos, limit]; narrow it by probing the middle of the range
+        while limit - pos > _SEEK_SCAN_BYTES:
+            found = self._next_timestamped(buf, _line_start(buf, (pos + limit) // 2), limit)
+            if found is None:
+                break  # untimestamped tail; scan it line by line
+            offset, line_ts = found
+            if line_ts >= ts:
+                limit = offset
+            else:
+                pos = _read_line(buf, offset)[1]
+
+        while pos < limit:
+            line, end = _read_line(buf, pos)
+            line_ts = line_timestamp(line, self.year)
+            if line_ts is not None and line_ts >= ts:
+                return pos
+            pos = end
+        return limit
+
+
+_index_cache: "OrderedDict[Tuple, TimeIndex]" = OrderedDict()
+_INDEX_CACHE_SIZE = 32
+
+
+def _time_index(path: str, load: Callable[[str], Buffer]) -> TimeIndex:
+    """Build or reuse the time index for a file, keyed by its size and mtime."""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    index = _index_cache.get(key)
+    if index is None:
+        # Syslog timestamps carry no year; assume the year the file was last written
+        year = time.gmtime(stat.st_mtime).tm_year
+        stride = config.log_analysis.local_index_stride_bytes
+        if _is_gzip(path):
+            chunks = _gzip_chunks(path, config.log_analysis.local_chunk_bytes)
+            index = TimeIndex.from_chunks(chunks, year, stride)
+        else:
+            index = TimeIndex(load(path), year, stride)
+        _index_cache[key] = index
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    else:
+        _index_cache.move_to_end(key)
+    return index
+
+
+def _is_gzip(path: str) -> bool:
+    return path.endswith('.gz')
+
+
+def _open(path: str) -> Buffer:
+    """Memory-map a plain file."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _gzip_chunks(path: str, size: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Decompress a gzip file as a stream of newline-aligned chunks of about `size` bytes.
+
+    Yields:
+        (offset in the decompressed contents, chunk); only one chunk is held at a time
+    """
+    with gzip.open(path, 'rb') as f:
+        base = 0
+        carry = b''
+        while True:
+            data = f.read(size)
+            if not data:
+                if carry:
+                    yield base, carry
+                return
+            data = carry + data
+            cut = data.rfind(b'\n') + 1
+            if not cut:
+                carry = data  # a single line longer than the chunk size
+                continue
+            yield base, data[:cut]
+            base += cut
+            carry = data[cut:]
+
+
+def _gzip_work(path: str, size: int, index: Optional[TimeIndex], window: Optional[Tuple[int, int]]) -> Iterator[bytes]:
+    """The decompressed chunks of a gzip file, cut to the window when there is one."""
+    if window is None:
+        for _, chunk in _gzip_chunks(path, size):
+            yield chunk
+        return
+
+    # Chunks ending before the sample preceding the window start hold no lines in it
+    i = bisect.bisect_left(index.timestamps, window[0])
+    skip_to = index.offsets[i - 1] if i > 0 else 0
+    started = False
+    for base, chunk in _gzip_chunks(path, size):
+        if base + len(chunk) <= skip_to:
+            continue
+        local = TimeIndex(chunk, index.year, index.stride)
+        start = 0
+        if not started:
+            start = local.seek(chunk, window[0])
+            if start == len(chunk):
+                continue
+            started = True
+        stop = local.seek(chunk, window[1] + 1)
+        if stop > start:
+            yield chunk[start:stop]
+        if stop < len(chunk):
+            return
+
+
+def _chunks(buf: Buffer, start: int, stop: int, size: int) -> List[Tuple[int, int]]:
+    """Split [start, stop) into ranges of about `size` bytes that end on a newline."""
+    bounds = []
+    while start < stop:
+        end = min(stop, _line_start(buf, start + size))
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _analyze_file_region(path: str, start: int, stop: int, rules: RuleSet) -> LogAnalyzer:
+    """Worker entry point: map the file in the child and analyse one byte range."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return LogAnalyzer(rules).update_text(mm[start:stop].decode('utf-8', 'replace'))
+
+
+def _analyze_bytes(data: bytes, rules: RuleSet) -> LogAnalyzer:
+    """Worker entry point: analyse a decompressed chunk."""
+    return LogAnalyzer(rules).update_text(data.decode('utf-8', 'replace'))
+
+
+def resolve_log_files(pattern: str) -> List[str]:
+    """
+    Find the log files matching a name or glob inside the configured log directory.
+
+    Paths that resolve outside the directory are ignored.
+
+    Returns:
+        Matching file paths, oldest first (rotated files before the live one)
+    """
+    root = os.path.realpath(config.log_analysis.local_log_dir)
+    files = []
+    for match in glob.glob(os.path.join(root, pattern)):
+        path = os.path.realpath(match)
+        if os.path.commonpath([root, path]) == root and os.path.isfile(path):
+            files.append(path)
+    return sorted(set(files), key=os.path.getmtime)
+
+
+def analyze_log_files(paths: List[str], duration_seconds: Optional[int] = None, rules: RuleSet = DEFAULT_RULES) -> Dict:
+    """
+    Analyse local log files with the same engine used for Loki results.
+
+    Plain files are memory-mapped and gzip files decompressed as a stream. Each file
+    is cut into newline-aligned chunks that are analysed on the process pool (plain
+    files are mapped again in the worker, so only offsets cross the process boundary).
+    Chunks are submitted as they are produced and at most two per worker are in flight,
+    so memory stays bounded by the chunk size whatever the size of a gzip file.
+    With a duration, the window ends at the newest timestamp across the files and each
+    file's time index is used to seek straight to the lines inside it; files whose
+    cached index shows they end before the window are not opened at all. (Indexing a
+    gzip file takes one decompression pass of its own, done once per file version.)
+
+    Args:
+        paths: Files to analyse, oldest first
+        duration_seconds: Only analyse this many seconds before the newest line
+        rules: Error rule table
+
+    Returns:
+        Report dict in the same shape as LogAnalyzer.report(), plus `files` and
+        `window` (start and end, seconds since epoch, or None)
+    """
+    buffers: Dict[str, Buffer] = {}
+
+    def load(path: str) -> Buffer:
+        if path not in buffers:
+            buffers[path] = _open(path)
+        return buffers[path]
+
+    chunk_bytes = config.log_analysis.local_chunk_bytes
+
+    def file_work(path: str, index: Optional[TimeIndex], window: Optional[Tuple[int, int]]) -> Iterator[Work]:
+        if _is_gzip(path):
+            yield from _gzip_work(path, chunk_bytes, index, window)
+            return
+        buf = load(path)
+        start, stop = (index.seek(buf, window[0]), index.seek(buf, window[1] + 1)) if window else (0, len(buf))
+        for chunk_start, chunk_stop in _chunks(buf, start, stop, chunk_bytes):
+            yield path, chunk_start, chunk_stop
+
+    try:
+        window = None
+        files: List[Tuple[str, Optional[TimeIndex]]] = [(path, None) for path in paths]
+        if duration_seconds is not None:
+            indexes = {path: _time_index(path, load) for path in paths}
+            newest = max((i.last_timestamp for i in indexes.values() if i.last_timestamp is not None), default=None)
+            if newest is not None:
+                window = (newest - duration_seconds, newest)
+                files = [
+                    (path, index) for path, index in indexes.items()
+                    if index.last_timestamp is not None and index.last_timestamp >= window[0]
+                ]
+
+        work = itertools.chain.from_iterable(file_work(path, index, window) for path, index in files)
+        analyzer = LogAnalyzer(rules)
+        # Only go to the pool when there is more than one chunk
+        head = list(itertools.islice(work, 2))
+        chunks = len(head)
+        if chunks == 1:
+            item = head[0]
+            data = item if isinstance(item, bytes) else buffers[item[0]][item[1]:item[2]]
+            analyzer.update_text(data.decode('utf-8', 'replace'))
+        elif head:
+            executor = get_analysis_executor()
+            max_in_flight = 2 * analysis_workers()
+            pending: Deque = deque()
+            chunks = 0
+            for item in itertools.chain(head, work):
+                chunks += 1
+                if isinstance(item, bytes):
+                    pending.append(executor.submit(_analyze_bytes, item, rules))
+                else:
+                    pending.append(executor.submit(_analyze_file_region, *item, rules))
+                # Backpressure: keep at most max_in_flight chunks alive; merging the
+                # oldest first keeps the result in file order, matching a serial pass
+                while len(pending) > max_in_flight:
+                    analyzer.merge(pending.popleft().result())
+            while pending:
+                analyzer.merge(pending.popleft().result())
+        logger.info(f"Analyzed {analyzer.total_logs} lines from {len(paths)} file(s) in {chunks} chunk(s)")
+    finally:
+        for buf in buffers.values():
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    report = analyzer.report()
+    report['files'] = [os.path.basename(path) for path in paths]
+    report['window'] = window
+    return report
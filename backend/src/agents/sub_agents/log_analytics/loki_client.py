@@ -0,0 +1,319 @@
+"""Shared async Loki client used by every log analytics tool"""
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from core.config import config
+from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.batch import LabelTable, LogBatch, LogBatchBuilder
+from agents.sub_agents.log_analytics.loki_json import QueryRangeDecoder, loads
+
+logger = get_service_logger("loki_client")
+
+
+class LokiClient:
+    """
+    Connection-pooled async client for the Loki HTTP API.
+
+    A single instance is shared by all tools so connections are kept alive between
+    calls, and a semaphore caps how many queries can be in flight at once so one
+    slow window cannot monopolise Loki.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_concurrency: int = 8,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def get(self, path: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        """
+        Issue a GET against the Loki API and return the decoded JSON body.
+
+        Args:
+            path: API path, e.g. "/loki/api/v1/query_range"
+            params: Query string parameters
+            timeout: Per-call timeout override in seconds
+
+        Returns:
+            Decoded JSON response
+        """
+        async with self._semaphore:
+            response = await self._client.get(
+                path, params=params, timeout=timeout if timeout is not None else self.timeout
+            )
+            response.raise_for_status()
+            return loads(response.content)
+
+    async def query_range(
+        self,
+        query: str,
+        start: int,
+        end: int,
+        limit: int,
+        direction: str = "forward",
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """Run a LogQL query_range request."""
+        params = {"query": query, "start": start, "end": end, "limit": limit, "direction": direction}
+        return await self.get("/loki/api/v1/query_range", params=params, timeout=timeout)
+
+    async def stream_query_range(
+        self,
+        query: str,
+        start: int,
+        end: int,
+        limit: int,
+        builder: LogBatchBuilder,
+        direction: str = "forward",
+        timeout: Optional[float] = None,
+    ) -> QueryRangeDecoder:
+        """
+        Run a LogQL query_range request, decoding the body into `builder` as it streams in.
+
+        Entries are appended to the builder chunk by chunk, so a page never exists as
+        one large bytes object plus its nested JSON copy.
+
+        Returns:
+            The finished decoder, carrying the response `status` and `error`
+        """
+        params = {"query": query, "start": start, "end": end, "limit": limit, "direction": direction}
+        decoder = QueryRangeDecoder(builder)
+        async with self._semaphore:
+            async with self._client.stream(
+                "GET", "/loki/api/v1/query_range", params=params,
+                timeout=timeout if timeout is not None else self.timeout,
+            ) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    decoder.feed(chunk)
+        decoder.close()
+        return decoder
+
+    async def query(self, query: str, time: int, timeout: Optional[float] = None) -> Dict:
+        """Run an instant LogQL (metric) query evaluated at the given nanosecond time."""
+        return await self.get("/loki/api/v1/query", params={"query": query, "time": time}, timeout=timeout)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_loki_client: Optional[LokiClient] = None
+
+
+def get_loki_client() -> LokiClient:
+    """Get or create the shared Loki client."""
+    global _loki_client
+    if _loki_client is None:
+        _loki_client = LokiClient(
+            base_url=config.loki.url,
+            timeout=config.loki.timeout,
+            max_connections=config.loki.max_connections,
+            max_concurrency=config.loki.max_concurrency,
+        )
+        logger.info(f"Loki client initialized for {config.loki.url}")
+    return _loki_client
+
+
+async def close_loki_client() -> None:
+    """Close the shared Loki client's connection pool."""
+    global _loki_client
+    if _loki_client is not None:
+        await _loki_client.aclose()
+        _loki_client = None
+
+
+async def iter_log_pages(
+    query: str,
+    start_ns: int,
+    end_ns: int,
+    page_size: int,
+    max_lines: int,
+    label_table: Optional[LabelTable] = None,
+    direction: str = "forward",
+) -> AsyncIterator[LogBatch]:
+    """
+    Page through a query_range window, following the timestamp cursor.
+
+    Forward pages go oldest-first from the window start; backward pages go newest-first
+    from the window end, so a line budget keeps the most recent lines. Each page
+    restarts at the last timestamp seen (Loki's start bound is inclusive, and a
+    backward page ends just after it) and drops entries already yielded at that exact
+    nanosecond.
+
+    Args:
+        query: LogQL query
+        start_ns: Window start (nanoseconds since epoch)
+        end_ns: Window end (nanoseconds since epoch)
+        page_size: Lines requested per page
+        max_lines: Stop once this many lines have been yielded
+        label_table: LabelTable to intern stream labels into (a new one by default)
+        direction: "forward" (oldest first) or "backward" (newest first)
+
+    Yields:
+        One LogBatch per page; all pages share a LabelTable
+
+    Raises:
+        RuntimeError: If Loki answers with a non-success status
+    """
+    client = get_loki_client()
+    label_table = label_table if label_table is not None else LabelTable()
+    forward = direction == "forward"
+    cursor = start_ns if forward else end_ns
+    seen_ts, seen = None, set()
+    fetched = 0
+
+    while (cursor < end_ns if forward else cursor > start_ns) and fetched < max_lines:
+        limit = min(page_size, max_lines - fetched + len(seen))
+        builder = LogBatchBuilder(label_table)
+        if forward:
+            decoded = await client.stream_query_range(query, cursor, end_ns, limit, builder)
+        else:
+            decoded = await client.stream_query_range(query, start_ns, cursor, limit, builder, direction="backward")
+        if decoded.status != 'success':
+            raise RuntimeError(f"Loki query failed: {decoded.error or decoded.status}")
+        batch = builder.build()
+        if not len(batch):
+            return
+
+        received = len(batch)
+        edge_ts = int(batch.timestamps.max() if forward else batch.timestamps.min())
+        boundary = {batch.entry_key(i) for i in np.flatnonzero(batch.timestamps == edge_ts)}
+
+        if seen:
+            duplicates = [
+                i for i in np.flatnonzero(batch.timestamps == seen_ts)
+                if batch.entry_key(i) in seen
+            ]
+            if duplicates:
+                batch = batch.drop(duplicates)
+        if len(batch) > max_lines - fetched:
+            remaining = max_lines - fetched
+            batch = batch.oldest(remaining) if forward else batch.newest(remaining)
+
+        fetched += len(batch)
+        if len(batch):
+            yield batch
+
+        if received < limit:
+            return  # Loki had nothing more in the window
+
+        if edge_ts == (cursor if forward else cursor - 1):
+            # A full page inside one nanosecond cannot be split further; skip past it
+            logger.warning(f"More than {limit} lines share timestamp {edge_ts}; skipping past it")
+            cursor, seen_ts, seen = (edge_ts + 1 if forward else edge_ts), None, set()
+        else:
+            cursor, seen_ts, seen = (edge_ts if forward else edge_ts + 1), edge_ts, boundary
+
+
+# Pages a slice may fetch ahead of the consumer, bounding memory for slices that
+# finish before the ones ahead of them are consumed
+_SLICE_PREFETCH_PAGES = 4
+
+
+def _split_window(start_ns: int, end_ns: int, split_ns: int) -> List[Tuple[int, int]]:
+    """Cut a window at multiples of split_ns since the epoch."""
+    bounds = []
+    while start_ns < end_ns:
+        stop = min(end_ns, start_ns - start_ns % split_ns + split_ns)
+        bounds.append((start_ns, stop))
+        start_ns = stop
+    return bounds
+
+
+async def iter_log_window(
+    query: str,
+    start_ns: int,
+    end_ns: int,
+    page_size: int,
+    max_lines: int,
+    direction: str = "forward",
+) -> AsyncIterator[LogBatch]:
+    """
+    Fetch a window, splitting long windows into concurrently fetched slices.
+
+    Windows longer than `loki.split_seconds` are cut into epoch-aligned slices. Up to
+    `loki.split_concurrency` slices are paged through at once (still under the
+    client's own request cap), and their pages are yielded strictly in slice order as
+    they arrive, so consumers see the same stream as from one iter_log_pages call in
+    the same direction while wall-clock time tracks the slowest slices.
+
+    Args:
+        query: LogQL query
+        start_ns: Window start (nanoseconds since epoch)
+        end_ns: Window end (nanoseconds since epoch)
+        page_size: Lines requested per page
+        max_lines: Stop once this many lines have been yielded
+        direction: "forward" (oldest first) or "backward" (newest first)
+
+    Yields:
+        One LogBatch per page; all pages share a LabelTable
+    """
+    split_ns = config.loki.split_seconds * 1_000_000_000
+    if split_ns <= 0 or end_ns - start_ns <= split_ns:
+        async for page in iter_log_pages(query, start_ns, end_ns, page_size, max_lines, direction=direction):
+            yield page
+        return
+
+    bounds = _split_window(start_ns, end_ns, split_ns)
+    if direction != "forward":
+        bounds.reverse()
+    label_table = LabelTable()
+    queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=_SLICE_PREFETCH_PAGES) for _ in bounds]
+    tasks: List[asyncio.Task] = []
+
+    async def fetch(i: int) -> None:
+        slice_start, slice_end = bounds[i]
+        try:
+            async for page in iter_log_pages(
+                query, slice_start, slice_end, page_size, max_lines, label_table, direction
+            ):
+                await queues[i].put(page)
+            await queues[i].put(None)
+        except Exception as e:
+            await queues[i].put(e)
+
+    def launch(i: int) -> None:
+        if i < len(bounds):
+            tasks.append(asyncio.get_running_loop().create_task(fetch(i)))
+
+    concurrency = max(1, config.loki.split_concurrency)
+    for i in range(concurrency):
+        launch(i)
+
+    fetched = 0
+    try:
+        for i in range(len(bounds)):
+            while True:
+                page = await queues[i].get()
+                if page is None:
+                    break
+                if isinstance(page, Exception):
+                    raise page
+                if len(page) > max_lines - fetched:
+                    remaining = max_lines - fetched
+                    page = page.oldest(remaining) if direction == "forward" else page.newest(remaining)
+                fetched += len(page)
+                if len(page):
+                    yield page
+                if fetched >= max_lines:
+                    return
+            launch(i + concurrency)
+    finally:
+        for task in tasks:
+            task.cancel()
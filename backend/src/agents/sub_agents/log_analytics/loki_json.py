@@ -0,0 +1,217 @@
+"""JSON decoding for Loki responses, including an incremental query_range decoder"""
+import codecs
+import json
+import re
+from typing import Any, Iterator, List, Optional
+
+from agents.sub_agents.log_analytics.batch import LogBatchBuilder
+
+try:
+    import orjson
+except ImportError:  # optional: only speeds up whole-body decoding
+    orjson = None
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def loads(data: bytes) -> Any:
+    """Decode a complete JSON body, with orjson when it is installed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class QueryRangeDecoder:
+    """
+    Incrementally decodes a query_range response body into a LogBatchBuilder.
+
+    Feed it the body in chunks as they arrive; every complete [timestamp, line] pair
+    goes straight into the builder's typed buffers, so neither the whole body nor a
+    nested dict/list copy of it is ever held in memory. Loki writes each stream's
+    labels before its values, but values seen first are held until the labels arrive.
+
+    Values are decoded with the stdlib scanner, which can resume mid-body; orjson has
+    no partial-decode API, so it is only used for whole bodies (see loads()).
+    """
+
+    def __init__(self, builder: LogBatchBuilder):
+        self.builder = builder
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decode = json.JSONDecoder().raw_decode
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._finished = False
+        self._code: Optional[int] = None
+        self._pending: List[tuple] = []
+        self._parser = self._document()
+        next(self._parser)
+
+    def feed(self, chunk: bytes) -> None:
+        self._buf = self._buf[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        self._resume()
+
+    def close(self) -> None:
+        """Signal the end of the body; raises ValueError if it was incomplete."""
+        self._buf = self._buf[self._pos:] + self._text.decode(b'', final=True)
+        self._pos = 0
+        self._eof = True
+        if not self._finished:
+            self._resume()
+        if not self._finished:
+            raise ValueError("Truncated Loki response")
+
+    def _resume(self) -> None:
+        if self._finished:
+            return
+        try:
+            self._parser.send(None)
+        except StopIteration:
+            self._finished = True
+
+    # --- parser: generators yield when they need more input ---
+
+    def _peek(self) -> Iterator[None]:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                raise ValueError("Truncated Loki response")
+            yield
+
+    def _expect(self, chars: str) -> Iterator[None]:
+        char = yield from self._peek()
+        if char not in chars:
+            raise ValueError(f"Unexpected {char!r} at offset {self._pos} of Loki response")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Iterator[None]:
+        yield from self._peek()
+        while True:
+            try:
+                value, end = self._decode(self._buf, self._pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            yield
+
+    def _object(self, member) -> Iterator[None]:
+        yield from self._expect('{')
+        if (yield from self._peek()) == '}':
+            self._pos += 1
+            return
+        while True:
+            key = yield from self._value()
+            yield from self._expect(':')
+            yield from member(key)
+            if (yield from self._expect(',}')) == '}':
+                return
+
+    def _array(self, item) -> Iterator[None]:
+        yield from self._expect('[')
+        if (yield from self._peek()) == ']':
+            self._pos += 1
+            return
+        while True:
+            yield from item()
+            if (yield from self._expect(',]')) == ']':
+                return
+
+    def _document(self) -> Iterator[None]:
+        yield from self._object(self._top_member)
+
+    def _top_member(self, key: str) -> Iterator[None]:
+        if key == 'data':
+            yield from self._object(self._data_member)
+            return
+        value = yield from self._value()
+        if key == 'status':
+            self.status = value
+        elif key == 'error':
+            self.error = value
+
+    def _data_member(self, key: str) -> Iterator[None]:
+        if key == 'result':
+            yield from self._array(self._stream)
+        else:
+            yield from self._value()
+
+    def _stream(self) -> Iterator[None]:
+        self._code = None
+        self._pending = []
+        yield from self._object(self._stream_member)
+        if self._pending:
+            # A stream without labels: file its values under the empty label set
+            self._code = self.builder.label_table.intern({})
+            self._add(*zip(*self._pending))
+
+    def _stream_member(self, key: str) -> Iterator[None]:
+        if key == 'stream':
+            self._code = self.builder.label_table.intern((yield from self._value()))
+            if self._pending:
+                self._add(*zip(*self._pending))
+                self._pending = []
+        elif key == 'values':
+            yield from self._values()
+        else:
+            yield from self._value()
+
+    def _values(self) -> Iterator[None]:
+        """Decode a values array, consuming every complete pair in the buffer per step."""
+        yield from self._expect('[')
+        if (yield from self._peek()) == ']':
+            self._pos += 1
+            return
+
+        decode = self._decode
+        skip = _WHITESPACE.match
+        while True:
+            buf = self._buf
+            pos = skip(buf, self._pos).end()
+            size = len(buf)
+            timestamps, lines = [], []
+            done = False
+            try:
+                while True:
+                    (timestamp, line), end = decode(buf, pos)
+                    # Only consume a pair once the separator after it has arrived
+                    if end < size and buf[end] not in ',]':
+                        end = skip(buf, end).end()
+                    if end >= size:
+                        break
+                    separator = buf[end]
+                    if separator not in ',]':
+                        raise ValueError(f"Unexpected {separator!r} at offset {end} of Loki response")
+                    timestamps.append(timestamp)
+                    lines.append(line)
+                    pos = end + 1
+                    if separator == ']':
+                        done = True
+                        break
+                    if pos < size and buf[pos] in ' \t\n\r':
+                        pos = skip(buf, pos).end()
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+
+            self._pos = pos
+            if timestamps:
+                self._add(timestamps, lines)
+            if done:
+                return
+            if self._eof:
+                raise ValueError("Truncated Loki response")
+            yield
+
+    def _add(self, timestamps, lines) -> None:
+        if self._code is None:
+            self._pending.extend(zip(timestamps, lines))
+        else:
+            self.builder.extend_coded(timestamps, [self._code] * len(lines), list(lines))
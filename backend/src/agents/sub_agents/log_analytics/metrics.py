@@ -0,0 +1,153 @@
+"""Aggregate log statistics computed by Loki metric queries"""
+import asyncio
+import itertools
+import re
+from typing import Dict, List, Tuple
+
+from core.config import config
+from agents.sub_agents.log_analytics.analyzer import DEFAULT_RULES, RuleSet, anomaly_score_from_counts
+from agents.sub_agents.log_analytics.loki_client import get_loki_client
+from agents.sub_agents.log_analytics.templates import TemplateMiner
+
+_IP_REGEX = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
+
+
+def _rule_branches(alternatives) -> List[str]:
+    # Each alternative requires all of its keywords, in any order, so it expands
+    # into one `a.*b` branch per keyword ordering
+    return [
+        '.*'.join(re.escape(keyword) for keyword in ordering)
+        for alternative in alternatives
+        for ordering in itertools.permutations(alternative)
+    ]
+
+
+def rule_regex(alternatives) -> str:
+    """Translate one rule condition into a case-insensitive RE2 regex."""
+    return '(?i)' + '|'.join(_rule_branches(alternatives))
+
+
+def category_pipelines(base_query: str, rules: RuleSet = DEFAULT_RULES) -> Dict[str, str]:
+    """
+    Build one LogQL log pipeline per error category.
+
+    Categories are first-match-wins, so category k keeps the lines that match rule k
+    and none of the rules before it, exactly like RuleSet.classify.
+    """
+    pipelines = {}
+    excluded = ''
+    for name, alternatives in rules.rules:
+        regex = rule_regex(alternatives)
+        pipelines[name] = f'{base_query}{excluded} |~ `{regex}`'
+        excluded += f' !~ `{regex}`'
+    return pipelines
+
+
+def _vector(data: Dict) -> List[Tuple[Dict, int]]:
+    """(metric labels, value) pairs from an instant query response."""
+    if data.get('status') != 'success':
+        raise RuntimeError(f"Loki metric query failed: {data.get('error', data.get('status'))}")
+    return [
+        (sample.get('metric', {}), int(float(sample['value'][1])))
+        for sample in data.get('data', {}).get('result', [])
+    ]
+
+
+def _scalar(data: Dict) -> int:
+    return sum(value for _, value in _vector(data))
+
+
+async def fetch_log_metrics(
+    base_query: str,
+    start_ns: int,
+    end_ns: int,
+    rules: RuleSet = DEFAULT_RULES,
+    top_n: int = 5,
+) -> Dict:
+    """
+    Compute the log report with Loki metric queries plus a small raw sample.
+
+    Totals, per-category counts, per-host totals and top sources are exact counts over
+    the whole window. The unique IP count only considers the first address on each
+    line (LogQL's regexp parser extracts one match), so it is reported as approximate
+    (`unique_ips_exact` is False), and `top_templates` are mined from only the most
+    recent error lines (`template_sample` of them).
+
+    Args:
+        base_query: LogQL log query (stream selector and optional line filters)
+        start_ns: Window start (nanoseconds since epoch)
+        end_ns: Window end (nanoseconds since epoch)
+        rules: Error rule table
+        top_n: Number of top sources/hosts to return
+
+    Returns:
+        Report dict in the same shape as LogAnalyzer.report()
+    """
+    client = get_loki_client()
+    window = f'[{max(1, -(-(end_ns - start_ns) // 1_000_000_000))}s]'
+    host_label = config.loki.host_label
+
+    def count(pipeline: str) -> str:
+        return f'sum(count_over_time({pipeline} {window}))'
+
+    pipelines = category_pipelines(base_query, rules)
+    queries = {
+        'total': count(base_query),
+        'hosts': f'topk({top_n}, sum by ({host_label}) (count_over_time({base_query} {window})))',
+        'sources': (
+            f'topk({top_n}, sum by (rhost) (count_over_time('
+            f'{base_query} |= `rhost=` | regexp `rhost=(?P<rhost>\\S+)` {window})))'
+        ),
+        # regexp keeps lines without a match (with an empty ip); drop them so they do
+        # not count as one more address
+        'unique_ips': (
+            f'count(sum by (ip) (count_over_time('
+            f'{base_query} | regexp `(?P<ip>{_IP_REGEX})` | ip != "" {window})))'
+        ),
+        **{name: count(pipeline) for name, pipeline in pipelines.items()},
+    }
+
+    any_error = '(?i)' + '|'.join(
+        branch for _, alternatives in rules.rules for branch in _rule_branches(alternatives)
+    )
+    errors_only = f'{base_query} |~ `{any_error}`'
+
+    names = list(queries)
+    responses = await asyncio.gather(
+        *(client.query(queries[name], end_ns) for name in names),
+        client.query_range(errors_only, start_ns, end_ns, config.loki.sample_size, direction='backward'),
+    )
+    results = dict(zip(names, responses[:-1]))
+    sample = responses[-1]
+
+    total_logs = _scalar(results['total'])
+    error_patterns = {name: _scalar(results[name]) for name in pipelines}
+    error_patterns = dict(sorted(
+        ((name, n) for name, n in error_patterns.items() if n > 0), key=lambda item: -item[1]
+    ))
+    top_sources = sorted(
+        ((metric.get('rhost', ''), n) for metric, n in _vector(results['sources'])), key=lambda item: -item[1]
+    )
+    top_hosts = sorted(
+        ((metric.get(host_label, 'unknown'), n) for metric, n in _vector(results['hosts'])), key=lambda item: -item[1]
+    )
+
+    miner = TemplateMiner()
+    sampled = 0
+    if sample.get('status') == 'success':
+        for stream in sample.get('data', {}).get('result', []):
+            for value in stream.get('values', []):
+                miner.add(value[1])
+                sampled += 1
+
+    return {
+        'total_logs': total_logs,
+        'error_patterns': error_patterns,
+        'anomaly_score': anomaly_score_from_counts(total_logs, error_patterns),
+        'unique_ips': _scalar(results['unique_ips']),
+        'unique_ips_exact': False,
+        'top_error_sources': top_sources,
+        'top_hosts': top_hosts,
+        'top_templates': miner.top(10),
+        'template_sample': sampled,
+    }
@@ -0,0 +1,101 @@
+"""Process-pool analysis for large log windows"""
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Optional
+
+from core.config import config
+from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.analyzer import DEFAULT_RULES, LogAnalyzer, RuleSet
+from agents.sub_agents.log_analytics.batch import LogBatch
+
+logger = get_service_logger("log_analytics_parallel")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def analysis_workers() -> int:
+    return config.log_analysis.max_workers or os.cpu_count() or 1
+
+
+def get_analysis_executor() -> ProcessPoolExecutor:
+    """Get or create the shared analysis process pool."""
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the server process runs threads (uvicorn, litellm)
+        _executor = ProcessPoolExecutor(
+            max_workers=analysis_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"Analysis process pool started with {analysis_workers()} workers")
+    return _executor
+
+
+def shutdown_analysis_executor() -> None:
+    """Stop the analysis process pool if it was started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _analyze_shard(batch: LogBatch, rules: RuleSet) -> LogAnalyzer:
+    """Worker entry point: analyse one shard in a child process."""
+    return LogAnalyzer(rules).update_batch(batch)
+
+
+class ParallelLogAnalyzer:
+    """
+    Analyses a stream of batches serially until the window grows past a threshold,
+    then shards further batches across the process pool.
+
+    Partial results are merged back in submission order, so the final counts are
+    identical to what a single serial LogAnalyzer would produce. Mined templates and,
+    once the source sketch starts pruning, top-source estimates can differ slightly,
+    since both depend on the order lines are seen (the sketch's error bound holds
+    either way).
+    """
+
+    def __init__(
+        self,
+        rules: RuleSet = DEFAULT_RULES,
+        threshold: Optional[int] = None,
+        shard_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+    ):
+        self.rules = rules
+        self.threshold = threshold if threshold is not None else config.log_analysis.parallel_threshold
+        self.shard_size = shard_size or config.log_analysis.shard_size
+        self.max_in_flight = max_in_flight
+        self.analyzer = LogAnalyzer(rules)
+        self._seen = 0
+        self._pending: Deque[asyncio.Future] = deque()
+
+    @property
+    def parallel(self) -> bool:
+        return self._seen > self.threshold
+
+    async def add(self, batch: LogBatch) -> None:
+        """Analyse one batch, in-process or on the pool depending on volume so far."""
+        self._seen += len(batch)
+        if not self.parallel:
+            # Still CPU-bound for a full page; keep it off the event loop
+            await asyncio.to_thread(self.analyzer.update_batch, batch)
+            return
+
+        executor = get_analysis_executor()
+        loop = asyncio.get_running_loop()
+        max_in_flight = self.max_in_flight or 2 * analysis_workers()
+        for shard in batch.split(self.shard_size):
+            self._pending.append(loop.run_in_executor(executor, _analyze_shard, shard, self.rules))
+            # Backpressure: keep at most max_in_flight shards (and their text) alive
+            while len(self._pending) > max_in_flight:
+                self.analyzer.merge(await self._pending.popleft())
+
+    async def result(self) -> LogAnalyzer:
+        """Wait for outstanding shards and return the merged analyzer."""
+        while self._pending:
+            self.analyzer.merge(await self._pending.popleft())
+        return self.analyzer
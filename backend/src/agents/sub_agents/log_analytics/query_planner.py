@@ -0,0 +1,190 @@
+"""LogQL query planning: narrow stream selectors and cheap, escaped line filters"""
+import json
+import re
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from core.config import config
+from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.loki_client import get_loki_client
+from agents.sub_agents.log_analytics.utils import build_loki_query
+
+logger = get_service_logger("log_analytics_planner")
+
+_LABEL_TERM = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)=(\S+)$')
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_LETTER = re.compile(r'[^\W\d_]')
+_REGEX_SPECIAL = re.compile(r'([.^$*+?()\[\]{}|\\])')
+_MAX_CACHED = 256
+
+
+def logql_string(value: str) -> str:
+    """Quote a string for LogQL (Go string syntax, which JSON escaping is a subset of)."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def line_filter(text: str, exact: bool = False) -> str:
+    """
+    LogQL line filter matching lines that contain `text`.
+
+    Case-insensitive matching needs a regex, but one over an escaped literal, which
+    Loki runs as a plain case-folded substring search. Text without letters has no
+    case, so it always gets the cheaper `|=`.
+    """
+    if exact or not _LETTER.search(text):
+        return f' |= {logql_string(text)}'
+    regex = '(?i)' + _REGEX_SPECIAL.sub(r'\\\1', text)
+    return f' |~ {logql_string(regex)}'
+
+
+class LabelCatalog:
+    """
+    Label names, values and stream existence from Loki's metadata endpoints, cached.
+
+    Entries expire after `ttl_seconds` and cover at least `lookback_seconds`; a query
+    reaching further back than a cached entry refetches it for the longer range.
+    """
+
+    def __init__(self, ttl_seconds: float, lookback_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.lookback_ns = lookback_seconds * 1_000_000_000
+        self._entries: Dict[Hashable, Tuple[float, int, object]] = {}
+
+    async def _cached(
+        self,
+        key: Hashable,
+        start_ns: int,
+        end_ns: int,
+        fetch: Callable[[int, int], Awaitable[object]],
+        refresh: bool = False,
+    ):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and not refresh and now - entry[0] < self.ttl_seconds and entry[1] <= start_ns:
+            return entry[2]
+
+        start_ns = min(start_ns, end_ns - self.lookback_ns)
+        value = await fetch(start_ns, end_ns)
+        if len(self._entries) >= _MAX_CACHED:
+            self._entries.clear()
+        self._entries[key] = (now, start_ns, value)
+        return value
+
+    @staticmethod
+    async def _get(path: str, params: Dict) -> List:
+        data = await get_loki_client().get(path, params=params)
+        if data.get('status') != 'success':
+            raise RuntimeError(f"Loki metadata query failed: {data.get('error', data.get('status'))}")
+        return data.get('data') or []
+
+    async def labels(self, start_ns: int, end_ns: int) -> Set[str]:
+        """Names of the labels on streams in the window."""
+        async def fetch(start: int, end: int) -> Set[str]:
+            return set(await self._get("/loki/api/v1/labels", {"start": start, "end": end}))
+        return await self._cached('labels', start_ns, end_ns, fetch)
+
+    async def values(self, name: str, start_ns: int, end_ns: int, refresh: bool = False) -> Dict[str, str]:
+        """Values of one label in the window, keyed by their lowercase form."""
+        async def fetch(start: int, end: int) -> Dict[str, str]:
+            values = await self._get(f"/loki/api/v1/label/{name}/values", {"start": start, "end": end})
+            return {value.lower(): value for value in values}
+        return await self._cached(('values', name), start_ns, end_ns, fetch, refresh)
+
+    async def has_streams(self, selector: str, start_ns: int, end_ns: int) -> bool:
+        """Whether any stream in the window matches a stream selector."""
+        async def fetch(start: int, end: int) -> bool:
+            return bool(await self._get("/loki/api/v1/series", {"match[]": selector, "start": start, "end": end}))
+        return await self._cached(('series', selector), start_ns, end_ns, fetch)
+
+
+async def plan_log_query(pattern: Optional[str], start_ns: int, end_ns: int) -> Optional[str]:
+    """
+    Turn a user filter into the narrowest LogQL query that answers it.
+
+    The pattern is split into terms:
+      - `label=value` with a label Loki knows becomes a stream matcher, so only those
+        streams are scanned (values are matched case-insensitively against the
+        label's known values);
+      - "quoted text" becomes a case-sensitive `|=` filter;
+      - each run of remaining words becomes a case-insensitive phrase filter.
+    Exact filters are placed first so Loki discards most lines before any regex runs.
+    All user text is escaped. Without label metadata, every term is treated as text.
+
+    Args:
+        pattern: User filter, e.g. 'job=sshd failed password "uid=0"'
+        start_ns: Window start (nanoseconds since epoch)
+        end_ns: Window end (nanoseconds since epoch)
+
+    Returns:
+        LogQL query, or None if the label terms match no stream in the window
+    """
+    if not pattern or not pattern.strip():
+        return build_loki_query()
+
+    try:
+        catalog = get_label_catalog()
+        known_labels = await catalog.labels(start_ns, end_ns)
+    except Exception as e:
+        logger.warning(f"Loki label metadata unavailable, filtering on text only: {e}")
+        catalog, known_labels = None, set()
+
+    matchers: Dict[str, str] = {}
+    exact: List[str] = []
+    phrases: List[List[str]] = [[]]
+    for quoted, word in _TERM.findall(pattern):
+        if not word:
+            if quoted:
+                exact.append(quoted)
+            phrases.append([])
+            continue
+        label = _LABEL_TERM.match(word)
+        if label and label.group(1) in known_labels and label.group(1) not in matchers:
+            name, value = label.groups()
+            try:
+                values = await catalog.values(name, start_ns, end_ns)
+                if value.lower() not in values:
+                    # A stream may have appeared since the values were cached
+                    values = await catalog.values(name, start_ns, end_ns, refresh=True)
+            except Exception as e:
+                logger.warning(f"Values of label {name} unavailable, filtering on text: {e}")
+                phrases[-1].append(word)
+                continue
+            if value.lower() not in values:
+                return None
+            matchers[name] = values[value.lower()]
+            phrases.append([])
+        else:
+            phrases[-1].append(word)
+
+    if matchers:
+        selector = '{' + ', '.join(f'{name}={logql_string(value)}' for name, value in sorted(matchers.items())) + '}'
+        # Each value exists on its own; only a combination can match nothing
+        if len(matchers) > 1 and not await _has_streams(catalog, selector, start_ns, end_ns):
+            return None
+    else:
+        selector = build_loki_query()
+
+    query = selector + ''.join(line_filter(text, exact=True) for text in exact)
+    return query + ''.join(line_filter(' '.join(words)) for words in phrases if words)
+
+
+async def _has_streams(catalog: LabelCatalog, selector: str, start_ns: int, end_ns: int) -> bool:
+    try:
+        return await catalog.has_streams(selector, start_ns, end_ns)
+    except Exception as e:
+        logger.warning(f"Loki series lookup failed, assuming {selector} matches: {e}")
+        return True
+
+
+_label_catalog: Optional[LabelCatalog] = None
+
+
+def get_label_catalog() -> LabelCatalog:
+    """Get or create the shared label catalog."""
+    global _label_catalog
+    if _label_catalog is None:
+        _label_catalog = LabelCatalog(
+            ttl_seconds=config.loki.label_cache_seconds,
+            lookback_seconds=config.loki.label_lookback_seconds,
+        )
+    return _label_catalog
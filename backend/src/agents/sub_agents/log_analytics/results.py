@@ -0,0 +1,98 @@
+"""Hand-off of analysis results between agents through session state"""
+import uuid
+from typing import Any, Dict, MutableMapping, Optional
+
+STATE_PREFIX = 'log_analysis:'
+LATEST_KEY = STATE_PREFIX + 'latest'
+HANDLES_KEY = STATE_PREFIX + 'handles'
+
+# Older results are cleared from the session so its state stays small
+MAX_STORED_RESULTS = 10
+
+
+def severity_level(anomaly_score: float) -> str:
+    """Map an anomaly score (0-100) to a severity level."""
+    if anomaly_score > 50:
+        return 'CRITICAL'
+    if anomaly_score > 30:
+        return 'HIGH'
+    if anomaly_score > 10:
+        return 'MEDIUM'
+    return 'LOW'
+
+
+def store_analysis(
+    state: MutableMapping[str, Any],
+    time_range: str,
+    pattern: Optional[str],
+    report: Dict,
+) -> str:
+    """
+    Save the structured result of an analysis in session state.
+
+    Only aggregates are stored (no raw lines or IP lists), so the entry stays small
+    and JSON-serialisable for the database session service. Sub-agents run on a copy
+    of the parent session's state and forward their changes back to it, so a result
+    stored by the log analytics agent can be loaded by the solution agent.
+
+    Args:
+        state: Session state (tool_context.state)
+        time_range: Time range the report covers
+        pattern: Keyword filter used, if any
+        report: Report dict from the analysis
+
+    Returns:
+        Short handle identifying the stored result
+    """
+    handle = f"logs-{uuid.uuid4().hex[:8]}"
+    total_errors = sum(report['error_patterns'].values())
+    state[STATE_PREFIX + handle] = {
+        'time_range': time_range,
+        'pattern': pattern,
+        'total_logs': report['total_logs'],
+        'total_errors': total_errors,
+        'error_patterns': report['error_patterns'],
+        'anomaly_score': report['anomaly_score'],
+        'has_anomaly': report['anomaly_score'] > 10,
+        'severity': severity_level(report['anomaly_score']),
+        'unique_ips': report['unique_ips'],
+        'unique_ips_exact': report.get('unique_ips_exact', True),
+        'top_error_sources': [list(item) for item in report['top_error_sources']],
+        'top_hosts': [list(item) for item in report.get('top_hosts', [])],
+        'top_templates': [
+            {'template': t['template'], 'count': t['count'], 'example': (t['examples'] or [''])[0]}
+            for t in report.get('top_templates', [])
+        ],
+    }
+
+    handles = list(state.get(HANDLES_KEY) or []) + [handle]
+    for expired in handles[:-MAX_STORED_RESULTS]:
+        state[STATE_PREFIX + expired] = None
+    state[HANDLES_KEY] = handles[-MAX_STORED_RESULTS:]
+    state[LATEST_KEY] = handle
+    return handle
+
+
+def resolve_handle(state: MutableMapping[str, Any], handle: Optional[str] = None) -> Optional[str]:
+    """Normalise a handle as the model passes it, mapping "latest" or empty to the most recent."""
+    handle = (handle or '').strip().strip('`')
+    if not handle or handle == 'latest':
+        return state.get(LATEST_KEY) or None
+    return handle
+
+
+def load_analysis(state: MutableMapping[str, Any], handle: Optional[str] = None) -> Optional[Dict]:
+    """
+    Load a stored analysis result.
+
+    Args:
+        state: Session state (tool_context.state)
+        handle: Handle returned by store_analysis; "latest" or empty for the most recent
+
+    Returns:
+        The stored result, or None if the handle is unknown or expired
+    """
+    handle = resolve_handle(state, handle)
+    if not handle:
+        return None
+    return state.get(STATE_PREFIX + handle)
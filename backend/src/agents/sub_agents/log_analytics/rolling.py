@@ -0,0 +1,238 @@
+"""Incremental rolling-window aggregates for repeated "last N minutes" queries"""
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core.config import config
+from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.analyzer import LogAnalyzer
+from agents.sub_agents.log_analytics.batch import LogBatch
+from agents.sub_agents.log_analytics.loki_client import iter_log_window
+
+logger = get_service_logger("log_analytics_rolling")
+
+# How long a query whose retention exceeded the line budget is left alone before
+# warming up again; doubles on each further failure
+_BACKOFF_SECONDS = 60.0
+_MAX_BACKOFF_SECONDS = 3600.0
+
+
+class _Series:
+    """Per-bucket partial aggregates for one LogQL query."""
+
+    def __init__(self, covered_from: int, watermark: int):
+        self.buckets: Dict[int, LogAnalyzer] = {}
+        self.covered_from = covered_from  # first bucket start that was fully fetched
+        self.watermark = watermark  # everything before this has been fetched
+        self.lock = asyncio.Lock()
+
+
+class RollingWindowStore:
+    """
+    Keeps per-bucket LogAnalyzers for recently asked queries.
+
+    A warm series answers a window by fetching only the tail since its watermark and
+    merging the buckets inside the window. Buckets that could still receive late log
+    lines (within `lag_seconds` of the watermark) are re-fetched on every refresh, and
+    buckets older than the retention are dropped.
+
+    A window that starts inside a bucket is answered from the whole buckets after its
+    start plus the raw lines of its partial first bucket, fetched for the request, so
+    the answer covers exactly the window.
+
+    A query whose retention holds more lines than the fetch budget cannot be kept,
+    and warming it up again would pull the whole budget each time, so such queries
+    are not warmed up again until a backoff (doubling up to an hour) has passed.
+
+    Queries can also be followed: a background consumer advances them with `follow()`,
+    and windows on a followed query are answered from memory without contacting Loki
+    as long as the state is no more than `staleness_ns` behind. Followed queries are
+    never evicted.
+    """
+
+    def __init__(self, bucket_seconds: int, retention_seconds: int, lag_seconds: int, max_series: int):
+        self.bucket_ns = bucket_seconds * 1_000_000_000
+        self.retention_ns = retention_seconds * 1_000_000_000
+        self.lag_ns = lag_seconds * 1_000_000_000
+        self.max_series = max_series
+        self._series: "OrderedDict[str, _Series]" = OrderedDict()
+        self._warming: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._followed: Dict[str, int] = {}  # query -> tolerated staleness (ns)
+        self._backoff: Dict[str, Tuple[float, float]] = {}  # query -> (retry at, delay)
+
+    def _align(self, ts: int) -> int:
+        return ts - ts % self.bucket_ns
+
+    async def report(self, query: str, start_ns: int, end_ns: int) -> Optional[Dict]:
+        """
+        Answer a window from rolling state, or return None if the state cannot cover it.
+
+        Args:
+            query: LogQL query
+            start_ns: Window start (nanoseconds since epoch)
+            end_ns: Window end (nanoseconds since epoch)
+
+        Returns:
+            Report dict in the same shape as LogAnalyzer.report(), or None
+        """
+        if end_ns - start_ns > self.retention_ns:
+            return None
+        series = self._series.get(query)
+        if series is None:
+            return None
+        self._series.move_to_end(query)
+
+        start = self._align(start_ns)
+        # First bucket lying wholly inside the window; the one before it is only partly in
+        whole_from = start if start == start_ns else start + self.bucket_ns
+        async with series.lock:
+            if start < series.covered_from:
+                return None
+            stale = end_ns > series.watermark + self._followed.get(query, 0)
+            if stale and not await self._refresh(query, series, end_ns):
+                return None
+
+            merged = LogAnalyzer()
+            for bucket_start in sorted(series.buckets):
+                if whole_from <= bucket_start < end_ns:
+                    merged.merge(series.buckets[bucket_start])
+
+        if whole_from > start_ns:
+            # Counting the whole first bucket would add up to a bucket of lines from
+            # before the window, which can double the totals of a short window
+            head = LogAnalyzer()
+            if not await self._fetch(query, start_ns, min(whole_from, end_ns), head.update_batch):
+                return None
+            merged = head.merge(merged)
+
+        report = merged.report()
+        report['truncated'] = False
+        return report
+
+    async def _refresh(self, query: str, series: _Series, end_ns: int) -> bool:
+        """Fetch the tail since the watermark, re-fetching buckets still open to late lines."""
+        refetch_from = max(self._align(series.watermark - self.lag_ns), series.covered_from)
+        for bucket_start in [b for b in series.buckets if b >= refetch_from]:
+            del series.buckets[bucket_start]
+
+        if not await self._fill(query, series, refetch_from, end_ns):
+            # Budget exhausted: state is incomplete, so stop serving this query from it
+            self._series.pop(query, None)
+            self._back_off(query)
+            return False
+        series.watermark = end_ns
+
+        horizon = self._align(end_ns - self.retention_ns)
+        for bucket_start in [b for b in series.buckets if b < horizon]:
+            del series.buckets[bucket_start]
+        series.covered_from = max(series.covered_from, horizon)
+        return True
+
+    async def _fill(self, query: str, series: _Series, start_ns: int, end_ns: int) -> bool:
+        return await self._fetch(query, start_ns, end_ns, functools.partial(self._add_page, series))
+
+    async def _fetch(self, query: str, start_ns: int, end_ns: int, add: Callable[[LogBatch], object]) -> bool:
+        """Feed the window's lines to `add` page by page; False if the line budget ran out."""
+        max_lines = config.loki.max_lines
+        fetched = 0
+        async for page in iter_log_window(query, start_ns, end_ns, config.loki.page_size, max_lines):
+            fetched += len(page)
+            # A page is CPU-bound work; analyse it off the event loop
+            await asyncio.to_thread(add, page)
+        return fetched < max_lines
+
+    def _add_page(self, series: _Series, page: LogBatch) -> None:
+        for bucket_start, rows in page.group_by_bucket(self.bucket_ns):
+            series.buckets.setdefault(bucket_start, LogAnalyzer()).update_batch(rows)
+
+    def _back_off(self, query: str) -> None:
+        """Skip warm-ups of a query that exceeded the line budget for a while."""
+        now = time.monotonic()
+        for expired in [q for q, (retry_at, _) in self._backoff.items() if retry_at <= now and q != query]:
+            del self._backoff[expired]
+        _, delay = self._backoff.get(query, (0.0, _BACKOFF_SECONDS / 2))
+        delay = min(delay * 2, _MAX_BACKOFF_SECONDS)
+        self._backoff[query] = (now + delay, delay)
+
+    def _backed_off(self, query: str) -> bool:
+        backoff = self._backoff.get(query)
+        return backoff is not None and time.monotonic() < backoff[0]
+
+    async def follow(self, query: str, end_ns: int, staleness_ns: int) -> bool:
+        """
+        Advance a followed query's state to end_ns, building it first if needed.
+
+        Args:
+            query: LogQL query
+            end_ns: Fetch up to this time (nanoseconds since epoch)
+            staleness_ns: How far behind end_ns the state may be when answering windows
+
+        Returns:
+            True if the query's state is now current
+        """
+        self._followed[query] = staleness_ns
+        series = self._series.get(query)
+        if series is None:
+            if query in self._warming:
+                return False  # a warm-up scheduled by a request is already running
+            self._warming.add(query)
+            await self._warm_up(query, end_ns)
+            return query in self._series
+        async with series.lock:
+            return await self._refresh(query, series, end_ns)
+
+    def unfollow(self, query: str) -> None:
+        self._followed.pop(query, None)
+
+    def schedule_warm_up(self, query: str, end_ns: int) -> None:
+        """Build rolling state for a query in the background, covering the retention."""
+        if query in self._series or query in self._warming or self._backed_off(query):
+            return
+        self._warming.add(query)
+        task = asyncio.get_running_loop().create_task(self._warm_up(query, end_ns))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _warm_up(self, query: str, end_ns: int) -> None:
+        try:
+            start = self._align(end_ns - self.retention_ns)
+            series = _Series(covered_from=start, watermark=end_ns)
+            if await self._fill(query, series, start, end_ns):
+                self._series[query] = series
+                self._backoff.pop(query, None)
+                self._evict()
+                logger.info(f"Rolling state ready for {query} ({len(series.buckets)} buckets)")
+            else:
+                self._back_off(query)
+                logger.info(
+                    f"Window for {query} exceeds the line budget; not keeping rolling state "
+                    f"for the next {self._backoff[query][1]:.0f}s"
+                )
+        except Exception as e:
+            logger.warning(f"Rolling warm-up failed for {query}: {e}")
+        finally:
+            self._warming.discard(query)
+
+    def _evict(self) -> None:
+        evictable = [q for q in self._series if q not in self._followed]
+        for query in evictable[:max(0, len(self._series) - self.max_series)]:
+            del self._series[query]
+
+
+_rolling_store: Optional[RollingWindowStore] = None
+
+
+def get_rolling_store() -> RollingWindowStore:
+    """Get or create the shared rolling window store."""
+    global _rolling_store
+    if _rolling_store is None:
+        _rolling_store = RollingWindowStore(
+            bucket_seconds=config.log_analysis.rolling_bucket_seconds,
+            retention_seconds=config.log_analysis.rolling_retention_seconds,
+            lag_seconds=config.log_analysis.rolling_lag_seconds,
+            max_series=config.log_analysis.rolling_max_series,
+        )
+    return _rolling_store
@@ -0,0 +1,161 @@
+"""Online log template mining (Drain-style fixed-depth parse tree)"""
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+WILDCARD = '<*>'
+
+# Runs containing a digit are treated as parameters. '=', ':', brackets and parentheses
+# delimit runs, so "rhost=10.0.0.1" keeps its key and "sshd[412]:" keeps its program.
+# The lookbehind and possessive quantifiers keep the scan linear in the line length.
+_PARAMETER_PATTERN = re.compile(r'(?<![^\s=:\[\]()])[^\s=:\[\]()\d]*+\d[^\s=:\[\]()]*+')
+
+# Leading ISO 8601 or syslog timestamps carry no template information
+_TIMESTAMP_PREFIX = re.compile(r'(?:\d{4}-\d{2}-\d{2}[T ]\S+|[A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2})\s+')
+
+
+class LogTemplate:
+    """One cluster of lines sharing a template."""
+
+    __slots__ = ('id', 'tokens', 'count', 'examples', '_leaf')
+
+    def __init__(self, template_id: int, tokens: List[str], leaf: List["LogTemplate"]):
+        self.id = template_id
+        self.tokens = tokens
+        self.count = 0
+        self.examples: List[str] = []
+        self._leaf = leaf
+
+    @property
+    def template(self) -> str:
+        return ' '.join(self.tokens)
+
+
+class TemplateMiner:
+    """
+    Clusters log lines into templates in a single streaming pass.
+
+    Lines are routed through a tree of `depth` levels (root, token count, the first
+    `depth - 3` tokens, then the leaf), so each line is only compared with the few templates in one
+    leaf. A line joins the most similar template if at least `similarity` of its tokens
+    match, and differing positions become wildcards; otherwise it starts a new template.
+
+    Memory is bounded: at most `max_templates` templates are kept (the least recently
+    matched is evicted), each tree node has at most `max_children` children, and each
+    template keeps at most `max_examples` example lines.
+    """
+
+    def __init__(
+        self,
+        depth: int = 4,
+        similarity: float = 0.4,
+        max_children: int = 100,
+        max_templates: int = 500,
+        max_examples: int = 3,
+    ):
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self.max_examples = max_examples
+        self._root: Dict = {}
+        self._templates: "OrderedDict[int, LogTemplate]" = OrderedDict()
+        self._next_id = 0
+        # Masked lines repeat far more often than raw ones; remembering which template
+        # each one landed in skips the tree walk for repeats
+        self._recent: Dict[str, LogTemplate] = {}
+        # Tree nodes are never removed, so a token path always leads to the same leaf
+        self._leaves: Dict[Tuple[str, ...], List[LogTemplate]] = {}
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def add(self, line: str, count: int = 1) -> LogTemplate:
+        """Assign a raw log line to a template and return it."""
+        prefix = _TIMESTAMP_PREFIX.match(line)
+        masked = _PARAMETER_PATTERN.sub(WILDCARD, line[prefix.end():] if prefix else line)
+        template = self._recent.get(masked)
+        if template is not None and template.id in self._templates:
+            # The template already generalises this exact line, so only the count moves
+            template.count += count
+            self._templates.move_to_end(template.id)
+        else:
+            template = self._insert(masked.split(), count)
+            if len(self._recent) >= 4 * self.max_templates:
+                self._recent.clear()
+            self._recent[masked] = template
+        if len(template.examples) < self.max_examples:
+            template.examples.append(line)
+        return template
+
+    def merge(self, other: "TemplateMiner") -> "TemplateMiner":
+        """Fold another miner's templates into this one."""
+        for template in other._templates.values():
+            merged = self._insert(list(template.tokens), template.count)
+            for example in template.examples:
+                if len(merged.examples) >= self.max_examples:
+                    break
+                merged.examples.append(example)
+        return self
+
+    def top(self, n: int = 20) -> List[Dict]:
+        """The n most frequent templates with their counts and examples."""
+        ranked = sorted(self._templates.values(), key=lambda t: (-t.count, t.template))
+        return [
+            {'template': t.template, 'count': t.count, 'examples': list(t.examples)}
+            for t in ranked[:n]
+        ]
+
+    def _leaf(self, tokens: List[str]) -> List[LogTemplate]:
+        key = (str(len(tokens)), *tokens[:max(self.depth - 3, 0)])
+        leaf = self._leaves.get(key)
+        if leaf is None:
+            if len(self._leaves) >= 4 * self.max_templates:
+                self._leaves.clear()
+            leaf = self._leaves[key] = self._walk(tokens)
+        return leaf
+
+    def _walk(self, tokens: List[str]) -> List[LogTemplate]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:max(self.depth - 3, 0)]:
+            if token not in node:
+                token = token if len(node) < self.max_children - 1 else WILDCARD
+            node = node.setdefault(token, {})
+        return node.setdefault(None, [])
+
+    def _insert(self, tokens: List[str], count: int) -> LogTemplate:
+        leaf = self._leaf(tokens)
+        template = self._best_match(leaf, tokens)
+
+        if template is None:
+            template = LogTemplate(self._next_id, tokens, leaf)
+            self._next_id += 1
+            leaf.append(template)
+            self._templates[template.id] = template
+            self._evict()
+        else:
+            template.tokens = [a if a == b else WILDCARD for a, b in zip(template.tokens, tokens)]
+            self._templates.move_to_end(template.id)
+
+        template.count += count
+        return template
+
+    def _best_match(self, leaf: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        best, best_score, best_wildcards = None, -1.0, -1
+        n = len(tokens) or 1
+        for template in leaf:
+            same = wildcards = 0
+            for a, b in zip(template.tokens, tokens):
+                if a == WILDCARD:
+                    wildcards += 1
+                elif a == b:
+                    same += 1
+            score = same / n
+            if score > best_score or (score == best_score and wildcards > best_wildcards):
+                best, best_score, best_wildcards = template, score, wildcards
+        return best if best is not None and best_score >= self.similarity else None
+
+    def _evict(self) -> None:
+        while len(self._templates) > self.max_templates:
+            _, template = self._templates.popitem(last=False)
+            template._leaf.remove(template)
@@ -1,85 +1,200 @@
 """Merged tools for log retrieval and analysis"""
-from typing import Dict, List, Optional
-import requests
+import asyncio
+from typing import Dict, Optional
+from core.config import config
+from google.adk.tools import ToolContext
 from utils_app.logger import get_service_logger
-from agents.sub_agents.log_analytics.utils import parse_time_range, build_loki_query
-from agents.sub_agents.log_analytics.utils import (
-    extract_error_patterns,
-    calculate_anomaly_score,
-    extract_ip_addresses,
-    get_top_error_sources
-)
+from agents.sub_agents.log_analytics.loki_client import iter_log_window
+from agents.sub_agents.log_analytics.utils import parse_time_range
+from agents.sub_agents.log_analytics.cache import get_report_cache, snap_window
+from agents.sub_agents.log_analytics.metrics import fetch_log_metrics
+from agents.sub_agents.log_analytics.query_planner import plan_log_query
+from agents.sub_agents.log_analytics.parallel import ParallelLogAnalyzer
+from agents.sub_agents.log_analytics.rolling import get_rolling_store
+from agents.sub_agents.log_analytics.results import severity_level, store_analysis
+from agents.sub_agents.log_analytics.local_files import analyze_log_files, resolve_log_files
 
 logger = get_service_logger("log_analytics_agent")
-LOKI_URL = "http://loki:3100"
 
-def fetch_and_analyze_logs(time_range: str, pattern: Optional[str] = None) -> str:
+
+async def _analyze_raw_window(logql_query: str, start_ns: int, end_ns: int) -> Dict:
+    """Pull raw lines page by page, newest first, and analyse them locally."""
+    max_lines = config.loki.max_lines
+    pages = iter_log_window(logql_query, start_ns, end_ns, config.loki.page_size, max_lines, direction="backward")
+    analyzer = ParallelLogAnalyzer()
+    async for page in pages:
+        await analyzer.add(page)
+    report = (await analyzer.result()).report()
+    report['truncated'] = report['total_logs'] >= max_lines
+    return report
+
+
+async def _build_report(logql_query: str, start_ns: int, end_ns: int) -> Dict:
+    """
+    Build a report from the cheapest source that can answer the window.
+
+    Warm rolling state only needs the tail since its last fetch. Otherwise Loki counts
+    with metric queries (while rolling state warms up in the background), and raw lines
+    are pulled only if metric queries fail. A failure of one source falls through to
+    the next.
+    """
+    if config.log_analysis.rolling_enabled:
+        rolling = get_rolling_store()
+        try:
+            report = await rolling.report(logql_query, start_ns, end_ns)
+            if report is not None:
+                return report
+            if end_ns - start_ns <= rolling.retention_ns:
+                rolling.schedule_warm_up(logql_query, end_ns)
+        except Exception as e:
+            logger.warning(f"Rolling state could not answer the window, falling back to Loki: {e}")
+
+    if config.loki.metric_queries:
+        try:
+            return await fetch_log_metrics(logql_query, start_ns, end_ns)
+        except Exception as e:
+            logger.warning(f"Loki metric queries failed, analysing raw lines instead: {e}")
+    return await _analyze_raw_window(logql_query, start_ns, end_ns)
+
+
+def _format_report(time_range: str, report: Dict) -> str:
+    """Render an analysis report as the markdown summary returned to the agent."""
+    error_patterns = report['error_patterns']
+    anomaly_score = report['anomaly_score']
+    top_sources = report['top_error_sources']
+
+    severity = severity_level(anomaly_score)
+
+    summary = [
+        f"### Log Analytics Report ({time_range})",
+        f"- **Total Logs**: {report['total_logs']}",
+        f"- **Anomaly Score**: {anomaly_score}%",
+        f"- **Severity Level**: {severity}",
+        f"- **Unique IPs**: {'' if report.get('unique_ips_exact', True) else '~'}{report['unique_ips']}",
+        "",
+        "**Error Patterns Detected:**" if error_patterns else "**No common error patterns detected.**",
+    ]
+    if report.get('truncated'):
+        summary.insert(2, f"- **Note**: Line budget of {config.loki.max_lines} reached; only the most recent lines of the window were analyzed.")
+
+    for p, count in list(error_patterns.items())[:5]:
+        summary.append(f"- {p.replace('_', ' ').title()}: {count} occurrences")
+
+    if top_sources:
+        summary.append("\n**Top Error Sources:**")
+        for source, count in top_sources[:3]:
+            summary.append(f"- {source}: {count} errors")
+
+    if report.get('top_hosts'):
+        summary.append("\n**Logs by Host:**")
+        for host, count in report['top_hosts'][:3]:
+            summary.append(f"- {host}: {count} lines")
+
+    if report.get('top_templates'):
+        sampled = report.get('template_sample')
+        if sampled:
+            summary.append(f"\n**Top Error Templates** (from the {sampled} most recent error lines):")
+        elif not report.get('templates_exact', True):
+            summary.append("\n**Top Error Templates** (counts estimated from a sample of error lines):")
+        else:
+            summary.append("\n**Top Error Templates:**")
+        for i, template in enumerate(report['top_templates']):
+            summary.append(f"- {template['count']}x `{template['template'][:200]}`")
+            if i < 3 and template['examples']:
+                summary.append(f"  - e.g. `{template['examples'][0][:200]}`")
+
+    if anomaly_score > 10:
+        summary.append("\n⚠️ **Anomalies detected!** Further investigation recommended.")
+    else:
+        summary.append("\n✅ System appears stable.")
+
+    return "\n".join(summary)
+
+
+async def fetch_and_analyze_logs(
+    time_range: str,
+    pattern: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None,
+) -> str:
     """
     Fetches logs from Loki and performs immediate anomaly analysis.
-    
+
+    The structured result is stored in session state, and the summary ends with a
+    handle the solution agent can use to load it.
+
     Args:
         time_range: Natural language time range (e.g., "last 15 minutes", "last 1 hour")
-        pattern: Optional keyword pattern to filter logs
-        
+        pattern: Optional filter: keywords (case-insensitive), "quoted text" (exact)
+            and label=value terms to narrow the streams (e.g., 'job=sshd failed password')
+
     Returns:
         A comprehensive human-readable summary of logs and analysis.
     """
     try:
-        # 1. Fetch Logs
+        pattern = pattern.strip() if pattern else None
         start_time, end_time = parse_time_range(time_range)
-        logql_query = f'{{job=~".+"}} |~ "(?i){pattern}"' if pattern else build_loki_query()
-        
-        url = f"{LOKI_URL}/loki/api/v1/query_range"
-        params = {'query': logql_query, 'start': start_time, 'end': end_time, 'limit': 1000}
-        
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        logs = []
-        if data.get('status') == 'success' and data.get('data', {}).get('result'):
-            for stream in data['data']['result']:
-                stream_labels = stream.get('stream', {})
-                for value in stream.get('values', []):
-                    logs.append({'timestamp': value[0], 'line': value[1], 'labels': stream_labels})
-
-        if not logs:
+        start_time, end_time = snap_window(start_time, end_time, config.log_analysis.cache_bucket_seconds)
+        logql_query = await plan_log_query(pattern, start_time, end_time)
+        if logql_query is None:
+            return f"No logs found for {time_range}: no streams match the labels in '{pattern}'"
+
+        cache_key = (end_time - start_time, end_time, logql_query)
+        report = await get_report_cache().get_or_compute(
+            cache_key, lambda: _build_report(logql_query, start_time, end_time)
+        )
+
+        if not report['total_logs']:
             return f"No logs found for {time_range}" + (f" matching pattern '{pattern}'" if pattern else "")
 
-        # 2. Analyze Logs
-        error_patterns = extract_error_patterns(logs)
-        anomaly_score = calculate_anomaly_score(logs, error_patterns)
-        ip_addresses = extract_ip_addresses(logs)
-        top_sources = get_top_error_sources(logs)
-        
-        severity = 'CRITICAL' if anomaly_score > 50 else 'HIGH' if anomaly_score > 30 else 'MEDIUM' if anomaly_score > 10 else 'LOW'
-        
-        # 3. Format Response
-        summary = [
-            f"### Log Analytics Report ({time_range})",
-            f"- **Total Logs**: {len(logs)}",
-            f"- **Anomaly Score**: {anomaly_score}%",
-            f"- **Severity Level**: {severity}",
-            f"- **Unique IPs**: {len(ip_addresses)}",
-            "",
-            "**Error Patterns Detected:**" if error_patterns else "**No common error patterns detected.**",
-        ]
-        
-        for p, count in list(error_patterns.items())[:5]:
-            summary.append(f"- {p.replace('_', ' ').title()}: {count} occurrences")
-            
-        if top_sources:
-            summary.append("\n**Top Error Sources:**")
-            for source, count in top_sources[:3]:
-                summary.append(f"- {source}: {count} errors")
-        
-        if anomaly_score > 10:
-            summary.append("\n⚠️ **Anomalies detected!** Further investigation recommended.")
-        else:
-            summary.append("\n✅ System appears stable.")
+        summary = _format_report(time_range, report)
+        if tool_context is not None:
+            handle = store_analysis(tool_context.state, time_range, pattern, report)
+            summary += f"\n\nAnalysis handle: `{handle}`"
+        return summary
 
-        return "\n".join(summary)
-        
     except Exception as e:
         logger.error(f"Error in fetch_and_analyze_logs: {e}")
         return f"failed to analyze logs: {str(e)}"
+
+
+async def analyze_log_file(
+    file_pattern: str,
+    time_range: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None,
+) -> str:
+    """
+    Analyzes local log files (plain or gzip-rotated) directly, without going through Loki.
+
+    Use this for offline or post-mortem analysis of files in the log directory.
+
+    Args:
+        file_pattern: File name or glob inside the log directory (e.g., "linux.log", "linux.log*")
+        time_range: Optional range ending at the newest line in the files (e.g., "last 1 hour")
+
+    Returns:
+        A comprehensive human-readable summary of the files and analysis.
+    """
+    try:
+        paths = resolve_log_files(file_pattern)
+        if not paths:
+            return f"No log files matching '{file_pattern}' in {config.log_analysis.local_log_dir}"
+
+        duration = None
+        if time_range:
+            start_time, end_time = parse_time_range(time_range)
+            duration = (end_time - start_time) // 1_000_000_000
+
+        report = await asyncio.to_thread(analyze_log_files, paths, duration)
+        label = ", ".join(report['files']) + (f", {time_range}" if time_range else "")
+        if not report['total_logs']:
+            return f"No log lines found in {label}"
+
+        summary = _format_report(label, report)
+        if tool_context is not None:
+            handle = store_analysis(tool_context.state, label, None, report)
+            summary += f"\n\nAnalysis handle: `{handle}`"
+        return summary
+
+    except Exception as e:
+        logger.error(f"Error in analyze_log_file: {e}")
+        return f"failed to analyze log files: {str(e)}"
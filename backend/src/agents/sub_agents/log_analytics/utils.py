@@ -1,132 +1,151 @@
 """Utility functions for log analysis agent"""
-from typing import Dict, List
+from typing import Dict, List, Tuple, Union
 import re
+import time
 from collections import Counter
+from agents.sub_agents.log_analytics.analyzer import (
+    DEFAULT_RULES,
+    RHOST_PATTERN,
+    anomaly_score_from_counts,
+    find_ip_addresses,
+)
+from agents.sub_agents.log_analytics.batch import LogBatch
 
+Logs = Union[LogBatch, List[Dict]]
 
-def extract_error_patterns(logs: List[Dict]) -> Dict:
+_TIME_UNITS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hr': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+    'w': 604800, 'week': 604800,
+}
+_TIME_RANGE_PATTERN = re.compile(r'(\d+)?\s*([a-z]+?)s?$')
+
+
+def parse_time_range(time_range: str) -> Tuple[int, int]:
+    """
+    Convert a natural language time range into Loki nanosecond timestamps.
+    
+    Args:
+        time_range: e.g. "last 15 minutes", "past 2 hours", "last hour", "30m"
+        
+    Returns:
+        Tuple of (start_ns, end_ns)
+    """
+    text = time_range.lower().strip()
+    for prefix in ('last', 'past', 'previous'):
+        if text.startswith(prefix):
+            text = text[len(prefix):].strip()
+            break
+    
+    match = _TIME_RANGE_PATTERN.match(text)
+    if not match or match.group(2) not in _TIME_UNITS:
+        raise ValueError(f"Unrecognized time range: '{time_range}'")
+    
+    amount = int(match.group(1) or 1)
+    seconds = amount * _TIME_UNITS[match.group(2)]
+    end_ns = time.time_ns()
+    return end_ns - seconds * 1_000_000_000, end_ns
+
+
+def build_loki_query(job: str = ".+") -> str:
+    """
+    Build the default LogQL stream selector.
+    
+    Args:
+        job: Regex for the job label
+        
+    Returns:
+        LogQL query string
+    """
+    return f'{{job=~"{job}"}}'
+
+
+def as_log_batch(logs: Logs) -> LogBatch:
+    """Accept either a LogBatch or legacy list of entry dicts and return a LogBatch."""
+    return logs if isinstance(logs, LogBatch) else LogBatch.from_entries(logs)
+
+
+def extract_error_patterns(logs: Logs) -> Dict:
     """
     Extract common error patterns from logs.
     
     Args:
-        logs: List of log entries
+        logs: LogBatch or list of log entries
         
     Returns:
         Dictionary with error patterns and counts
     """
-    error_patterns = {
-        'authentication_failure': 0,
-        'connection_timeout': 0,
-        'permission_denied': 0,
-        'service_unavailable': 0,
-        'database_error': 0,
-        'unknown_user': 0,
-        'failed_login': 0,
-        'alert_exit': 0,
-        'other_errors': 0
-    }
+    error_patterns = dict.fromkeys(DEFAULT_RULES.categories, 0)
+    classify = DEFAULT_RULES.classify
     
-    for log in logs:
-        line = log.get('line', '').lower()
-        
-        if 'authentication failure' in line or 'auth' in line and 'fail' in line:
-            error_patterns['authentication_failure'] += 1
-        elif 'timeout' in line or 'timed out' in line:
-            error_patterns['connection_timeout'] += 1
-        elif 'permission denied' in line or 'denied' in line:
-            error_patterns['permission_denied'] += 1
-        elif 'unavailable' in line or 'down' in line:
-            error_patterns['service_unavailable'] += 1
-        elif 'database' in line and ('error' in line or 'fail' in line):
-            error_patterns['database_error'] += 1
-        elif 'user unknown' in line or 'unknown user' in line:
-            error_patterns['unknown_user'] += 1
-        elif 'failed' in line and ('login' in line or 'logon' in line):
-            error_patterns['failed_login'] += 1
-        elif 'alert' in line and 'exit' in line:
-            error_patterns['alert_exit'] += 1
-        elif 'error' in line or 'fail' in line or 'critical' in line:
-            error_patterns['other_errors'] += 1
+    for line in as_log_batch(logs).lines():
+        category = classify(line.lower())
+        if category is not None:
+            error_patterns[category] += 1
     
     return {k: v for k, v in error_patterns.items() if v > 0}
 
 
-def calculate_anomaly_score(logs: List[Dict], error_patterns: Dict) -> float:
+def calculate_anomaly_score(logs: Logs, error_patterns: Dict) -> float:
     """
     Calculate anomaly score based on error patterns.
     
     Args:
-        logs: List of log entries
+        logs: LogBatch or list of log entries
         error_patterns: Dictionary of error patterns and counts
         
     Returns:
         Anomaly score (0-100)
     """
-    if not logs:
-        return 0.0
-    
-    total_logs = len(logs)
-    total_errors = sum(error_patterns.values())
-    
-    # Calculate error rate
-    error_rate = (total_errors / total_logs) * 100 if total_logs > 0 else 0
-    
-    # Weight certain critical errors higher
-    critical_errors = (
-        error_patterns.get('authentication_failure', 0) +
-        error_patterns.get('database_error', 0) +
-        error_patterns.get('service_unavailable', 0)
-    )
-    
-    critical_rate = (critical_errors / total_logs) * 100 if total_logs > 0 else 0
-    
-    # Anomaly score: weighted combination
-    anomaly_score = min(100, (error_rate * 0.6) + (critical_rate * 0.4))
-    
-    return round(anomaly_score, 2)
+    return anomaly_score_from_counts(len(logs), error_patterns)
 
 
-def extract_ip_addresses(logs: List[Dict]) -> List[str]:
+def extract_ip_addresses(logs: Logs) -> List[str]:
     """
     Extract unique IP addresses from logs.
     
     Args:
-        logs: List of log entries
+        logs: LogBatch or list of log entries
         
     Returns:
         List of unique IP addresses
     """
-    ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-    ips = []
-    
-    for log in logs:
-        line = log.get('line', '')
-        matches = re.findall(ip_pattern, line)
-        ips.extend(matches)
-    
-    return list(set(ips))
+    return list(find_ip_addresses(as_log_batch(logs).text))
 
 
-def get_top_error_sources(logs: List[Dict], top_n: int = 5) -> List[tuple]:
+def get_top_error_sources(logs: Logs, top_n: int = 5) -> List[tuple]:
     """
     Get top error sources (IPs or hostnames).
     
     Args:
-        logs: List of log entries
+        logs: LogBatch or list of log entries
         top_n: Number of top sources to return
         
     Returns:
         List of tuples (source, count)
     """
-    sources = []
+    return count_error_sources(logs).most_common(top_n)
+
+
+def count_error_sources(logs: Logs) -> Counter:
+    """
+    Count every error source (rhost= value) in the logs.
     
-    for log in logs:
-        line = log.get('line', '')
-        # Extract IP addresses
-        ip_pattern = r'rhost=([^\s]+)'
-        match = re.search(ip_pattern, line)
-        if match:
-            sources.append(match.group(1))
+    Args:
+        logs: LogBatch or list of log entries
+        
+    Returns:
+        Counter of source -> occurrences
+    """
+    sources = Counter()
     
-    source_counts = Counter(sources)
-    return source_counts.most_common(top_n)
+    for line in as_log_batch(logs).lines():
+        if 'rhost=' in line:
+            match = RHOST_PATTERN.search(line)
+            if match:
+                sources[match.group(1)] += 1
+    
+    return sources
+
@@ -0,0 +1,287 @@
+"""On-disk store of past incidents, searchable by fingerprint and description"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from core.config import config
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("incident_store")
+
+# Fingerprints are hashed into a fixed-width vector so incidents compare with one matmul
+FEATURE_DIM = 1024
+
+Embedder = Callable[[List[str]], np.ndarray]
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def _feature_slot(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), 'little') % FEATURE_DIM
+
+
+def fingerprint_vector(analysis: Dict) -> np.ndarray:
+    """
+    Hash an analysis summary's error categories, templates, sources and severity into a
+    unit vector. Each group is weighted by its share within the group, so incidents
+    with the same mix of errors score close to 1 whatever their volume.
+    """
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+
+    def add(prefix: str, counts: Dict[str, float], weight: float) -> None:
+        total = sum(counts.values())
+        for key, count in counts.items():
+            if total:
+                vector[_feature_slot(f"{prefix}:{key}")] += weight * count / total
+
+    add('category', analysis.get('error_patterns') or {}, 1.0)
+    add('template', {t['template']: t['count'] for t in analysis.get('top_templates') or []}, 1.0)
+    add('source', {source: count for source, count in analysis.get('top_error_sources') or []}, 0.5)
+    if analysis.get('severity'):
+        add('severity', {analysis['severity']: 1}, 0.25)
+    return _unit(vector)
+
+
+def fingerprint_key(analysis: Dict) -> str:
+    """Exact-match key: primary error category, most frequent template and severity."""
+    patterns = analysis.get('error_patterns') or {}
+    templates = analysis.get('top_templates') or []
+    parts = [
+        max(patterns, key=patterns.get) if patterns else '',
+        templates[0]['template'] if templates else '',
+        analysis.get('severity', ''),
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()[:16]
+
+
+class _Matrix:
+    """A float32 row matrix mirrored to an append-only file."""
+
+    def __init__(self, path: str, width: int):
+        self.path = path
+        self.width = width
+        data = np.fromfile(path, dtype=np.float32) if os.path.exists(path) else np.zeros(0, np.float32)
+        self.rows = len(data) // width
+        self._data = np.zeros((max(64, 2 * self.rows), width), dtype=np.float32)
+        self._data[:self.rows] = data[:self.rows * width].reshape(-1, width)
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[:self.rows]
+
+    def append(self, row: np.ndarray) -> None:
+        if self.rows == len(self._data):
+            grown = np.zeros((2 * len(self._data), self.width), dtype=np.float32)
+            grown[:self.rows] = self._data[:self.rows]
+            self._data = grown
+        self._data[self.rows] = row
+        self.rows += 1
+        with open(self.path, 'ab') as f:
+            f.write(row.astype(np.float32).tobytes())
+
+    def truncate(self, rows: int) -> None:
+        """Keep the first `rows` rows, dropping any partial row left on disk."""
+        self.rows = min(self.rows, rows)
+        with open(self.path, 'ab') as f:
+            f.truncate(self.rows * self.width * 4)
+
+
+class IncidentStore:
+    """
+    Past incidents persisted under one directory.
+
+    - incidents.jsonl: one JSON record per incident, appended
+    - fingerprints.f32 / embeddings.f32: one float32 row per incident, appended
+
+    Everything is loaded into memory at start-up and inserts append to both memory and
+    disk, so a search is two matrix-vector products over all incidents (well under a
+    millisecond for thousands) and an insert is three small appends. Incidents are also
+    indexed by an exact fingerprint key. Writes are expected from one process.
+    """
+
+    def __init__(self, path: str, embed: Embedder, embedding_weight: float = 0.6):
+        self.path = path
+        self.embed = embed
+        self.embedding_weight = embedding_weight
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        self.records: List[Dict] = []
+        self._records_path = os.path.join(path, 'incidents.jsonl')
+        torn = False
+        if os.path.exists(self._records_path):
+            with open(self._records_path) as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        torn = True
+                        break
+        self._meta_path = os.path.join(path, 'meta.json')
+        meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        self.embedding_dim: Optional[int] = meta.get('embedding_dim')
+
+        self._fingerprints = _Matrix(os.path.join(path, 'fingerprints.f32'), FEATURE_DIM)
+        self._embeddings = (
+            _Matrix(os.path.join(path, 'embeddings.f32'), self.embedding_dim) if self.embedding_dim else None
+        )
+        # An interrupted insert leaves the files at different lengths; keep the rows all have
+        rows = min(len(self.records), self._fingerprints.rows)
+        if self._embeddings is not None:
+            rows = min(rows, self._embeddings.rows)
+        self._fingerprints.truncate(rows)
+        if self._embeddings is not None:
+            self._embeddings.truncate(rows)
+        if torn or len(self.records) > rows:
+            self.records = self.records[:rows]
+            with open(self._records_path, 'w') as f:
+                f.writelines(json.dumps(record) + '\n' for record in self.records)
+
+        self._by_key: Dict[str, List[int]] = {}
+        self._handles: Dict[str, int] = {}
+        for i, record in enumerate(self.records):
+            self._by_key.setdefault(record['fingerprint'], []).append(i)
+            if record.get('handle'):
+                self._handles[record['handle']] = i
+        logger.info(f"Incident store at {path} loaded with {len(self.records)} incidents")
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _embed(self, text: str) -> np.ndarray:
+        try:
+            vector = np.asarray(self.embed([text])[0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Could not embed incident description, matching on fingerprint only: {e}")
+            return np.zeros(self.embedding_dim or 0, dtype=np.float32)
+        return _unit(vector)
+
+    def add(self, description: str, analysis: Dict, solution: str = '', handle: Optional[str] = None) -> Optional[int]:
+        """
+        Record an incident.
+
+        Args:
+            description: What happened, e.g. the root cause found
+            analysis: Stored analysis summary (see log_analytics.results)
+            solution: Recommended resolution
+            handle: Analysis handle; an analysis is recorded at most once
+
+        Returns:
+            Index of the new incident, or None if the handle was already recorded
+        """
+        embedding = self._embed(description)
+        with self._lock:
+            if handle is not None and handle in self._handles:
+                return None
+            if self._embeddings is None and len(embedding):
+                self.embedding_dim = len(embedding)
+                with open(self._meta_path, 'w') as f:
+                    json.dump({'embedding_dim': self.embedding_dim}, f)
+                self._embeddings = _Matrix(os.path.join(self.path, 'embeddings.f32'), self.embedding_dim)
+                self._embeddings.truncate(0)
+                # Incidents recorded before any embedding was available get zero rows
+                for _ in self.records:
+                    self._embeddings.append(np.zeros(self.embedding_dim, dtype=np.float32))
+            if self._embeddings is not None and len(embedding) != self.embedding_dim:
+                embedding = np.zeros(self.embedding_dim, dtype=np.float32)
+
+            record = {
+                'id': len(self.records),
+                'handle': handle,
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'fingerprint': fingerprint_key(analysis),
+                'description': description,
+                'solution': solution,
+                'severity': analysis.get('severity'),
+                'anomaly_score': analysis.get('anomaly_score'),
+                'error_patterns': analysis.get('error_patterns') or {},
+                'top_template': ((analysis.get('top_templates') or [{}])[0]).get('template'),
+            }
+            self._fingerprints.append(fingerprint_vector(analysis))
+            if self._embeddings is not None:
+                self._embeddings.append(embedding)
+            with open(self._records_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+            self.records.append(record)
+            self._by_key.setdefault(record['fingerprint'], []).append(record['id'])
+            if handle is not None:
+                self._handles[handle] = record['id']
+            return record['id']
+
+    def search(
+        self,
+        description: str,
+        analysis: Optional[Dict] = None,
+        top_k: int = 3,
+        exclude_handle: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Find the past incidents most similar to a description and, if given, an analysis.
+
+        The score is a weighted sum of description cosine similarity and fingerprint
+        cosine similarity (`embedding_weight` on the former); without an analysis only
+        the description counts. Incidents with the same exact fingerprint rank first.
+
+        Returns:
+            Up to top_k incident records, each with `similarity` and `same_fingerprint`
+        """
+        with self._lock:
+            n = len(self.records)
+            if not n:
+                return []
+            embeddings = self._embeddings.view if self._embeddings is not None else None
+            fingerprints = self._fingerprints.view
+            records = self.records[:n]
+            same = set(self._by_key.get(fingerprint_key(analysis), [])) if analysis else set()
+            excluded = self._handles.get(exclude_handle) if exclude_handle else None
+
+        scores = np.zeros(n, dtype=np.float32)
+        weight = self.embedding_weight if analysis else 1.0
+        query = self._embed(description)
+        if embeddings is not None and len(query) == embeddings.shape[1]:
+            scores += weight * (embeddings[:n] @ query)
+        if analysis:
+            scores += (1 - weight) * (fingerprints[:n] @ fingerprint_vector(analysis))
+        ranked = scores.copy()
+        ranked[list(same)] += 1
+        if excluded is not None:
+            ranked[excluded] = -np.inf
+
+        k = min(top_k, n)
+        best = np.argpartition(-ranked, k - 1)[:k]
+        best = best[np.argsort(-ranked[best])]
+        return [
+            {**records[i], 'similarity': round(float(scores[i]), 3), 'same_fingerprint': int(i) in same}
+            for i in best if np.isfinite(ranked[i])
+        ]
+
+
+def _embed_with_model(texts: List[str]) -> np.ndarray:
+    from utils_app.vector_store import get_embeddings_model
+    return get_embeddings_model().encode(texts)
+
+
+_incident_store: Optional[IncidentStore] = None
+
+
+def get_incident_store() -> IncidentStore:
+    """Get or create the shared incident store."""
+    global _incident_store
+    if _incident_store is None:
+        _incident_store = IncidentStore(
+            path=config.incidents.path,
+            embed=_embed_with_model,
+            embedding_weight=config.incidents.embedding_weight,
+        )
+    return _incident_store
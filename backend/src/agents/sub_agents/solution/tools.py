@@ -1,6 +1,10 @@
 """Tools for solution agent"""
-from typing import Dict, List
+from typing import Dict, List, Optional
+from core.config import config
+from google.adk.tools import ToolContext
 from utils_app.logger import get_service_logger
+from agents.sub_agents.log_analytics.results import load_analysis, resolve_handle
+from agents.sub_agents.solution.incidents import get_incident_store
 from agents.sub_agents.solution.utils import (
     format_solution_response,
     get_solution_for_pattern
@@ -9,18 +13,28 @@ from agents.sub_agents.solution.utils import (
 logger = get_service_logger("solution_agent")
 
 
-def analyze_root_cause(anomalies: Dict, logs: List[Dict]) -> str:
+def _missing_analysis(analysis_handle: str) -> str:
+    return (
+        f"No log analysis found for handle '{analysis_handle}'. "
+        "Run the log analytics agent first and pass the handle it returns."
+    )
+
+
+def analyze_root_cause(analysis_handle: str, tool_context: ToolContext) -> str:
     """
     Analyze the root cause of detected anomalies.
     
     Args:
-        anomalies: Anomaly detection results from log analysis agent
-        logs: Original log entries
+        analysis_handle: Handle returned by the log analytics agent (e.g. "logs-1a2b3c4d"), or "latest"
         
     Returns:
         Root cause description
     """
     try:
+        anomalies = load_analysis(tool_context.state, analysis_handle)
+        if anomalies is None:
+            return _missing_analysis(analysis_handle)
+
         if not anomalies.get('has_anomaly'):
             return "No anomalies detected. System appears to be functioning normally."
         
@@ -49,6 +63,10 @@ def analyze_root_cause(anomalies: Dict, logs: List[Dict]) -> str:
             if top_sources:
                 top_source, source_count = top_sources[0]
                 root_cause += f" Primary source: {top_source} ({source_count} occurrences)."
+
+            templates = anomalies.get('top_templates', [])
+            if templates:
+                root_cause += f" Most frequent error: `{templates[0]['template']}` ({templates[0]['count']} occurrences)."
             
             return root_cause
         
@@ -59,18 +77,22 @@ def analyze_root_cause(anomalies: Dict, logs: List[Dict]) -> str:
         return f"Error analyzing root cause: {str(e)}"
 
 
-def generate_solution(root_cause: str, anomalies: Dict) -> str:
+def generate_solution(root_cause: str, analysis_handle: str, tool_context: ToolContext) -> str:
     """
     Generate actionable solutions based on root cause analysis.
     
     Args:
         root_cause: Identified root cause
-        anomalies: Anomaly detection results
+        analysis_handle: Handle returned by the log analytics agent (e.g. "logs-1a2b3c4d"), or "latest"
         
     Returns:
         Formatted solution recommendations
     """
     try:
+        anomalies = load_analysis(tool_context.state, analysis_handle)
+        if anomalies is None:
+            return _missing_analysis(analysis_handle)
+
         error_patterns = anomalies.get('error_patterns', {})
         
         if not error_patterns:
@@ -98,6 +120,15 @@ def generate_solution(root_cause: str, anomalies: Dict) -> str:
         formatted_solution = format_solution_response(root_cause, solutions, additional_info)
         
         logger.info(f"Generated solution for {error_type} with {len(solutions)} recommendations")
+
+        # Record the finished analysis so later incidents can find it
+        try:
+            get_incident_store().add(
+                root_cause, anomalies, solution="; ".join(solutions),
+                handle=resolve_handle(tool_context.state, analysis_handle),
+            )
+        except Exception as e:
+            logger.warning(f"Could not record incident: {e}")
         
         return formatted_solution
         
@@ -106,23 +137,45 @@ def generate_solution(root_cause: str, anomalies: Dict) -> str:
         return f"Error generating solution: {str(e)}"
 
 
-def search_similar_issues(issue_description: str) -> List[Dict]:
+def search_similar_issues(
+    issue_description: str,
+    analysis_handle: str = "latest",
+    tool_context: Optional[ToolContext] = None,
+) -> List[Dict]:
     """
-    Search for similar past issues (placeholder for future knowledge base integration).
+    Search past incidents for issues similar to the current one.
     
     Args:
-        issue_description: Description of the current issue
+        issue_description: Description of the current issue (e.g. the root cause)
+        analysis_handle: Handle returned by the log analytics agent, or "latest"; its error
+            fingerprint is matched as well as the description
         
     Returns:
         List of similar issues with solutions
     """
-    # Placeholder: In future, this would query a knowledge base or incident database
     logger.info(f"Searching for similar issues: {issue_description}")
-    
-    return [
-        {
-            'title': 'Similar issue search not yet implemented',
-            'description': 'This feature will be integrated with the incident knowledge base in the future.',
-            'solution': 'Use the current root cause analysis and generated solutions.'
-        }
-    ]
+    try:
+        handle, analysis = None, None
+        if tool_context is not None:
+            handle = resolve_handle(tool_context.state, analysis_handle)
+            analysis = load_analysis(tool_context.state, handle)
+
+        matches = get_incident_store().search(
+            issue_description, analysis, top_k=config.incidents.top_k, exclude_handle=handle
+        )
+        if not matches:
+            return [{'title': 'No similar past incidents found', 'description': '', 'solution': ''}]
+
+        return [
+            {
+                'title': f"{match['severity'] or 'Past'} incident recorded {match['recorded_at']}",
+                'description': match['description'],
+                'solution': match['solution'],
+                'similarity': match['similarity'],
+                'same_fingerprint': match['same_fingerprint'],
+            }
+            for match in matches
+        ]
+    except Exception as e:
+        logger.error(f"Error in search_similar_issues: {e}")
+        return [{'title': 'Similar issue search failed', 'description': str(e), 'solution': ''}]
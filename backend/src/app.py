@@ -4,6 +4,7 @@ from typing import Optional
 import uvicorn
 from pydantic import BaseModel
 import os
+import asyncio
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,7 +13,16 @@ load_dotenv()
 # Import the agents router
 from agents.backend import router as agents_router
 from login.backend import router as login_router
+from documents.backend import router as documents_router
 from database.core import engine, Base
+from tables.documents import Document, DocumentChunk  # registers the catalog tables for create_all
+from agents.sub_agents.log_analytics.loki_client import close_loki_client
+from agents.sub_agents.log_analytics.parallel import shutdown_analysis_executor
+from agents.sub_agents.log_analytics.live import start_live_consumer, stop_live_consumer
+from core.config import config
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("app")
 
 app = FastAPI(title="Log Monitoring API", version="1.0.0")
 
@@ -28,9 +38,36 @@ app.add_middleware(
 # Include the agents router which contains the /log_monitoring endpoint
 app.include_router(agents_router)
 app.include_router(login_router)
+app.include_router(documents_router)
 @app.on_event("startup")
 def startup():
     Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+async def start_log_consumer():
+    start_live_consumer()
+@app.on_event("startup")
+async def load_embedding_model():
+    # Load the model before serving, so the first knowledge base query is not the slow one
+    if config.embeddings.preload:
+        try:
+            from utils_app.vector_store import get_embeddings_model
+            await asyncio.to_thread(get_embeddings_model)
+        except Exception as e:
+            logger.warning(f"Embedding model not preloaded, it will load on first use: {e}")
+@app.on_event("startup")
+async def connect_knowledge_base():
+    # Connect before serving; on failure document endpoints answer 503 and retry on each use
+    from utils_app.vector_store import init_knowledge_base
+    try:
+        backend = await asyncio.to_thread(init_knowledge_base)
+        logger.info(f"Knowledge base backend: {backend}")
+    except Exception as e:
+        logger.error(f"Knowledge base not available, document search and uploads will fail until it is: {e}")
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_live_consumer()
+    await close_loki_client()
+    shutdown_analysis_executor()
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -17,6 +17,176 @@ class MCPConfig(BaseModel):
     )
 
 
+class LokiConfig(BaseModel):
+    url: str = Field(default="http://loki:3100", description="Base URL of the Loki server")
+    page_size: int = Field(
+        default=5000, description="Lines requested per query_range page"
+    )
+    max_lines: int = Field(
+        default=100000, description="Line budget for a single fetch across all pages"
+    )
+    timeout: float = Field(default=30.0, description="Per-request timeout in seconds")
+    max_connections: int = Field(
+        default=20, description="Keep-alive connection pool size for the Loki client"
+    )
+    max_concurrency: int = Field(
+        default=8, description="Maximum in-flight Loki requests across all tools"
+    )
+    metric_queries: bool = Field(
+        default=True,
+        description="Compute counts with LogQL metric queries instead of pulling raw lines",
+    )
+    sample_size: int = Field(
+        default=200, description="Raw lines fetched as a sample alongside metric queries"
+    )
+    host_label: str = Field(default="hostname", description="Stream label naming the host")
+    split_seconds: int = Field(
+        default=300, description="Raw-line windows longer than this are fetched as aligned slices"
+    )
+    split_concurrency: int = Field(
+        default=8, description="Slices of one window fetched at the same time"
+    )
+    label_cache_seconds: float = Field(
+        default=300.0, description="How long label names, values and series are cached"
+    )
+    label_lookback_seconds: int = Field(
+        default=86400, description="Minimum time range label metadata is fetched for"
+    )
+    retention_seconds: int = Field(
+        default=31 * 86400, description="How far back Loki keeps logs (Loki's retention_period)"
+    )
+
+
+class LogAnalysisConfig(BaseModel):
+    parallel_threshold: int = Field(
+        default=25000,
+        description="Lines in one fetch above which analysis fans out to a process pool "
+        "(keep well below loki.max_lines, or the pool never engages)",
+    )
+    shard_size: int = Field(
+        default=50000, description="Maximum lines per shard sent to a worker process"
+    )
+    max_workers: Optional[int] = Field(
+        default=None, description="Analysis worker processes (defaults to CPU count)"
+    )
+    template_mining: bool = Field(
+        default=True, description="Mine error lines into templates for the report"
+    )
+    template_lines_per_batch: int = Field(
+        default=500,
+        description="Error lines mined per analysed batch; larger batches mine an evenly "
+        "spaced, count-weighted sample",
+    )
+    cache_ttl_seconds: float = Field(
+        default=30.0, description="How long an analysis report is served from cache"
+    )
+    cache_bucket_seconds: int = Field(
+        default=10, description="Window ends are snapped down to this boundary for caching"
+    )
+    cache_max_entries: int = Field(default=256, description="Maximum cached reports")
+    rolling_enabled: bool = Field(
+        default=True, description="Keep per-bucket aggregates for repeated rolling windows"
+    )
+    rolling_bucket_seconds: int = Field(default=60, description="Rolling aggregate bucket width")
+    rolling_retention_seconds: int = Field(
+        default=3600, description="Longest window served from rolling aggregates"
+    )
+    rolling_lag_seconds: int = Field(
+        default=30, description="Recent buckets re-fetched on refresh to pick up late lines"
+    )
+    rolling_max_series: int = Field(
+        default=16, description="Distinct queries kept in rolling state"
+    )
+    live_enabled: bool = Field(
+        default=False,
+        description="Follow the unfiltered log stream in the background from startup",
+    )
+    live_poll_seconds: float = Field(
+        default=5.0, description="How often the live consumer polls Loki for new lines"
+    )
+    local_log_dir: str = Field(
+        default="/temp/logs", description="Directory the local log file tool may read from"
+    )
+    local_chunk_bytes: int = Field(
+        default=16 * 1024 * 1024, description="Bytes per chunk when analysing local files in parallel"
+    )
+    local_index_stride_bytes: int = Field(
+        default=1024 * 1024, description="Spacing of samples in a local file's time index"
+    )
+    fast_path_enabled: bool = Field(
+        default=True,
+        description="Answer common log questions with the tools directly, without the agent graph",
+    )
+    fast_path_default_range: str = Field(
+        default="last 15 minutes", description="Window used when a fast-path question names none"
+    )
+
+
+class IncidentStoreConfig(BaseModel):
+    path: str = Field(
+        default="./artifacts/incidents", description="Directory the incident store is persisted in"
+    )
+    top_k: int = Field(default=3, description="Similar incidents returned per search")
+    embedding_weight: float = Field(
+        default=0.6,
+        description="Share of the similarity score from the description embedding (the rest is the fingerprint)",
+    )
+
+
+class EmbeddingConfig(BaseModel):
+    model_name: str = Field(default="all-MiniLM-L6-v2", description="SentenceTransformer model for embeddings")
+    backend: str = Field(
+        default="auto",
+        description="'onnx' (exported bundle), 'sentence_transformers', or 'auto' (the bundle if present)",
+    )
+    bundle_path: str = Field(
+        default="./artifacts/embedding_bundle", description="Directory of the exported ONNX embedding bundle"
+    )
+    quantized: bool = Field(
+        default=False,
+        description="Use the bundle's int8 variant; its vectors differ slightly, so re-index documents after switching",
+    )
+    onnx_threads: Optional[int] = Field(
+        default=None, description="ONNX Runtime intra-op threads (defaults to the CPU count)"
+    )
+    onnx_batch_tokens: int = Field(
+        default=512, description="Padded tokens per ONNX batch; small batches keep memory and latency low"
+    )
+    preload: bool = Field(default=True, description="Load the embedding model at startup")
+    cache_enabled: bool = Field(default=True, description="Reuse embeddings of previously seen texts")
+    cache_path: Optional[str] = Field(
+        default="./artifacts/embedding_cache",
+        description="Directory of the persistent embedding cache (unset for memory only)",
+    )
+    cache_max_entries: int = Field(default=10000, description="Embeddings kept in the in-memory LRU")
+    batch_max_size: int = Field(
+        default=32, description="Most texts the embedding service sends to the model at once"
+    )
+    batch_wait_ms: float = Field(
+        default=5.0, description="How long the embedding service waits to fill a batch"
+    )
+
+
+class KnowledgeBaseConfig(BaseModel):
+    backend: str = Field(
+        default="pinecone", description="Where documents are indexed: 'pinecone' or 'local' (opt-in)"
+    )
+    index_path: str = Field(
+        default="./artifacts/knowledge_base", description="Directory the local vector index is persisted in"
+    )
+    index_dtype: str = Field(
+        default="float32", description="Stored vector type for the local index: 'float32' or 'int8'"
+    )
+    ann_threshold: int = Field(
+        default=20000, description="Vectors from which the local index is partitioned (IVF) instead of exact"
+    )
+    nlist: Optional[int] = Field(
+        default=None, description="IVF partitions (defaults to about 4 * sqrt(vectors))"
+    )
+    nprobe: int = Field(default=8, description="IVF partitions scanned per query")
+    top_k: int = Field(default=3, description="Passages returned per knowledge base search")
+
+
 class AgentModelConfig(BaseModel):
     """Configuration for agent models."""
 
@@ -85,6 +255,17 @@ class Config(BaseSettings):
     # MCP Configuration
     mcp: MCPConfig = Field(default_factory=MCPConfig)
 
+    # Loki Configuration
+    loki: LokiConfig = Field(default_factory=LokiConfig)
+    log_analysis: LogAnalysisConfig = Field(default_factory=LogAnalysisConfig)
+
+    # Past incidents searched by the solution agent
+    incidents: IncidentStoreConfig = Field(default_factory=IncidentStoreConfig)
+
+    # Knowledge base
+    embeddings: EmbeddingConfig = Field(default_factory=EmbeddingConfig)
+    knowledge_base: KnowledgeBaseConfig = Field(default_factory=KnowledgeBaseConfig)
+
     # Agent Model Configuration
     agents: AgentModelConfig = Field(default_factory=AgentModelConfig)
 
@@ -110,6 +291,7 @@ class Config(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = False
+        env_nested_delimiter = "__"  # e.g. LOKI__MAX_LINES=200000
         extra = "ignore"  # Allow extra environment variables without validation errors
 
 
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status
+import hashlib
+
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("documents_backend")
+
+# Create router
+router = APIRouter(tags=["Documents"])
+
+
+@router.post("/add_document")
+def add_document(file: UploadFile = File(...)):
+    """
+    Split an uploaded PDF, DOCX or TXT file into chunks and add them to the knowledge base.
+
+    Re-uploading a file replaces its earlier version: an identical file is skipped,
+    and for an edited one only the chunks that changed are embedded.
+    """
+    from utils_app.data_loader import process_uploaded_file
+    from utils_app.vector_store import KnowledgeBaseUnavailable, index_document
+
+    content = file.file.read()
+    try:
+        chunks = process_uploaded_file(content, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    metadata = chunks[0]["metadata"] if chunks else {"source": file.filename}
+    try:
+        result = index_document(
+            metadata.get("source", file.filename),
+            [chunk["text"] for chunk in chunks],
+            metadata,
+            content_hash=hashlib.sha256(content).hexdigest(),
+        )
+    except KnowledgeBaseUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    if result["skipped"]:
+        message = f"{file.filename} is unchanged; nothing to re-index"
+    elif result["unchanged"] or result["removed"]:
+        message = (
+            f"Updated {file.filename}: {result['added']} chunks added, "
+            f"{result['removed']} removed, {result['unchanged']} unchanged"
+        )
+    else:
+        message = f"Added {file.filename} to the knowledge base"
+    logger.info(message)
+    return {
+        "status": "success",
+        "message": message,
+        "filename": file.filename,
+        "chunks_added": result["added"],
+        "chunks_removed": result["removed"],
+        "chunks_unchanged": result["unchanged"],
+    }
+
+
+@router.get("/list_documents")
+def list_documents(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """
+    One page of knowledge base documents with exact chunk counts.
+    """
+    from utils_app.vector_store import list_sources_page
+
+    total, documents = list_sources_page(offset, limit)
+    return {"status": "success", "documents": documents, "total": total}
+
+
+@router.delete("/delete_document/{source:path}")
+def delete_document(source: str):
+    """
+    Delete every chunk of a document from the knowledge base.
+    """
+    from utils_app.document_catalog import get_document
+    from utils_app.vector_store import KnowledgeBaseUnavailable, delete_vectors_by_source
+
+    if get_document(source) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document '{source}' not found")
+    try:
+        deleted = delete_vectors_by_source(source)
+    except KnowledgeBaseUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    logger.info(f"Deleted {deleted} chunks of {source}")
+    return {
+        "status": "success",
+        "message": f"Deleted {source} from the knowledge base",
+        "source": source,
+        "deleted_count": deleted,
+    }
@@ -0,0 +1,33 @@
+from database.core import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+import uuid
+
+
+class Document(Base):
+    """A knowledge base document (one ingested source) and its chunk count."""
+    __tablename__ = "kb_documents"
+
+    id = Column(UUID, primary_key=True, default=uuid.uuid4)
+    source = Column(String, unique=True, index=True, nullable=False)
+    file_name = Column(String, nullable=False)
+    file_type = Column(String, nullable=False, default="text")
+    chunk_count = Column(Integer, nullable=False, default=0)
+    content_hash = Column(String, nullable=True)  # hash of the whole file as last indexed
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class DocumentChunk(Base):
+    """One indexed chunk of a document; `id` is the chunk's id in the vector store."""
+    __tablename__ = "kb_chunks"
+    __table_args__ = (Index("ix_kb_chunks_document_position", "document_id", "position"),)
+
+    id = Column(String, primary_key=True)
+    document_id = Column(UUID, ForeignKey("kb_documents.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+
+    document = relationship("Document", back_populates="chunks")
@@ -0,0 +1,83 @@
+"""One-off backfill of the document catalog from an existing Pinecone index
+
+Documents indexed before the catalog existed have chunks in Pinecone that the
+catalog does not know about, so they are missing from the document listings and
+are left behind when their document is deleted. This lists every vector id in the
+index, reads each vector's source from its metadata and records the ids the
+catalog does not have yet. Running it again only adds what is still missing.
+
+Pinecone does not keep the order of a document's chunks, so backfilled chunks are
+catalogued in the order the index lists them; re-uploading a document restores its
+order (and its content hash, so identical re-uploads are skipped afterwards).
+
+Needs PINECONE_API_KEY/PINECONE_INDEX_NAME and DATABASE_URL, as the application does.
+Listing ids needs a serverless index.
+
+Usage (from backend/src):
+    python -m utils_app.backfill_document_catalog [--dry-run]
+"""
+import argparse
+from typing import Dict, List
+
+from database.core import Base, engine
+from tables.documents import Document, DocumentChunk  # registers the catalog tables for create_all
+from utils_app.document_catalog import known_chunk_ids, record_chunks
+from utils_app.vector_store import init_pinecone
+
+FETCH_BATCH = 100
+
+
+def backfill(dry_run: bool = False) -> Dict[str, int]:
+    """
+    Catalogue every Pinecone vector the catalog does not know yet.
+
+    Args:
+        dry_run: Only count what would be recorded
+
+    Returns:
+        Source -> number of chunks recorded (or that would be)
+    """
+    Base.metadata.create_all(bind=engine, checkfirst=True)
+    index = init_pinecone()
+
+    by_source: Dict[str, List[str]] = {}
+    metadata_by_source: Dict[str, Dict] = {}
+    listed = 0
+    for page in index.list(limit=FETCH_BATCH):
+        ids = list(page)
+        listed += len(ids)
+        known = known_chunk_ids(ids)
+        missing = [vector_id for vector_id in ids if vector_id not in known]
+        if not missing:
+            continue
+        fetched = index.fetch(ids=missing).vectors
+        for vector_id in missing:
+            match = fetched.get(vector_id)
+            if match is None:
+                continue  # deleted since it was listed
+            metadata = {key: value for key, value in (match.metadata or {}).items() if key != "text"}
+            source = metadata.get("source", "Unknown")
+            by_source.setdefault(source, []).append(vector_id)
+            metadata_by_source.setdefault(source, metadata)
+    print(f"Listed {listed} vectors; {sum(map(len, by_source.values()))} are not catalogued")
+
+    recorded = {}
+    for source, ids in by_source.items():
+        if not dry_run:
+            record_chunks(source, ids, metadata_by_source[source])
+        recorded[source] = len(ids)
+        print(f"  {source}: {len(ids)} chunks")
+    return recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be recorded without writing")
+    args = parser.parse_args()
+    recorded = backfill(dry_run=args.dry_run)
+    verb = "Would record" if args.dry_run else "Recorded"
+    print(f"{verb} {sum(recorded.values())} chunks for {len(recorded)} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,71 @@
 """Utility functions for loading and processing cricket data"""
-from typing import List
+from typing import List, Tuple
+import hashlib
 import io
+import re
 from pypdf import PdfReader
 from docx import Document as DocxDocument
 
+# A piece of text ends after sentence punctuation or at a line break
+_UNIT_END = re.compile(r'(?<=[.!?])\s+|\n\s*')
+
+def _text_units(text: str, max_length: int) -> List[Tuple[int, int]]:
+    """(start, end) spans of the sentences and lines in text, none longer than max_length"""
+    spans = []
+    start = 0
+    for match in _UNIT_END.finditer(text):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+
+    units = []
+    for start, end in spans:
+        # Very long sentences are cut at a space near max_length
+        while end - start > max_length:
+            cut = text.rfind(' ', start + max_length // 2, start + max_length)
+            cut = cut + 1 if cut > start else start + max_length
+            units.append((start, cut))
+            start = cut
+        if end > start:
+            units.append((start, end))
+    return units
+
+def _ends_chunk(unit: str, divisor: int = 4) -> bool:
+    """Content-defined boundary: true for about one unit in `divisor`, decided by the unit's own text"""
+    digest = hashlib.blake2b(unit.strip().encode(), digest_size=4).digest()
+    return int.from_bytes(digest, 'little') % divisor == 0
+
 def split_text_into_chunks(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
-    """Split text into chunks with overlap"""
+    """Split text into chunks with overlap
+    
+    Chunks end at sentence or line ends picked by the text itself: once a chunk has
+    chunk_size / 2 characters it ends after the first sentence whose hash is a
+    boundary, and it never grows past chunk_size * 3 / 2. Because a boundary depends
+    only on nearby text, editing one part of a document changes only the chunks
+    around the edit; the others keep their exact text (and so their ids). Each chunk
+    starts with up to chunk_overlap characters of whole sentences from the one before.
+    """
+    min_length, max_length = chunk_size // 2, chunk_size * 3 // 2
+    units = _text_units(text, chunk_size)
     chunks = []
-    start = 0
-    text_length = len(text)
-    
-    while start < text_length:
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk.strip())
-        start = end - chunk_overlap  # Overlap with next chunk
+    first = 0
+    length = 0
+    for i, (start, end) in enumerate(units):
+        length += end - start
+        is_last = i == len(units) - 1
+        too_long = not is_last and length + units[i + 1][1] - units[i + 1][0] > max_length
+        if not (is_last or too_long or (length >= min_length and _ends_chunk(text[start:end]))):
+            continue
+        # Overlap: whole units before this chunk, up to chunk_overlap characters
+        overlap_start = first
+        while overlap_start > 0 and units[first][0] - units[overlap_start - 1][0] <= chunk_overlap:
+            overlap_start -= 1
+        chunk = text[units[overlap_start][0]:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        first = i + 1
+        length = 0
     
     return chunks
 
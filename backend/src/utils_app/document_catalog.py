@@ -0,0 +1,150 @@
+"""Catalog of knowledge base documents and their chunk ids, kept in the application database"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from database.core import SessionLocal
+from tables.documents import Document, DocumentChunk
+
+
+def _document_info(document: Document) -> Dict:
+    return {
+        "source": document.source,
+        "file_name": document.file_name,
+        "file_type": document.file_type,
+        "count": document.chunk_count,
+        "content_hash": document.content_hash,
+    }
+
+
+def _get_or_create(db, source: str, metadata: Dict) -> Document:
+    query = select(Document).where(Document.source == source).with_for_update()
+    document = db.scalar(query)
+    if document is None:
+        # FOR UPDATE cannot lock a row that does not exist yet, so two uploads of a new
+        # source can both get here; the unique source makes the second insert fail, and
+        # that one then locks and uses the row the first created
+        try:
+            with db.begin_nested():
+                document = Document(
+                    source=source,
+                    file_name=metadata.get("file_name", source),
+                    file_type=metadata.get("file_type", "text"),
+                    chunk_count=0,
+                )
+                db.add(document)
+        except IntegrityError:
+            document = db.scalar(query)
+    return document
+
+
+def record_chunks(source: str, chunk_ids: Sequence[str], metadata: Optional[Dict] = None) -> None:
+    """
+    Record chunks added to the vector store for a source, creating its document entry
+    on first use. Chunks are appended after any already recorded for the source.
+
+    Args:
+        source: Document source (e.g. the uploaded file name)
+        chunk_ids: Vector store ids of the new chunks, in document order
+        metadata: Chunk metadata; file_name and file_type are taken from it
+    """
+    with SessionLocal() as db:
+        document = _get_or_create(db, source, metadata or {})
+        start = document.chunk_count
+        db.add_all(
+            DocumentChunk(id=chunk_id, document_id=document.id, position=start + i)
+            for i, chunk_id in enumerate(chunk_ids)
+        )
+        document.chunk_count = start + len(chunk_ids)
+        db.commit()
+
+
+def replace_chunks(source: str, chunk_ids: Sequence[str], metadata: Optional[Dict] = None,
+                   content_hash: Optional[str] = None) -> None:
+    """
+    Set the full, ordered chunk list of a source after it was re-indexed.
+
+    Args:
+        source: Document source
+        chunk_ids: Vector store ids of all its chunks, in document order
+        metadata: Chunk metadata; file_name and file_type are taken from it
+        content_hash: Hash of the whole file, used to skip unchanged uploads
+    """
+    metadata = metadata or {}
+    with SessionLocal() as db:
+        document = _get_or_create(db, source, metadata)
+        db.query(DocumentChunk).filter(DocumentChunk.document_id == document.id).delete(synchronize_session=False)
+        db.add_all(
+            DocumentChunk(id=chunk_id, document_id=document.id, position=i)
+            for i, chunk_id in enumerate(chunk_ids)
+        )
+        document.chunk_count = len(chunk_ids)
+        document.content_hash = content_hash
+        document.file_name = metadata.get("file_name", document.file_name)
+        document.file_type = metadata.get("file_type", document.file_type)
+        db.commit()
+
+
+def known_chunk_ids(chunk_ids: Sequence[str]) -> set:
+    """Which of the given chunk ids are already catalogued."""
+    known = set()
+    with SessionLocal() as db:
+        for i in range(0, len(chunk_ids), 500):
+            batch = list(chunk_ids[i:i + 500])
+            known.update(db.scalars(select(DocumentChunk.id).where(DocumentChunk.id.in_(batch))).all())
+    return known
+
+
+def list_documents(offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict]]:
+    """
+    One page of documents, oldest first.
+
+    Returns:
+        (total number of documents, documents on this page with their chunk counts)
+    """
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count()).select_from(Document))
+        documents = db.scalars(
+            select(Document).order_by(Document.created_at, Document.source).offset(offset).limit(limit)
+        ).all()
+        return total, [_document_info(document) for document in documents]
+
+
+def get_document(source: str) -> Optional[Dict]:
+    with SessionLocal() as db:
+        document = db.scalar(select(Document).where(Document.source == source))
+        return _document_info(document) if document else None
+
+
+def chunk_ids(source: str, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+    """Vector store ids of a source's chunks, in document order."""
+    with SessionLocal() as db:
+        query = (
+            select(DocumentChunk.id)
+            .join(Document, DocumentChunk.document_id == Document.id)
+            .where(Document.source == source)
+            .order_by(DocumentChunk.position)
+            .offset(offset)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return list(db.scalars(query).all())
+
+
+def remove_document(source: str) -> int:
+    """
+    Drop a document and its chunks from the catalog.
+
+    Returns:
+        Number of chunks the document had (0 if it was not catalogued)
+    """
+    with SessionLocal() as db:
+        document = db.scalar(select(Document).where(Document.source == source))
+        if document is None:
+            return 0
+        count = document.chunk_count
+        db.query(DocumentChunk).filter(DocumentChunk.document_id == document.id).delete(synchronize_session=False)
+        db.delete(document)
+        db.commit()
+        return count
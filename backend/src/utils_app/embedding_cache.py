@@ -0,0 +1,143 @@
+"""Embedding cache keyed by model and content hash: an in-memory LRU over a SQLite store"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("embedding_cache")
+
+_SQL_BATCH = 500  # keys per SELECT ... IN (...), below SQLite's variable limit
+
+
+def content_key(model_name: str, text: str) -> bytes:
+    """Cache key of one text under one model."""
+    return hashlib.blake2b(f"{model_name}\x00{text}".encode(), digest_size=20).digest()
+
+
+class EmbeddingCache:
+    """
+    Embeddings by content key, in a bounded LRU backed by a SQLite file.
+
+    Memory lookups cost a dict access; misses go to disk in batches, and vectors
+    found there are promoted into memory. The disk store is unbounded, shared by all
+    processes using the same path, and safe to delete at any time.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = self.disk_hits = self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(path, 'embeddings.sqlite'), check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)')
+            self._db.commit()
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached vectors for whichever keys are known."""
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.hits += len(found)
+            if missing and self._db is not None:
+                unique = list(dict.fromkeys(missing))
+                for i in range(0, len(unique), _SQL_BATCH):
+                    batch = unique[i:i + _SQL_BATCH]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+            self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def put_many(self, items: Iterable[tuple]) -> None:
+        """Store (key, vector) pairs in memory and on disk."""
+        items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in items]
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            if self._db is not None and items:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)',
+                    [(key, vector.tobytes()) for key, vector in items],
+                )
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CachedEncoder:
+    """
+    Wraps a model with a SentenceTransformer-style encode() so only texts the cache
+    has not seen reach the model. Calls with extra encode options bypass the cache.
+    """
+
+    def __init__(self, model, model_name: str, cache: EmbeddingCache):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """
+        Embed one text (returns a vector) or a list of texts (returns a matrix).
+
+        Args:
+            sentences: Text or texts to embed
+            **kwargs: Passed to the model's encode; any option disables caching
+
+        Returns:
+            float32 embeddings, in input order
+        """
+        if kwargs:
+            return self.model.encode(sentences, **kwargs)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        keys = [content_key(self.model_name, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            text_by_key = dict(zip(keys, texts))
+            computed = np.asarray(self.model.encode([text_by_key[key] for key in missing]), dtype=np.float32)
+            new = dict(zip(missing, computed))
+            self.cache.put_many(new.items())
+            found.update(new)
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.stack([found[key] for key in keys])
+        return vectors[0] if single else vectors
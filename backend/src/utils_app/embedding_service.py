@@ -0,0 +1,118 @@
+"""Async embedding service that micro-batches concurrent encode calls"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config import config
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("embedding_service")
+
+Encode = Callable[[List[str]], np.ndarray]
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from concurrent callers and embeds them together.
+
+    A batch is sent to the model when it reaches `max_batch_size` texts or when its
+    oldest text has waited `max_wait_ms`, whichever comes first. The model runs on
+    one worker thread, one batch at a time, so requests arriving while it is busy
+    form the next batch; under load each model call is a full batch, and a lone
+    request waits at most the window. Each caller gets back its own rows.
+
+    A batcher belongs to the event loop that first uses it.
+    """
+
+    def __init__(self, encode: Encode, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Future] = None
+        self.batches = self.texts = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text."""
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed several texts; they may be split across batches shared with other callers.
+
+        Returns:
+            One row per text, in input order
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future, now))
+            futures.append(future)
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        elif len(self._pending) >= self.max_batch_size and self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+        return np.stack(await asyncio.gather(*futures))
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            delay = self._pending[0][2] + self.max_wait - loop.time()
+            if len(self._pending) < self.max_batch_size and delay > 0:
+                self._wakeup = loop.create_future()
+                try:
+                    await asyncio.wait_for(self._wakeup, delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            batch = [(text, future) for text, future, _ in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                vectors = await loop.run_in_executor(self._executor, self.encode, [text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _encode_with_model(texts: List[str]) -> np.ndarray:
+    from utils_app.vector_store import get_embeddings_model
+    return np.asarray(get_embeddings_model().encode(texts), dtype=np.float32)
+
+
+_embedding_service: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_service() -> EmbeddingBatcher:
+    """Get or create the shared embedding service."""
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingBatcher(
+            _encode_with_model,
+            max_batch_size=config.embeddings.batch_max_size,
+            max_wait_ms=config.embeddings.batch_wait_ms,
+        )
+    return _embedding_service
@@ -0,0 +1,199 @@
+"""Export the sentence-transformers embedding model to an ONNX bundle and verify it
+
+Writes <out>/model.onnx (float32), <out>/model_int8.onnx (dynamically quantized
+weights), the tokenizer and a manifest, then embeds the fixture texts with both
+variants and with the original model and records how closely they agree. The
+export fails if a variant falls below the quality thresholds, so a bad bundle is
+never written as current.
+
+Needs the export-time dependencies (sentence-transformers/torch, onnx,
+onnxruntime); serving the bundle only needs onnxruntime and tokenizers.
+
+Usage (from backend/src):
+    python -m utils_app.export_embedding_bundle --out ./artifacts/embedding_bundle
+"""
+import argparse
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from utils_app.onnx_embedder import MANIFEST, OnnxEmbedder
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'embedding_texts.txt')
+
+# Lowest acceptable agreement with the original model on the fixture texts
+THRESHOLDS = {
+    'float32': {'min_cosine': 0.999, 'top5_overlap': 0.98},
+    'int8': {'min_cosine': 0.97, 'top5_overlap': 0.85},
+}
+
+
+def load_fixture_texts(path: str = FIXTURES) -> List[str]:
+    with open(path, encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def compare(reference: np.ndarray, candidate: np.ndarray, k: int = 5) -> Dict[str, float]:
+    """
+    Agreement of two embeddings of the same texts.
+
+    Returns:
+        min/mean cosine between each text's two vectors, and the mean overlap of each
+        text's top-k nearest neighbours among the other texts
+    """
+    def unit(m: np.ndarray) -> np.ndarray:
+        return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+    reference, candidate = unit(reference), unit(candidate)
+    cosines = (reference * candidate).sum(axis=1)
+
+    def neighbours(m: np.ndarray) -> np.ndarray:
+        similarity = m @ m.T
+        np.fill_diagonal(similarity, -np.inf)
+        return np.argsort(-similarity, axis=1)[:, :k]
+
+    ours, theirs = neighbours(reference), neighbours(candidate)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ours, theirs)])
+    return {
+        'min_cosine': round(float(cosines.min()), 5),
+        'mean_cosine': round(float(cosines.mean()), 5),
+        'top5_overlap': round(float(overlap), 4),
+    }
+
+
+def _pooling_mode(pooling) -> str:
+    """Pooling mode name across sentence-transformers versions."""
+    settings = pooling.get_config_dict()
+    if 'pooling_mode' in settings:
+        return str(settings['pooling_mode'])
+    modes = [key[len('pooling_mode_'):] for key, on in settings.items() if key.startswith('pooling_mode_') and on is True]
+    return 'mean' if modes == ['mean_tokens'] else '+'.join(modes)
+
+
+def export_bundle(model_name: str, out_dir: str, opset: int = 17) -> Dict:
+    """
+    Export `model_name` to `out_dir`, verify both variants, and write the manifest last.
+
+    Raises:
+        ValueError: if the model is not transformer + mean pooling (+ normalize), or a
+            variant fails the quality thresholds
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling, Transformer
+
+    model = SentenceTransformer(model_name, device='cpu')
+    modules = list(model)
+    if not isinstance(modules[0], Transformer) or not isinstance(modules[1], Pooling):
+        raise ValueError(f"{model_name} is not a transformer + pooling model")
+    pooling = _pooling_mode(modules[1])
+    if pooling != 'mean':
+        raise ValueError(f"{model_name} uses {pooling} pooling; only mean is supported")
+    normalize = any(isinstance(m, Normalize) for m in modules[2:])
+    if any(not isinstance(m, Normalize) for m in modules[2:]):
+        raise ValueError(f"{model_name} has modules after pooling other than Normalize")
+
+    transformer = modules[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class Encoder(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    work = tempfile.mkdtemp(dir=parent)
+    try:
+        sample = tokenizer(["export sample"], return_tensors='pt')
+        token_type_ids = sample.get('token_type_ids', torch.zeros_like(sample['input_ids']))
+        axes = {0: 'batch', 1: 'sequence'}
+        # Newer torch defaults to the dynamo exporter; the TorchScript one handles these models
+        legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+        torch.onnx.export(
+            Encoder(), (sample['input_ids'], sample['attention_mask'], token_type_ids),
+            os.path.join(work, 'model.onnx'),
+            input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={'input_ids': axes, 'attention_mask': axes, 'token_type_ids': axes, 'last_hidden_state': axes},
+            opset_version=opset,
+            **legacy,
+        )
+        quantize_dynamic(
+            os.path.join(work, 'model.onnx'), os.path.join(work, 'model_int8.onnx'), weight_type=QuantType.QInt8,
+        )
+        tokenizer.backend_tokenizer.save(os.path.join(work, 'tokenizer.json'))
+
+        manifest = {
+            'model_name': model_name,
+            'dim': getattr(model, 'get_embedding_dimension', model.get_sentence_embedding_dimension)(),
+            'max_seq_length': model.max_seq_length,
+            'pooling': 'mean',
+            'normalize': normalize,
+            'tokenizer': 'tokenizer.json',
+            'pad_token': tokenizer.pad_token,
+            'pad_token_id': tokenizer.pad_token_id,
+            'files': {'float32': 'model.onnx', 'int8': 'model_int8.onnx'},
+            'quality': {},
+        }
+        with open(os.path.join(work, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        texts = load_fixture_texts()
+        reference = model.encode(texts, convert_to_numpy=True)
+        failures = []
+        for variant in ('float32', 'int8'):
+            embedder = OnnxEmbedder(work, quantized=variant == 'int8')
+            quality = compare(reference, embedder.encode(texts))
+            manifest['quality'][variant] = quality
+            for metric, minimum in THRESHOLDS[variant].items():
+                if quality[metric] < minimum:
+                    failures.append(f"{variant} {metric} {quality[metric]} < {minimum}")
+        manifest['quality']['fixture_texts'] = len(texts)
+        if failures:
+            raise ValueError(f"Exported bundle failed verification: {'; '.join(failures)}")
+
+        with open(os.path.join(work, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(work, 0o755)
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(work, out_dir)
+        return manifest
+    finally:
+        if os.path.exists(work):
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    from core.config import config
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=config.embeddings.model_name)
+    parser.add_argument("--out", default=config.embeddings.bundle_path)
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    try:
+        manifest = export_bundle(args.model, args.out, args.opset)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Exported {args.model} to {args.out}")
+    for variant in ('float32', 'int8'):
+        size = os.path.getsize(os.path.join(args.out, manifest['files'][variant])) / 2**20
+        print(f"  {variant:<8} {size:6.1f} MB  {manifest['quality'][variant]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""CPU sentence embeddings from an exported ONNX bundle (no torch at runtime)"""
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("onnx_embedder")
+
+MANIFEST = 'manifest.json'
+
+
+def load_manifest(bundle_path: str) -> Optional[Dict]:
+    """The bundle's manifest, or None if there is no bundle at the path."""
+    try:
+        with open(os.path.join(bundle_path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class OnnxEmbedder:
+    """
+    Runs a sentence-transformers model exported by export_embedding_bundle.py.
+
+    Tokenization, the transformer graph, mean pooling and normalization reproduce
+    the original pipeline, so the vectors match the model it was exported from (the
+    manifest records how closely, per variant). encode() follows SentenceTransformer:
+    a string gives a vector, a list gives a matrix.
+    """
+
+    def __init__(self, bundle_path: str, quantized: bool = True, threads: Optional[int] = None,
+                 batch_tokens: int = 512):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        manifest = load_manifest(bundle_path)
+        if manifest is None:
+            raise FileNotFoundError(f"No embedding bundle at {bundle_path} (run utils_app/export_embedding_bundle.py)")
+        self.variant = 'int8' if quantized and 'int8' in manifest['files'] else 'float32'
+        self.model_name: str = manifest['model_name']
+        self.name = f"{self.model_name}:onnx-{self.variant}"
+        self.dim: int = manifest['dim']
+        self.normalize: bool = manifest['normalize']
+        self.batch_tokens = batch_tokens
+        self.pad_id: int = manifest['pad_token_id']
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(bundle_path, manifest['tokenizer']))
+        self.tokenizer.enable_truncation(max_length=manifest['max_seq_length'])
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Batch shapes vary with every call; without the arena, memory is returned after each run
+        options.enable_cpu_mem_arena = False
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(bundle_path, manifest['files'][self.variant]), options, providers=['CPUExecutionProvider'],
+        )
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        quality = manifest.get('quality', {}).get(self.variant)
+        logger.info(f"Loaded {self.name} from {bundle_path}" + (f" (fixture quality {quality})" if quality else ""))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _encode_batch(self, encodings: list) -> np.ndarray:
+        length = max(len(e.ids) for e in encodings)
+        ids = np.full((len(encodings), length), self.pad_id, dtype=np.int64)
+        mask = np.zeros((len(encodings), length), dtype=np.int64)
+        types = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            n = len(encoding.ids)
+            ids[row, :n] = encoding.ids
+            mask[row, :n] = 1
+            types[row, :n] = encoding.type_ids
+        feeds = {'input_ids': ids, 'attention_mask': mask}
+        if 'token_type_ids' in self._inputs:
+            feeds['token_type_ids'] = types
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """
+        Embed one text (returns a vector) or a list of texts (returns a matrix).
+
+        Texts are batched in order of length, up to `batch_tokens` padded tokens per
+        batch, so padding and peak memory stay small. SentenceTransformer-only options
+        in kwargs are ignored.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: -len(encodings[i].ids))
+        start = 0
+        while start < len(order):
+            # Longest first, so the first text of a batch sets its padded length
+            longest = len(encodings[order[start]].ids)
+            end = start + max(1, self.batch_tokens // max(1, longest))
+            rows = order[start:end]
+            vectors[rows] = self._encode_batch([encodings[row] for row in rows])
+            start = end
+        return vectors[0] if single else vectors
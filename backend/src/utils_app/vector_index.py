@@ -0,0 +1,428 @@
+"""Local vector index persisted as memory-mapped arrays (no network, works offline)"""
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import config
+from utils_app.logger import get_service_logger
+
+logger = get_service_logger("vector_index")
+
+_CURRENT = 'CURRENT'
+_KEEP_VERSIONS = 2  # the current version and the one before it
+_BLOCK_ROWS = 32768  # rows scored per step when int8 rows are widened to float32
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, so inner product is cosine similarity."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization: row ~= codes * scale."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on (a sample of) unit vectors; returns unit centroids."""
+    rnd = np.random.default_rng(seed)
+    sample = vectors[rnd.choice(len(vectors), min(len(vectors), k * 40), replace=False)]
+    centroids = sample[rnd.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = np.bincount(assignment, minlength=k) == 0
+        # Re-seed empty partitions from random sample rows
+        sums[empty] = sample[rnd.choice(len(sample), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(vectors[i:i + _BLOCK_ROWS] @ centroids.T, axis=1)
+        for i in range(0, len(vectors), _BLOCK_ROWS)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+def write_index(
+    path: str,
+    vectors: np.ndarray,
+    records: List[Dict],
+    dtype: str = 'float32',
+    ann_threshold: int = 20000,
+    nlist: Optional[int] = None,
+    centroids: Optional[np.ndarray] = None,
+    trained_count: int = 0,
+    assignment: Optional[np.ndarray] = None,
+) -> str:
+    """
+    Write a new index version under `path` and make it current.
+
+    Each version is a directory of .npy arrays plus the record texts; readers map the
+    arrays, so opening an index costs the same whatever its size. Indexes of at least
+    `ann_threshold` rows are partitioned (IVF): rows are clustered with k-means and
+    stored grouped by partition, so a query reads only the partitions it probes.
+
+    Args:
+        path: Index directory
+        vectors: One unit-length row per record
+        records: Dicts with 'id', 'text' and 'metadata' (metadata['source'] is indexed)
+        dtype: 'float32', or 'int8' for per-row quantized rows (a quarter of the size)
+        ann_threshold: Row count from which the partitioned mode is used
+        nlist: IVF partitions (default about 4 * sqrt(rows))
+        centroids: IVF centroids to reuse instead of training new ones
+        trained_count: Rows the reused centroids were trained on
+        assignment: Known partitions of the leading rows under the reused centroids
+
+    Returns:
+        Directory of the new version
+    """
+    if dtype not in ('float32', 'int8'):
+        raise ValueError(f"Unsupported index dtype '{dtype}' (use float32 or int8)")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    mode = 'ivf' if n >= max(ann_threshold, 1) else 'exact'
+    order = np.arange(n)
+    offsets = None
+    if mode == 'ivf':
+        if centroids is None:
+            centroids = _kmeans(vectors, min(n, nlist or int(4 * np.sqrt(n))))
+            trained_count, assignment = n, None
+        nlist = len(centroids)
+        known = assignment if assignment is not None else np.zeros(0, dtype=np.int64)
+        assignment = np.concatenate([known, _assign(vectors[len(known):], centroids)])
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+        vectors = vectors[order]
+        records = [records[i] for i in order]
+
+    sources = sorted({(r.get('metadata') or {}).get('source', 'Unknown') for r in records})
+    source_index = {source: i for i, source in enumerate(sources)}
+
+    os.makedirs(path, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    target = os.path.join(path, version)
+    os.makedirs(target)
+    if dtype == 'int8':
+        codes, scales = _quantize(vectors)
+        np.save(os.path.join(target, 'vectors.npy'), codes)
+        np.save(os.path.join(target, 'scales.npy'), scales)
+    else:
+        np.save(os.path.join(target, 'vectors.npy'), vectors)
+    if mode == 'ivf':
+        np.save(os.path.join(target, 'centroids.npy'), centroids.astype(np.float32))
+        np.save(os.path.join(target, 'partitions.npy'), offsets)
+    np.save(os.path.join(target, 'ids.npy'), np.array([str(r['id']) for r in records], dtype=str))
+    np.save(os.path.join(target, 'sources.npy'), np.array(
+        [source_index[(r.get('metadata') or {}).get('source', 'Unknown')] for r in records], dtype=np.int32,
+    ))
+
+    # Records are read back one at a time for hits, through a byte offset per row
+    record_offsets = np.zeros(n + 1, dtype=np.int64)
+    with open(os.path.join(target, 'records.jsonl'), 'wb') as f:
+        for i, record in enumerate(records):
+            line = json.dumps(record, ensure_ascii=False).encode() + b'\n'
+            f.write(line)
+            record_offsets[i + 1] = record_offsets[i] + len(line)
+    np.save(os.path.join(target, 'record_offsets.npy'), record_offsets)
+    with open(os.path.join(target, 'meta.json'), 'w') as f:
+        json.dump({
+            'count': n, 'dim': dim, 'dtype': dtype, 'mode': mode, 'sources': sources,
+            'trained_count': trained_count if mode == 'ivf' else 0,
+        }, f)
+
+    # Switch readers over atomically, then drop old versions. The previous version is
+    # kept, so a reader that read CURRENT just before the switch can still open it
+    pointer = os.path.join(path, f".{_CURRENT}.{version}")
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, _CURRENT))
+    _collect_versions(path, version)
+    logger.info(f"Wrote {mode} {dtype} index of {n} vectors to {target}")
+    return target
+
+
+def _collect_versions(path: str, current: str) -> None:
+    """Remove all but the newest `_KEEP_VERSIONS` versions under `path` (open maps keep their files)."""
+    versions = sorted(
+        (name for name in os.listdir(path)
+         if name.startswith('v') and name[1:].isdigit() and os.path.isdir(os.path.join(path, name))),
+        key=lambda name: int(name[1:]),
+    )
+    for name in versions[:-_KEEP_VERSIONS]:
+        if name != current:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+class VectorIndex:
+    """
+    A read-only, memory-mapped index version (see write_index).
+
+    Exact mode scores every row; IVF mode scores the `nprobe` partitions whose
+    centroids are closest to the query. Scores are cosine similarities.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.count: int = meta['count']
+        self.dim: int = meta['dim']
+        self.dtype: str = meta['dtype']
+        self.mode: str = meta['mode']
+        self.sources: List[str] = meta['sources']
+        self.trained_count: int = meta.get('trained_count', 0)
+
+        def load(name: str) -> Optional[np.ndarray]:
+            file = os.path.join(directory, f"{name}.npy")
+            return np.load(file, mmap_mode='r') if os.path.exists(file) else None
+
+        self._vectors = load('vectors')
+        self._scales = load('scales')
+        self._centroids = load('centroids')
+        self._partitions = load('partitions')
+        self._source_ids = load('sources')
+        self._ids = load('ids')
+        self._record_offsets = load('record_offsets')
+        with open(os.path.join(directory, 'records.jsonl'), 'rb') as f:
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b''
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _score(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        if self.dtype == 'float32':
+            return self._vectors[start:end] @ query
+        scores = np.empty(end - start, dtype=np.float32)
+        for i in range(start, end, _BLOCK_ROWS):
+            stop = min(end, i + _BLOCK_ROWS)
+            scores[i - start:stop - start] = self._vectors[i:stop].astype(np.float32) @ query
+        return scores * self._scales[start:end]
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 3,
+        nprobe: int = 8,
+        source: Optional[str] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a query vector.
+
+        Args:
+            query: Query embedding (normalized here)
+            top_k: Number of results
+            nprobe: IVF partitions scanned (ignored in exact mode)
+            source: Only return rows from this source
+
+        Returns:
+            (row, score) pairs, best first
+        """
+        if not self.count or top_k <= 0:
+            return []
+        query = normalize(query)[0]
+        if self.mode == 'ivf':
+            probes = np.argsort(-(self._centroids @ query))[:max(1, nprobe)]
+            ranges = [(int(self._partitions[p]), int(self._partitions[p + 1])) for p in probes]
+        else:
+            ranges = [(0, self.count)]
+        ranges = [(start, end) for start, end in ranges if end > start]
+        if not ranges:
+            return []
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = np.concatenate([self._score(start, end, query) for start, end in ranges])
+        if source is not None:
+            if source not in self.sources:
+                return []
+            keep = self._source_ids[rows] == self.sources.index(source)
+            rows, scores = rows[keep], scores[keep]
+        k = min(top_k, len(rows))
+        if not k:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def record(self, row: int) -> Dict:
+        """The stored record ('id', 'text', 'metadata') of one row."""
+        start, end = int(self._record_offsets[row]), int(self._record_offsets[row + 1])
+        return json.loads(self._records[start:end])
+
+    def vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows as float32 (dequantized for int8 indexes)."""
+        rows = np.arange(self.count) if rows is None else rows
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self.dtype == 'int8':
+            vectors *= self._scales[rows][:, None]
+        return vectors
+
+    def rows_for_source(self, source: str) -> np.ndarray:
+        if source not in self.sources:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self._source_ids[:] == self.sources.index(source))
+
+    def rows_for_ids(self, ids: Iterable[str]) -> np.ndarray:
+        ids = np.array(list(ids), dtype=str)
+        if not self.count or not len(ids):
+            return np.zeros(0, dtype=np.int64)
+        if self._ids is None:
+            # Versions written before ids were stored separately
+            self._ids = np.array([str(self.record(row)['id']) for row in range(self.count)], dtype=str)
+        return np.flatnonzero(np.isin(self._ids[:], ids))
+
+    def source_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self._source_ids[:], minlength=len(self.sources)) if self.count else []
+        return {source: int(count) for source, count in zip(self.sources, counts) if count}
+
+
+def open_index(path: str) -> Optional[VectorIndex]:
+    """Open the current version under `path`, or None if nothing has been written yet."""
+    try:
+        with open(os.path.join(path, _CURRENT)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return VectorIndex(os.path.join(path, version))
+
+
+class LocalVectorStore:
+    """
+    The knowledge base as a local index: search plus add/delete by rewriting.
+
+    Searches use the current version and pick up new versions (even ones written by
+    another process) with one stat call. Additions and deletions write a complete
+    new version, which keeps the on-disk layout optimal for search at the cost of
+    O(rows) work per write; writes within a process are serialized. IVF centroids
+    are kept across writes until the index has doubled or halved since they were
+    trained, so most writes only assign rows to partitions.
+    """
+
+    def __init__(self, path: str, dtype: str = 'float32', ann_threshold: int = 20000,
+                 nlist: Optional[int] = None, nprobe: int = 8):
+        self.path = path
+        self.dtype = dtype
+        self.ann_threshold = ann_threshold
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._write_lock = threading.Lock()
+        self._index: Optional[VectorIndex] = None
+        self._stamp: Optional[int] = None
+
+    @property
+    def index(self) -> Optional[VectorIndex]:
+        try:
+            stamp = os.stat(os.path.join(self.path, _CURRENT)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if stamp != self._stamp:
+            self._index, self._stamp = open_index(self.path), stamp
+        return self._index
+
+    def search(self, query: np.ndarray, top_k: int = 3, source: Optional[str] = None) -> List[Dict]:
+        """Records most similar to a query embedding, each with a 'score'."""
+        index = self.index
+        if index is None:
+            return []
+        return [
+            {**index.record(row), 'score': score}
+            for row, score in index.search(query, top_k, self.nprobe, source)
+        ]
+
+    def _rewrite(self, keep: np.ndarray, vectors: np.ndarray, records: List[Dict]) -> None:
+        index = self.index
+        centroids, trained_count, assignment = None, 0, None
+        if index is not None and len(keep):
+            vectors = np.concatenate([index.vectors(keep), vectors]) if len(vectors) else index.vectors(keep)
+            records = [index.record(int(row)) for row in keep] + records
+            if index.mode == 'ivf' and index.trained_count / 2 <= len(records) <= 2 * index.trained_count:
+                centroids, trained_count = np.asarray(index._centroids), index.trained_count
+                assignment = np.searchsorted(index._partitions, keep, side='right') - 1
+        write_index(
+            self.path, vectors, records, self.dtype, self.ann_threshold, self.nlist,
+            centroids=centroids, trained_count=trained_count, assignment=assignment,
+        )
+
+    def add(self, vectors: np.ndarray, records: Iterable[Dict]) -> int:
+        """Add records with their embeddings; returns the number added."""
+        records = list(records)
+        if not records:
+            return 0
+        with self._write_lock:
+            index = self.index
+            self._rewrite(np.arange(len(index)) if index else np.zeros(0, np.int64), normalize(vectors), records)
+        return len(records)
+
+    def update(self, vectors: np.ndarray, records: Iterable[Dict], remove_ids: Iterable[str] = ()) -> Tuple[int, int]:
+        """
+        Add records and remove records by id in a single new version.
+
+        Returns:
+            (records added, records removed)
+        """
+        records = list(records)
+        with self._write_lock:
+            index = self.index
+            removed = index.rows_for_ids(remove_ids) if index is not None else np.zeros(0, np.int64)
+            if not records and not len(removed):
+                return 0, 0
+            keep = np.setdiff1d(np.arange(len(index)), removed) if index is not None else np.zeros(0, np.int64)
+            dim = index.dim if index is not None else np.asarray(vectors).shape[-1]
+            new = normalize(vectors) if records else np.zeros((0, dim), np.float32)
+            self._rewrite(keep, new, records)
+        return len(records), len(removed)
+
+    def delete_source(self, source: str) -> int:
+        """Remove every record of a source; returns the number removed."""
+        with self._write_lock:
+            index = self.index
+            if index is None:
+                return 0
+            removed = index.rows_for_source(source)
+            if not len(removed):
+                return 0
+            keep = np.setdiff1d(np.arange(len(index)), removed)
+            self._rewrite(keep, np.zeros((0, index.dim), np.float32), [])
+        return len(removed)
+
+    def list_source(self, source: str, limit: int = 100) -> List[Dict]:
+        index = self.index
+        if index is None:
+            return []
+        return [index.record(int(row)) for row in index.rows_for_source(source)[:limit]]
+
+    def source_counts(self) -> Dict[str, int]:
+        index = self.index
+        return index.source_counts() if index is not None else {}
+
+
+_local_vector_store: Optional[LocalVectorStore] = None
+
+
+def get_local_vector_store() -> LocalVectorStore:
+    """Get or create the shared local knowledge base index."""
+    global _local_vector_store
+    if _local_vector_store is None:
+        kb = config.knowledge_base
+        _local_vector_store = LocalVectorStore(
+            path=kb.index_path,
+            dtype=kb.index_dtype,
+            ann_threshold=kb.ann_threshold,
+            nlist=kb.nlist,
+            nprobe=kb.nprobe,
+        )
+    return _local_vector_store
@@ -1,27 +1,70 @@
-"""Vector store management using Pinecone directly (without LangChain)"""
+"""Vector store management using Pinecone directly (without LangChain), or a local index"""
+import asyncio
+import hashlib
 import os
-from typing import Optional, List, Dict
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
+import threading
+from typing import Optional, List, Dict, Tuple
 from dotenv import load_dotenv
+from core.config import config
+from utils_app.embedding_cache import CachedEncoder, EmbeddingCache
+from utils_app.embedding_service import get_embedding_service
+from utils_app.logger import get_service_logger
+from utils_app.onnx_embedder import OnnxEmbedder, load_manifest
+from utils_app.vector_index import get_local_vector_store
 
 load_dotenv()
 
-# Initialize Pinecone client
-pc: Optional[Pinecone] = None
+logger = get_service_logger("vector_store")
+
+# Initialize Pinecone client (only when the knowledge base backend is "pinecone")
+pc = None
 index = None
-embeddings_model: Optional[SentenceTransformer] = None
+_index_lock = threading.Lock()
+embeddings_model = None
+_embeddings_model_lock = threading.Lock()
+
+class KnowledgeBaseUnavailable(RuntimeError):
+    """The configured knowledge base backend cannot be reached"""
 
 def get_embeddings_model():
-    """Get or create the embeddings model"""
+    """Get or create the embeddings model (wrapped in the embedding cache when enabled)"""
     global embeddings_model
     if embeddings_model is None:
-        embeddings_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Requests run in worker threads; load the model once even if several arrive together
+        with _embeddings_model_lock:
+            if embeddings_model is None:
+                embeddings_model = _load_embeddings_model()
     return embeddings_model
 
+def _load_embeddings_model():
+    settings = config.embeddings
+    backend = settings.backend
+    if backend == "auto":
+        backend = "onnx" if load_manifest(settings.bundle_path) is not None else "sentence_transformers"
+    if backend == "onnx":
+        model = OnnxEmbedder(
+            settings.bundle_path, quantized=settings.quantized,
+            threads=settings.onnx_threads, batch_tokens=settings.onnx_batch_tokens,
+        )
+        model_name = model.name
+    else:
+        from sentence_transformers import SentenceTransformer
+        logger.info(f"No embedding bundle in use; loading {settings.model_name} with sentence-transformers")
+        model = SentenceTransformer(settings.model_name)
+        model_name = settings.model_name
+    if settings.cache_enabled:
+        cache = EmbeddingCache(settings.cache_path, settings.cache_max_entries)
+        return CachedEncoder(model, model_name, cache)
+    return model
+
+def use_local_index() -> bool:
+    """Whether documents live in the local vector index rather than Pinecone"""
+    return config.knowledge_base.backend == "local"
+
 def init_pinecone():
     """Initialize Pinecone connection and create index if it doesn't exist"""
     global pc, index
+    from pinecone import Pinecone, ServerlessSpec
     
     api_key = os.getenv("PINECONE_API_KEY")
     environment = os.getenv("PINECONE_ENVIRONMENT", "gcp-starter")
@@ -80,12 +123,39 @@ def init_pinecone():
     return index
 
 def get_index():
-    """Get the initialized Pinecone index"""
-    global index
+    """Get the Pinecone index, connecting on first use
+    
+    Raises:
+        KnowledgeBaseUnavailable: Pinecone is not configured or cannot be reached
+    """
     if index is None:
-        raise RuntimeError("Pinecone index not initialized. Call init_pinecone() first.")
+        with _index_lock:
+            if index is None:
+                try:
+                    init_pinecone()
+                except Exception as e:
+                    raise KnowledgeBaseUnavailable(
+                        f"The Pinecone knowledge base is unavailable ({e}). Check PINECONE_API_KEY, "
+                        f"or set KNOWLEDGE_BASE__BACKEND=local to use the local index."
+                    ) from e
     return index
 
+def init_knowledge_base() -> str:
+    """Connect to the configured knowledge base backend, for use at startup
+    
+    Returns:
+        The backend in use
+        
+    Raises:
+        KnowledgeBaseUnavailable: Pinecone is configured but cannot be reached
+    """
+    backend = config.knowledge_base.backend
+    if backend not in ("pinecone", "local"):
+        raise KnowledgeBaseUnavailable(f"Unknown knowledge base backend '{backend}': use 'pinecone' or 'local'")
+    if backend == "pinecone":
+        get_index()
+    return backend
+
 def get_vector_store():
     """Get vector store components (for compatibility)"""
     return {
@@ -93,25 +163,26 @@ def get_vector_store():
         "embeddings": get_embeddings_model()
     }
 
-def query_vectors(query_text: str, top_k: int = 3) -> List[Dict]:
-    """Query Pinecone for similar vectors
+def search_by_vector(query_embedding, top_k: int = 3) -> List[Dict]:
+    """Find the stored texts most similar to an already computed query embedding
     
     Args:
-        query_text: The text to search for
+        query_embedding: Embedding of the query text
         top_k: Number of results to return
         
     Returns:
-        List of dictionaries with 'text' and 'metadata' keys
+        List of dictionaries with 'text', 'metadata' and 'score' keys
     """
+    if use_local_index():
+        return [
+            {"text": hit["text"], "metadata": {**hit["metadata"], "text": hit["text"]}, "score": hit["score"]}
+            for hit in get_local_vector_store().search(query_embedding, top_k)
+        ]
     index = get_index()
-    embeddings_model = get_embeddings_model()
-    
-    # Generate embedding for query
-    query_embedding = embeddings_model.encode(query_text).tolist()
     
     # Query Pinecone
     results = index.query(
-        vector=query_embedding,
+        vector=list(map(float, query_embedding)),
         top_k=top_k,
         include_metadata=True
     )
@@ -128,27 +199,64 @@ def query_vectors(query_text: str, top_k: int = 3) -> List[Dict]:
     
     return documents
 
-def add_texts(texts: List[str], metadatas: Optional[List[Dict]] = None):
-    """Add texts to Pinecone vector store
+def query_vectors(query_text: str, top_k: int = 3) -> List[Dict]:
+    """Query the vector store for similar vectors
     
     Args:
-        texts: List of text strings to add
-        metadatas: Optional list of metadata dictionaries
+        query_text: The text to search for
+        top_k: Number of results to return
+        
+    Returns:
+        List of dictionaries with 'text' and 'metadata' keys
     """
-    import uuid
-    index = get_index()
-    embeddings_model = get_embeddings_model()
-    
-    if metadatas is None:
-        metadatas = [{}] * len(texts)
+    return search_by_vector(get_embeddings_model().encode(query_text), top_k)
+
+async def query_vectors_async(query_text: str, top_k: int = 3) -> List[Dict]:
+    """Like query_vectors, for async callers: the query is embedded through the
+    shared embedding service, batched with other concurrent queries, and the
+    event loop stays free while the model runs
     
-    # Generate embeddings
-    embeddings = embeddings_model.encode(texts).tolist()
+    Args:
+        query_text: The text to search for
+        top_k: Number of results to return
+        
+    Returns:
+        List of dictionaries with 'text' and 'metadata' keys
+    """
+    query_embedding = await get_embedding_service().embed(query_text)
+    if use_local_index():
+        return search_by_vector(query_embedding, top_k)
+    return await asyncio.to_thread(search_by_vector, query_embedding, top_k)
+
+def _record_in_catalog(ids: List[str], metadatas: List[Dict]):
+    """Record new chunk ids in the document catalog, grouped by source"""
+    from utils_app.document_catalog import record_chunks
+    by_source: Dict[str, List[int]] = {}
+    for i, metadata in enumerate(metadatas):
+        by_source.setdefault(metadata.get("source", "Unknown"), []).append(i)
+    for source, rows in by_source.items():
+        record_chunks(source, [ids[i] for i in rows], metadatas[rows[0]])
+
+def chunk_ids_for(source: str, texts: List[str]) -> List[str]:
+    """Deterministic ids for a source's chunks: a hash of the source and the chunk text
     
-    # Prepare vectors for Pinecone
+    The same chunk of the same document always gets the same id, so re-indexing
+    an edited document only touches the chunks whose text changed. A repeated
+    chunk text is told apart by how many times it occurred before.
+    """
+    seen: Dict[str, int] = {}
+    ids = []
+    for text in texts:
+        occurrence = seen.get(text, 0)
+        seen[text] = occurrence + 1
+        digest = hashlib.sha256(f"{source}\x00{occurrence}\x00{text}".encode("utf-8")).hexdigest()
+        ids.append(digest[:32])
+    return ids
+
+def _upsert_pinecone(ids: List[str], texts: List[str], embeddings, metadatas: List[Dict]):
+    index = get_index()
     vectors = []
-    for text, embedding, metadata in zip(texts, embeddings, metadatas):
-        vector_id = str(uuid.uuid4())  # Generate unique ID
+    for vector_id, text, embedding, metadata in zip(ids, texts, embeddings.tolist(), metadatas):
         vectors.append({
             "id": vector_id,
             "values": embedding,
@@ -158,11 +266,104 @@ def add_texts(texts: List[str], metadatas: Optional[List[Dict]] = None):
     # Upsert to Pinecone in batches (Pinecone recommends batches of 100)
     batch_size = 100
     for i in range(0, len(vectors), batch_size):
-        batch = vectors[i:i + batch_size]
-        index.upsert(vectors=batch)
+        index.upsert(vectors=vectors[i:i + batch_size])
+
+def add_texts(texts: List[str], metadatas: Optional[List[Dict]] = None):
+    """Add texts to the vector store and record them in the document catalog
+    
+    Chunk ids are derived from each text's source and content; chunks that are
+    already catalogued are skipped rather than stored twice.
+    
+    Args:
+        texts: List of text strings to add
+        metadatas: Optional list of metadata dictionaries
+    """
+    from utils_app.document_catalog import known_chunk_ids
+    embeddings_model = get_embeddings_model()
+    
+    if metadatas is None:
+        metadatas = [{}] * len(texts)
+    ids: List[str] = [""] * len(texts)
+    by_source: Dict[str, List[int]] = {}
+    for i, metadata in enumerate(metadatas):
+        by_source.setdefault(metadata.get("source", "Unknown"), []).append(i)
+    for source, rows in by_source.items():
+        for row, vector_id in zip(rows, chunk_ids_for(source, [texts[i] for i in rows])):
+            ids[row] = vector_id
+    known = known_chunk_ids(ids)
+    new_rows = [i for i, vector_id in enumerate(ids) if vector_id not in known]
+    texts = [texts[i] for i in new_rows]
+    metadatas = [metadatas[i] for i in new_rows]
+    ids = [ids[i] for i in new_rows]
+    if not texts:
+        return
+    
+    if use_local_index():
+        records = [
+            {"id": vector_id, "text": text, "metadata": metadata}
+            for vector_id, text, metadata in zip(ids, texts, metadatas)
+        ]
+        get_local_vector_store().add(embeddings_model.encode(texts), records)
+        _record_in_catalog(ids, metadatas)
+        print(f"Added {len(texts)} documents to vector store")
+        return
+    _upsert_pinecone(ids, texts, embeddings_model.encode(texts), metadatas)
+    _record_in_catalog(ids, metadatas)
     
     print(f"Added {len(texts)} documents to vector store")
 
+def index_document(source: str, texts: List[str], metadata: Optional[Dict] = None,
+                   content_hash: Optional[str] = None) -> Dict[str, int]:
+    """Index (or re-index) every chunk of one document, touching only what changed
+    
+    An upload whose content_hash matches the one recorded for the source is
+    skipped outright. Otherwise the new chunk ids are compared with the ones in
+    the catalog: only new chunks are embedded and stored, chunks that disappeared
+    are deleted, and unchanged chunks are left alone.
+    
+    Args:
+        source: Document source (e.g. the uploaded file name)
+        texts: The document's chunks, in order
+        metadata: Metadata stored with every chunk
+        content_hash: Hash of the whole file
+        
+    Returns:
+        Dictionary with 'added', 'removed' and 'unchanged' chunk counts and 'skipped'
+    """
+    from utils_app.document_catalog import chunk_ids, get_document, replace_chunks
+    metadata = metadata or {}
+    if not use_local_index():
+        # Fail before any embedding work if Pinecone cannot be reached
+        get_index()
+    document = get_document(source)
+    if document is not None and content_hash is not None and document["content_hash"] == content_hash:
+        return {"added": 0, "removed": 0, "unchanged": document["count"], "skipped": True}
+    
+    ids = chunk_ids_for(source, texts)
+    old_ids = set(chunk_ids(source)) if document is not None else set()
+    new_rows = [i for i, vector_id in enumerate(ids) if vector_id not in old_ids]
+    removed_ids = list(old_ids - set(ids))
+    new_texts = [texts[i] for i in new_rows]
+    new_ids = [ids[i] for i in new_rows]
+    embeddings = get_embeddings_model().encode(new_texts) if new_texts else None
+    
+    if use_local_index():
+        records = [
+            {"id": vector_id, "text": text, "metadata": metadata}
+            for vector_id, text in zip(new_ids, new_texts)
+        ]
+        get_local_vector_store().update(embeddings if records else [], records, removed_ids)
+    else:
+        if new_texts:
+            _upsert_pinecone(new_ids, new_texts, embeddings, [metadata] * len(new_texts))
+        index = get_index()
+        for i in range(0, len(removed_ids), 1000):
+            index.delete(ids=removed_ids[i:i + 1000])
+    replace_chunks(source, ids, metadata, content_hash)
+    
+    logger.info(f"Indexed {source}: {len(new_ids)} added, {len(removed_ids)} removed, {len(ids) - len(new_ids)} unchanged")
+    return {"added": len(new_ids), "removed": len(removed_ids), "unchanged": len(ids) - len(new_ids), "skipped": False}
+
 def add_documents_to_vector_store(texts: List[str], metadatas: Optional[List[Dict]] = None):
     """Alias for add_texts (for compatibility)"""
     add_texts(texts, metadatas)
@@ -170,46 +371,42 @@ def add_documents_to_vector_store(texts: List[str], metadatas: Optional[List[Dic
 def delete_vectors_by_source(source: str) -> int:
     """Delete all vectors with a specific source
     
+    The source's chunk ids come from the document catalog, so no vector query is
+    needed and every chunk is found however many there are.
+    
     Args:
         source: Source name (e.g., filename) to delete
         
     Returns:
         Number of vectors deleted
     """
+    from utils_app.document_catalog import chunk_ids, remove_document
+    if use_local_index():
+        deleted = get_local_vector_store().delete_source(source)
+        remove_document(source)
+        return deleted
     index = get_index()
     
-    # Query to find all vectors with this source
-    # Note: We need to query to find the IDs first, then delete
-    # Pinecone doesn't support delete by metadata filter directly in all plans
-    
-    # Use query to find vectors (we'll query with a dummy vector and filter)
-    # Since we can't easily query all, we'll use fetch to get all and filter
-    # Actually, better approach: use delete by metadata filter if available
-    
-    # Query first to find all vectors with this source, then delete by IDs
-    # This is more reliable than delete by filter (which may not be supported in all plans)
-    embeddings_model = get_embeddings_model()
-    dummy_vector = embeddings_model.encode("cricket").tolist()
-    
-    # Query with metadata filter to find matching vectors
-    results = index.query(
-        vector=dummy_vector,
-        top_k=10000,  # Large number to get all matching vectors
-        filter={"source": source},
-        include_metadata=True
-    )
+    vector_ids = chunk_ids(source)
+    # Delete in batches (Pinecone recommends batches of 1000)
+    batch_size = 1000
+    for i in range(0, len(vector_ids), batch_size):
+        index.delete(ids=vector_ids[i:i + batch_size])
+    remove_document(source)
+    return len(vector_ids)
+
+def list_sources_page(offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict]]:
+    """One page of sources (files) in the vector store, from the document catalog
     
-    if results.matches:
-        vector_ids = [match.id for match in results.matches]
-        # Delete in batches (Pinecone recommends batches of 1000)
-        batch_size = 1000
-        deleted = 0
-        for i in range(0, len(vector_ids), batch_size):
-            batch_ids = vector_ids[i:i + batch_size]
-            index.delete(ids=batch_ids)
-            deleted += len(batch_ids)
-        return deleted
-    return 0
+    Args:
+        offset: Number of sources to skip
+        limit: Maximum number of sources to return
+        
+    Returns:
+        (total number of sources, list of dictionaries with source info and exact chunk count)
+    """
+    from utils_app.document_catalog import list_documents
+    return list_documents(offset, limit)
 
 def list_all_sources() -> List[Dict]:
     """List all unique sources (files) in the vector store
@@ -217,71 +414,49 @@ def list_all_sources() -> List[Dict]:
     Returns:
         List of dictionaries with source info and count
     """
-    index = get_index()
-    
-    # Use fetch to get all vectors (limited to first batch)
-    # Actually, better: use stats to get total count, then query samples
-    # For simplicity, we'll query with a dummy vector and get unique sources
-    embeddings_model = get_embeddings_model()
-    dummy_vector = embeddings_model.encode("cricket").tolist()
-    
-    # Query to get a sample of vectors
-    results = index.query(
-        vector=dummy_vector,
-        top_k=1000,  # Get a large sample
-        include_metadata=True
-    )
-    
-    # Extract unique sources
-    sources = {}
-    if results.matches:
-        for match in results.matches:
-            source = match.metadata.get("source", "Unknown")
-            file_type = match.metadata.get("file_type", "text")
-            file_name = match.metadata.get("file_name", source)
-            
-            if source not in sources:
-                sources[source] = {
-                    "source": source,
-                    "file_name": file_name,
-                    "file_type": file_type,
-                    "count": 0
-                }
-            sources[source]["count"] += 1
-    
-    return list(sources.values())
+    total, sources = list_sources_page(0, 1000)
+    while len(sources) < total:
+        _, page = list_sources_page(len(sources), 1000)
+        if not page:
+            break
+        sources.extend(page)
+    return sources
 
-def list_vectors_by_source(source: str, limit: int = 100) -> List[Dict]:
+def list_vectors_by_source(source: str, limit: int = 100, offset: int = 0) -> List[Dict]:
     """List vectors from a specific source
     
     Args:
         source: Source name to filter by
         limit: Maximum number of vectors to return
+        offset: Number of vectors to skip
         
     Returns:
         List of vector dictionaries with metadata
     """
+    from utils_app.document_catalog import chunk_ids
+    if use_local_index():
+        return [
+            {"id": record["id"], "text": record["text"][:200], "metadata": record["metadata"], "score": None}
+            for record in get_local_vector_store().list_source(source, offset + limit)[offset:]
+        ]
     index = get_index()
-    embeddings_model = get_embeddings_model()
     
-    # Query with metadata filter
-    dummy_vector = embeddings_model.encode("cricket").tolist()
-    
-    results = index.query(
-        vector=dummy_vector,
-        top_k=limit,
-        filter={"source": source},
-        include_metadata=True
-    )
+    vector_ids = chunk_ids(source, offset, limit)
+    if not vector_ids:
+        return []
+    fetched = index.fetch(ids=vector_ids).vectors
     
     vectors = []
-    if results.matches:
-        for match in results.matches:
-            vectors.append({
-                "id": match.id,
-                "text": match.metadata.get("text", "")[:200],  # Preview
-                "metadata": match.metadata,
-                "score": match.score
-            })
+    for vector_id in vector_ids:
+        match = fetched.get(vector_id)
+        if match is None:
+            continue
+        metadata = match.metadata or {}
+        vectors.append({
+            "id": vector_id,
+            "text": metadata.get("text", "")[:200],  # Preview
+            "metadata": metadata,
+            "score": None
+        })
     
     return vectors
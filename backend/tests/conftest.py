@@ -0,0 +1,11 @@
+"""Shared test setup: the application imports its modules relative to backend/src"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Model configs are built at import time; the warning about routing Gemini through LiteLLM is noise here
+os.environ.setdefault('ADK_SUPPRESS_GEMINI_LITELLM_WARNINGS', 'true')
+# The database engine is created at import time too; tests get a throwaway SQLite file
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='docuchat-tests-'), 'test.db')}")
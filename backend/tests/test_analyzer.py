@@ -0,0 +1,151 @@
+"""Behaviour of the rule classifier and the single-pass analyzer"""
+import random
+import re
+
+import numpy as np
+import pytest
+
+from agents.sub_agents.log_analytics.analyzer import (
+    DEFAULT_RULES,
+    LogAnalyzer,
+    RuleSet,
+    _line_offsets,
+    find_ip_addresses,
+)
+from agents.sub_agents.log_analytics.batch import LogBatch
+
+
+def reference_category(line):
+    """The original if/elif chain the rule table replaced."""
+    line = line.lower()
+    if 'authentication failure' in line or 'auth' in line and 'fail' in line:
+        return 'authentication_failure'
+    if 'timeout' in line or 'timed out' in line:
+        return 'connection_timeout'
+    if 'permission denied' in line or 'denied' in line:
+        return 'permission_denied'
+    if 'unavailable' in line or 'down' in line:
+        return 'service_unavailable'
+    if 'database' in line and ('error' in line or 'fail' in line):
+        return 'database_error'
+    if 'user unknown' in line or 'unknown user' in line:
+        return 'unknown_user'
+    if 'failed' in line and ('login' in line or 'logon' in line):
+        return 'failed_login'
+    if 'alert' in line and 'exit' in line:
+        return 'alert_exit'
+    if 'error' in line or 'fail' in line or 'critical' in line:
+        return 'other_errors'
+    return None
+
+
+FRAGMENTS = [
+    'authentication failure', 'auth', 'fail', 'failed', 'timeout', 'timed out', 'permission denied',
+    'denied', 'unavailable', 'down', 'database', 'error', 'user unknown', 'unknown user', 'user',
+    'unknown', 'login', 'logon', 'alert', 'exit', 'critical', 'ERROR', 'Fail', 'sshd[412]:',
+    'rhost=10.0.0.1', 'ok', 'İ', 'connection', '',
+]
+
+
+def random_lines(n, seed=0):
+    rnd = random.Random(seed)
+    return [
+        ''.join(rnd.choice(FRAGMENTS) + rnd.choice(['', ' ', 'x']) for _ in range(rnd.randint(0, 6)))
+        for _ in range(n)
+    ]
+
+
+def test_classify_matches_reference_chain():
+    for line in random_lines(3000):
+        assert DEFAULT_RULES.classify(line.lower()) == reference_category(line), line
+
+
+def test_classify_text_matches_per_line_classify():
+    lines = random_lines(3000, seed=1)
+    codes = DEFAULT_RULES.classify_text('\n'.join(lines), _line_offsets(lines))
+    found = [DEFAULT_RULES.categories[code] if code >= 0 else None for code in codes.tolist()]
+    assert found == [reference_category(line) for line in lines]
+
+
+@pytest.mark.parametrize('line, category', [
+    ('user unknown user', 'unknown_user'),
+    ('unknown user', 'unknown_user'),
+    ('permission denied', 'permission_denied'),
+    ('sudo: alert: exit 1', 'alert_exit'),
+    ('Login FAILED for bob', 'failed_login'),
+    ('all good', None),
+])
+def test_overlapping_and_compound_keywords(line, category):
+    assert DEFAULT_RULES.classify(line.lower()) == category
+
+
+def test_lowercase_length_change_keeps_lines_aligned():
+    # 'İ'.lower() is two characters, which shifts offsets in the lowered buffer
+    lines = ['İİİ ok', 'timeout', 'İ error', 'fine']
+    codes = DEFAULT_RULES.classify_text('\n'.join(lines), _line_offsets(lines))
+    assert [DEFAULT_RULES.categories[c] if c >= 0 else None for c in codes.tolist()] == [
+        None, 'connection_timeout', 'other_errors', None,
+    ]
+
+
+def test_custom_rule_table():
+    rules = RuleSet([('disk', [('disk', 'full')]), ('oom', [('out of memory',)])])
+    assert rules.classify('disk is full') == 'disk'
+    assert rules.classify('full disk') == 'disk'
+    assert rules.classify('disk ok') is None
+    assert rules.classify('killed: out of memory') == 'oom'
+
+
+def test_find_ip_addresses_matches_regex():
+    pattern = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+    rnd = random.Random(2)
+    parts = ['1.2.3.4', '10.0.0.255', '1234.5.6.7', 'a1.2.3.4', '1.2.3.4.5', '999.1.1.1', ' ', '_', '.', 'x', '7']
+    for _ in range(2000):
+        text = ''.join(rnd.choice(parts) for _ in range(rnd.randint(0, 8)))
+        assert find_ip_addresses(text) == set(pattern.findall(text)), text
+
+
+def test_merged_partials_report_like_one_pass():
+    lines = [
+        f'sshd[1]: {line} rhost=10.0.{i % 7}.{i % 3} from 192.168.{i % 11}.1'
+        for i, line in enumerate(random_lines(1200, seed=3))
+    ]
+    whole = LogAnalyzer(mine_templates=False).update(lines).report()
+    merged = LogAnalyzer(mine_templates=False)
+    for start in range(0, len(lines), 250):
+        merged.merge(LogAnalyzer(mine_templates=False).update(lines[start:start + 250]))
+    assert merged.report() == whole
+    assert whole['total_logs'] == len(lines)
+    assert whole['unique_ips'] == len(find_ip_addresses('\n'.join(lines)))
+
+
+def test_update_batch_and_update_text_agree_with_update():
+    lines = random_lines(500, seed=4)
+    batch = LogBatch.from_entries({'timestamp': i, 'line': line} for i, line in enumerate(lines))
+    expected = LogAnalyzer(mine_templates=False).update(lines).report()
+    assert LogAnalyzer(mine_templates=False).update_batch(batch).report() == expected
+    assert LogAnalyzer(mine_templates=False).update_text('\n'.join(lines) + '\n').report() == expected
+
+
+def test_only_first_rhost_per_line_counts():
+    report = LogAnalyzer(mine_templates=False).update(['fail rhost=a rhost=b', 'fail rhost=a']).report()
+    assert report['top_error_sources'] == [('a', 2)]
+
+
+def test_template_sampling_keeps_error_total():
+    lines = [f'error code {i}' for i in range(1000)] + ['all good'] * 10
+    analyzer = LogAnalyzer(mine_templates=True, template_lines=100).update(lines)
+    report = analyzer.report()
+    assert report['templates_exact'] is False
+    assert sum(t['count'] for t in report['top_templates']) == 1000
+
+    exact = LogAnalyzer(mine_templates=True, template_lines=5000).update(lines).report()
+    assert exact['templates_exact'] is True
+    assert exact['top_templates'][0]['count'] == 1000
+
+
+def test_empty_input():
+    report = LogAnalyzer(mine_templates=False).update([]).report()
+    assert report['total_logs'] == 0
+    assert report['anomaly_score'] == 0.0
+    assert DEFAULT_RULES.classify_text('', np.zeros(1, dtype=np.int64)).tolist() == []
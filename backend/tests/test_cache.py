@@ -0,0 +1,80 @@
+"""Window snapping and the report cache"""
+import asyncio
+
+import pytest
+
+from agents.sub_agents.log_analytics.cache import ReportCache, snap_window
+
+SECOND = 1_000_000_000
+
+
+def test_snap_window_keeps_duration_and_aligns_end():
+    start, end = snap_window(1000 * SECOND + 7, 1900 * SECOND + 7, 60)
+    assert end == 1860 * SECOND
+    assert end - start == 900 * SECOND
+
+
+def test_snap_window_same_bucket_same_window():
+    # 1000 s and 1019 s fall in the same 30 s bucket [990 s, 1020 s)
+    a = snap_window(100 * SECOND, 1000 * SECOND, 30)
+    b = snap_window(119 * SECOND, 1019 * SECOND, 30)
+    assert a == b == (90 * SECOND, 990 * SECOND)
+
+
+def test_hit_miss_and_single_flight():
+    async def scenario():
+        cache = ReportCache(ttl_seconds=60, max_entries=10)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'total_logs': len(calls)}
+
+        results = await asyncio.gather(*(cache.get_or_compute('k', compute) for _ in range(5)))
+        again = await cache.get_or_compute('k', compute)
+        return cache, calls, results, again
+
+    cache, calls, results, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{'total_logs': 1}] * 5 and again == {'total_logs': 1}
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (1, 5)
+
+
+def test_failures_are_not_cached():
+    async def scenario():
+        cache = ReportCache(ttl_seconds=60, max_entries=10)
+
+        async def fail():
+            raise RuntimeError('loki down')
+
+        async def succeed():
+            return {'ok': True}
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute('k', fail)
+        return await cache.get_or_compute('k', succeed)
+
+    assert asyncio.run(scenario()) == {'ok': True}
+
+
+def test_ttl_expiry_and_lru_bound():
+    async def scenario():
+        expired = ReportCache(ttl_seconds=0, max_entries=10)
+        counter = iter(range(100))
+
+        async def compute():
+            return next(counter)
+
+        first = await expired.get_or_compute('k', compute)
+        second = await expired.get_or_compute('k', compute)
+
+        bounded = ReportCache(ttl_seconds=60, max_entries=2)
+        for key in 'abc':
+            await bounded.get_or_compute(key, compute)
+        return first, second, bounded
+
+    first, second, bounded = asyncio.run(scenario())
+    assert first != second
+    assert bounded.stats()['entries'] == 2
+    assert 'a' not in bounded._entries
@@ -0,0 +1,58 @@
+"""Content-defined chunking of uploaded documents"""
+import random
+
+from utils_app.data_loader import split_text_into_chunks
+
+
+def document(seed: int, sentences: int = 400) -> str:
+    rnd = random.Random(seed)
+    words = ['log', 'service', 'error', 'latency', 'the', 'database', 'user', 'request', 'cache', 'retry']
+    paragraphs = []
+    for _ in range(sentences // 8):
+        paragraphs.append(' '.join(
+            ' '.join(rnd.choice(words) for _ in range(rnd.randint(4, 20))).capitalize() + '.'
+            for _ in range(8)
+        ))
+    return '\n\n'.join(paragraphs)
+
+
+def test_chunks_are_deterministic_and_bounded():
+    text = document(0)
+    chunks = split_text_into_chunks(text, chunk_size=1000, chunk_overlap=200)
+    assert chunks == split_text_into_chunks(text, chunk_size=1000, chunk_overlap=200)
+    assert len(chunks) > 5
+    assert all(chunk and len(chunk) <= 1500 + 200 for chunk in chunks)
+    # Every sentence of the document is in some chunk
+    for sentence in text.replace('\n\n', ' ').split('. '):
+        assert any(sentence.strip('. ') in chunk for chunk in chunks)
+
+
+def test_edit_only_changes_nearby_chunks():
+    text = document(1)
+    before = split_text_into_chunks(text)
+    middle = len(text) // 2
+    cut = text.index('. ', middle) + 2
+    edited = text[:cut] + 'An inserted sentence about a brand new failure mode. ' + text[cut:]
+    after = split_text_into_chunks(edited)
+
+    unchanged = set(before) & set(after)
+    assert len(before) - len(unchanged) <= 3
+    assert len(after) - len(unchanged) <= 3
+
+
+def test_prepending_text_keeps_later_chunks():
+    text = document(2)
+    before = split_text_into_chunks(text)
+    after = split_text_into_chunks('A new introduction sentence. Another one follows here.\n\n' + text)
+    assert len(set(before) - set(after)) <= 2
+
+
+def test_long_sentence_is_cut():
+    text = ' '.join(['word'] * 2000)
+    chunks = split_text_into_chunks(text, chunk_size=500, chunk_overlap=100)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 750 + 100 for chunk in chunks)
+
+
+def test_empty_text():
+    assert split_text_into_chunks('') == []
@@ -0,0 +1,33 @@
+"""Document endpoints when the knowledge base cannot be reached"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from documents.backend import router
+from utils_app import document_catalog, vector_store
+from utils_app.vector_store import KnowledgeBaseUnavailable
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise KnowledgeBaseUnavailable('The Pinecone knowledge base is unavailable')
+
+    monkeypatch.setattr(vector_store, 'index_document', unavailable)
+    monkeypatch.setattr(vector_store, 'delete_vectors_by_source', unavailable)
+    monkeypatch.setattr(document_catalog, 'get_document', lambda source: {'source': source, 'count': 1})
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_upload_answers_503(client):
+    response = client.post('/add_document', files={'file': ('notes.txt', b'restart the worker pool', 'text/plain')})
+    assert response.status_code == 503
+    assert 'unavailable' in response.json()['detail']
+
+
+def test_delete_answers_503(client):
+    response = client.delete('/delete_document/notes.txt')
+    assert response.status_code == 503
+    assert 'unavailable' in response.json()['detail']
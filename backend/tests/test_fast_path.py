@@ -0,0 +1,39 @@
+"""Which questions the fast path answers itself"""
+import pytest
+
+from core.config import config
+from agents.fast_path import _HANDLE_LINE, recognize
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(config.log_analysis, 'fast_path_enabled', True)
+    monkeypatch.setattr(config.loki, 'retention_seconds', 31 * 86400)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('Any errors in the last hour?', ('health', 'last 1 hours')),
+    ('anything wrong over the past 30 mins', ('health', 'last 30 minutes')),
+    ('how do I fix the errors from the last 2 days', ('solution', 'last 2 days')),
+    ('any issues?', ('health', config.log_analysis.fast_path_default_range)),
+    ('errors in the last 4 weeks', ('health', 'last 4 weeks')),
+])
+def test_recognized(query, expected):
+    assert recognize(query) == expected
+
+
+@pytest.mark.parametrize('query', [
+    'errors in the last 0 minutes',
+    'errors in the last 99999999999 weeks',
+    'errors in the last 32 days',
+    'errors in the last hour compared to the last day',
+    'errors on host web-1 in the last hour',
+    'what is the capital of france',
+])
+def test_sent_to_the_agent(query):
+    assert recognize(query) is None
+
+
+def test_handle_line_is_stripped():
+    report = "### Log Analytics Report\n- **Total Logs**: 10\n\nAnalysis handle: `logs-1a2b3c4d`"
+    assert _HANDLE_LINE.sub('', report) == "### Log Analytics Report\n- **Total Logs**: 10"
@@ -0,0 +1,92 @@
+"""The on-disk incident store, including recovery from interrupted writes"""
+import os
+
+import numpy as np
+
+from agents.sub_agents.solution.incidents import FEATURE_DIM, IncidentStore
+
+ANALYSIS = {
+    'error_patterns': {'authentication_failure': 40, 'other_errors': 3},
+    'top_templates': [{'template': 'sshd[<*>]: Failed password for <*>', 'count': 40}],
+    'top_error_sources': [['10.0.0.9', 40]],
+    'severity': 'HIGH',
+    'anomaly_score': 35.0,
+}
+OTHER = {
+    'error_patterns': {'database_error': 12},
+    'top_templates': [{'template': 'db: connection reset', 'count': 12}],
+    'top_error_sources': [],
+    'severity': 'MEDIUM',
+    'anomaly_score': 15.0,
+}
+
+
+def embed(texts):
+    # Bag of letters: deterministic and good enough to rank similar descriptions
+    vectors = np.zeros((len(texts), 26), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for char in text.lower():
+            if 'a' <= char <= 'z':
+                vectors[row, ord(char) - 97] += 1
+    return vectors
+
+
+def test_add_search_and_reload(tmp_path):
+    store = IncidentStore(str(tmp_path), embed)
+    assert store.add('ssh brute force', ANALYSIS, 'block the address', handle='logs-1') == 0
+    assert store.add('database outage', OTHER, handle='logs-2') == 1
+    assert store.add('again', ANALYSIS, handle='logs-1') is None
+
+    best = store.search('ssh brute force attempt', ANALYSIS)[0]
+    assert best['description'] == 'ssh brute force'
+    assert best['same_fingerprint'] is True
+    assert store.search('ssh', ANALYSIS, exclude_handle='logs-1')[0]['handle'] == 'logs-2'
+
+    reloaded = IncidentStore(str(tmp_path), embed)
+    assert len(reloaded) == 2
+    assert reloaded.search('database outage', OTHER)[0]['handle'] == 'logs-2'
+    assert reloaded.add('dup', OTHER, handle='logs-2') is None
+
+
+def test_torn_record_line_is_dropped(tmp_path):
+    store = IncidentStore(str(tmp_path), embed)
+    store.add('first', ANALYSIS, handle='a')
+    store.add('second', OTHER, handle='b')
+    records = os.path.join(tmp_path, 'incidents.jsonl')
+    with open(records, 'rb+') as f:
+        f.truncate(os.path.getsize(records) - 20)
+
+    recovered = IncidentStore(str(tmp_path), embed)
+    assert [r['handle'] for r in recovered.records] == ['a']
+    assert os.path.getsize(os.path.join(tmp_path, 'fingerprints.f32')) == FEATURE_DIM * 4
+    assert os.path.getsize(os.path.join(tmp_path, 'embeddings.f32')) == 26 * 4
+    # The store keeps working after recovery, and the rows line up again
+    assert recovered.add('third', OTHER, handle='c') == 1
+    assert IncidentStore(str(tmp_path), embed).search('third', OTHER)[0]['handle'] == 'c'
+
+
+def test_partial_matrix_row_is_dropped(tmp_path):
+    store = IncidentStore(str(tmp_path), embed)
+    store.add('first', ANALYSIS, handle='a')
+    store.add('second', OTHER, handle='b')
+    # Crash after the record and half an embedding row of a third insert were written
+    with open(os.path.join(tmp_path, 'embeddings.f32'), 'ab') as f:
+        f.write(b'\0' * 13 * 4)
+    fingerprints = os.path.join(tmp_path, 'fingerprints.f32')
+    with open(fingerprints, 'rb+') as f:
+        f.truncate(os.path.getsize(fingerprints) - FEATURE_DIM * 4)
+
+    recovered = IncidentStore(str(tmp_path), embed)
+    assert [r['handle'] for r in recovered.records] == ['a']
+    assert os.path.getsize(os.path.join(tmp_path, 'embeddings.f32')) == 26 * 4
+    assert len(open(os.path.join(tmp_path, 'incidents.jsonl')).readlines()) == 1
+
+
+def test_failing_embedder_falls_back_to_fingerprints(tmp_path):
+    def broken(texts):
+        raise RuntimeError('model unavailable')
+
+    store = IncidentStore(str(tmp_path), broken)
+    store.add('ssh', ANALYSIS, handle='a')
+    store.add('db', OTHER, handle='b')
+    assert store.search('anything', OTHER)[0]['handle'] == 'b'
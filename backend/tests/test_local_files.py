@@ -0,0 +1,93 @@
+"""Local file analysis: plain and gzip files, whole and windowed"""
+import gzip
+
+import pytest
+
+from core.config import config
+from agents.sub_agents.log_analytics import local_files
+from agents.sub_agents.log_analytics.analyzer import LogAnalyzer
+from agents.sub_agents.log_analytics.local_files import TimeIndex, _gzip_chunks, analyze_log_files
+from agents.sub_agents.log_analytics.parallel import shutdown_analysis_executor
+
+MESSAGES = ['sshd[1]: authentication failure rhost=10.0.0.{}', 'cron[2]: job {} ok', 'db: database error {}']
+LINES = [
+    f'2024-05-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d} ' + MESSAGES[i % 3].format(i % 50)
+    for i in range(0, 6 * 3600, 2)
+]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pool():
+    yield
+    shutdown_analysis_executor()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(config.log_analysis, 'local_chunk_bytes', 64 * 1024)
+    monkeypatch.setattr(config.log_analysis, 'local_index_stride_bytes', 4 * 1024)
+    monkeypatch.setattr(config.log_analysis, 'max_workers', 2)
+    local_files._index_cache.clear()
+
+
+def write(tmp_path, name, lines):
+    path = tmp_path / name
+    data = ('\n'.join(lines) + '\n').encode()
+    if name.endswith('.gz'):
+        with gzip.open(path, 'wb') as f:
+            f.write(data)
+    else:
+        path.write_bytes(data)
+    return str(path)
+
+
+def counts(report):
+    return report['total_logs'], report['error_patterns'], report['unique_ips']
+
+
+def expected(lines):
+    return counts(LogAnalyzer(mine_templates=False).update(lines).report())
+
+
+def test_gzip_chunks_are_newline_aligned(tmp_path):
+    path = write(tmp_path, 'a.log.gz', LINES)
+    chunks = list(_gzip_chunks(path, 10_000))
+    assert len(chunks) > 10
+    assert all(chunk.endswith(b'\n') for _, chunk in chunks)
+    assert [base for base, _ in chunks] == [0] + [sum(len(c) for _, c in chunks[:i + 1]) for i in range(len(chunks) - 1)]
+    assert b''.join(chunk for _, chunk in chunks).decode().splitlines() == LINES
+
+
+def test_gzip_index_matches_mapped_index(tmp_path):
+    plain = write(tmp_path, 'a.log', LINES)
+    gz = write(tmp_path, 'a.log.gz', LINES)
+    with open(plain, 'rb') as f:
+        data = f.read()
+    mapped = TimeIndex(data, 2024, 4096)
+    streamed = TimeIndex.from_chunks(_gzip_chunks(gz, 50_000), 2024, 4096)
+    assert streamed.last_timestamp == mapped.last_timestamp
+    assert len(streamed.offsets) >= len(mapped.offsets) - len(data) // 50_000 - 1
+
+
+@pytest.mark.parametrize('name', ['a.log', 'a.log.gz'])
+@pytest.mark.parametrize('duration', [None, 600, 4000, 1])
+def test_whole_and_windowed_analysis(tmp_path, small_chunks, name, duration):
+    path = write(tmp_path, name, LINES)
+    report = analyze_log_files([path], duration)
+    if duration is None:
+        assert counts(report) == expected(LINES)
+    else:
+        newest = int(LINES[-1][11:13]) * 3600 + int(LINES[-1][14:16]) * 60 + int(LINES[-1][17:19])
+        inside = [
+            line for line in LINES
+            if int(line[11:13]) * 3600 + int(line[14:16]) * 60 + int(line[17:19]) >= newest - duration
+        ]
+        assert counts(report) == expected(inside)
+
+
+def test_rotated_gzip_and_live_file_together(tmp_path, small_chunks):
+    old = write(tmp_path, 'syslog.1.gz', LINES[:len(LINES) // 2])
+    live = write(tmp_path, 'syslog', LINES[len(LINES) // 2:])
+    assert counts(analyze_log_files([old, live])) == expected(LINES)
+    # The window lies in the live file only, so the rotated file contributes nothing
+    assert counts(analyze_log_files([old, live], 60)) == expected(LINES[-31:])
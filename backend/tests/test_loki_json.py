@@ -0,0 +1,66 @@
+"""Incremental decoding of Loki query_range bodies"""
+import json
+
+import pytest
+
+from agents.sub_agents.log_analytics.batch import LogBatchBuilder
+from agents.sub_agents.log_analytics.loki_json import QueryRangeDecoder
+
+BODY = {
+    'status': 'success',
+    'data': {
+        'resultType': 'streams',
+        'result': [
+            {'stream': {'job': 'varlogs', 'hostname': 'a'}, 'values': [
+                ['1700000000000000001', 'sshd: failed login from 10.0.0.1'],
+                ['1700000000000000002', 'line with "quotes", \\backslash and unicode é ✓'],
+            ]},
+            {'values': [['1700000000000000003', 'values before labels']], 'stream': {'hostname': 'b'}},
+            {'stream': {'hostname': 'c'}, 'values': []},
+        ],
+        'stats': {'summary': {'bytesProcessedPerSecond': 123, 'nested': [1, {'x': None}]}},
+    },
+}
+
+
+def decode(body: bytes, chunk_size: int) -> tuple:
+    decoder = QueryRangeDecoder(LogBatchBuilder())
+    for i in range(0, len(body), chunk_size):
+        decoder.feed(body[i:i + chunk_size])
+    decoder.close()
+    return decoder, decoder.builder.build()
+
+
+def rows(batch):
+    return [(int(batch.timestamps[i]), batch.line(i), batch.labels(i)) for i in range(len(batch))]
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 1 << 20])
+def test_any_chunking_decodes_the_same(indent, chunk_size):
+    body = json.dumps(BODY, indent=indent, ensure_ascii=False).encode()
+    decoder, batch = decode(body, chunk_size)
+    assert decoder.status == 'success'
+    assert rows(batch) == [
+        (1700000000000000001, 'sshd: failed login from 10.0.0.1', {'job': 'varlogs', 'hostname': 'a'}),
+        (1700000000000000002, 'line with "quotes", \\backslash and unicode é ✓', {'job': 'varlogs', 'hostname': 'a'}),
+        (1700000000000000003, 'values before labels', {'hostname': 'b'}),
+    ]
+
+
+def test_error_status_is_reported():
+    decoder, batch = decode(json.dumps({'status': 'error', 'error': 'parse error'}).encode(), 5)
+    assert (decoder.status, decoder.error, len(batch)) == ('error', 'parse error', 0)
+
+
+def test_truncated_body_raises():
+    body = json.dumps(BODY).encode()
+    decoder = QueryRangeDecoder(LogBatchBuilder())
+    decoder.feed(body[:len(body) // 2])
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_malformed_body_raises():
+    with pytest.raises(ValueError):
+        decode(b'{"status": "success", "data": {"result": [{"values": [["1", "a"] "x"]}]}}', 4)
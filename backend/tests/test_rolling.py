@@ -0,0 +1,51 @@
+"""Rolling-window answers against a direct analysis of the same lines"""
+import asyncio
+
+import pytest
+
+from agents.sub_agents.log_analytics import rolling
+from agents.sub_agents.log_analytics.analyzer import LogAnalyzer
+from agents.sub_agents.log_analytics.batch import LogBatch
+from agents.sub_agents.log_analytics.rolling import RollingWindowStore
+
+SECOND = 1_000_000_000
+END = 1_700_000_000 * SECOND  # 20 s past a minute boundary, so windows start inside buckets
+LINES = [
+    (END - i * SECOND // 2, 'sshd: authentication failure' if i % 3 == 0 else 'cron: job ok')
+    for i in range(1, 2 * 3600)
+]
+
+
+async def fake_log_window(query, start_ns, end_ns, page_size, max_lines, **kwargs):
+    rows = sorted((ts, line) for ts, line in LINES if start_ns <= ts < end_ns)[:max_lines]
+    for i in range(0, len(rows), page_size):
+        yield LogBatch.from_entries({'timestamp': ts, 'line': line} for ts, line in rows[i:i + page_size])
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(rolling, 'iter_log_window', fake_log_window)
+    store = RollingWindowStore(bucket_seconds=60, retention_seconds=3600, lag_seconds=0, max_series=4)
+    asyncio.run(store._warm_up('{job="x"}', END))
+    assert '{job="x"}' in store._series
+    return store
+
+
+def direct(start_ns, end_ns):
+    lines = [line for ts, line in LINES if start_ns <= ts < end_ns]
+    return LogAnalyzer(mine_templates=False).update(lines).report()
+
+
+@pytest.mark.parametrize('seconds', [60, 600, 90, 45, 1, 3599])
+def test_window_counts_exactly_its_lines(store, seconds):
+    start = END - seconds * SECOND
+    report = asyncio.run(store.report('{job="x"}', start, END))
+    expected = direct(start, END)
+    assert report['total_logs'] == expected['total_logs']
+    assert report['error_patterns'] == expected['error_patterns']
+    assert report['anomaly_score'] == expected['anomaly_score']
+
+
+def test_window_beyond_coverage_is_not_answered(store):
+    assert asyncio.run(store.report('{job="x"}', END - 7200 * SECOND, END)) is None
+    assert asyncio.run(store.report('{job="other"}', END - 60 * SECOND, END)) is None
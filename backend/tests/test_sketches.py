@@ -0,0 +1,68 @@
+"""Distinct-count and heavy-hitter sketches"""
+import random
+from collections import Counter
+
+from agents.sub_agents.log_analytics.sketches import HeavyHitters, HyperLogLog, hash64
+
+
+def test_hash64_is_stable_and_independent_of_batch():
+    items = ['', 'a', '10.0.0.1', 'é', 'a' * 100]
+    together = hash64(items).tolist()
+    assert together == [hash64([item])[0] for item in items]
+    assert len(set(together)) == len(items)
+
+
+def test_hyperloglog_is_exact_below_limit():
+    hll = HyperLogLog(exact_limit=1000).update(f'10.0.{i // 256}.{i % 256}' for i in range(800))
+    hll.update(['10.0.0.1'] * 50)
+    assert hll.exact
+    assert hll.count() == 800
+    assert hll.relative_error == 0.0
+
+
+def test_hyperloglog_estimate_within_error():
+    n = 200_000
+    hll = HyperLogLog().update(str(i) for i in range(n))
+    assert not hll.exact
+    assert abs(hll.count() - n) / n < 4 * hll.relative_error
+
+
+def test_hyperloglog_merge_equals_union():
+    a = HyperLogLog().update(str(i) for i in range(0, 30_000))
+    b = HyperLogLog().update(str(i) for i in range(20_000, 50_000))
+    union = HyperLogLog().update(str(i) for i in range(50_000))
+    assert a.merge(b).count() == union.count()
+
+    exact = HyperLogLog().update(['x', 'y'])
+    assert exact.merge(HyperLogLog().update(['y', 'z'])).count() == 3
+    # An exact sketch merged into a register sketch is folded in, not lost
+    assert HyperLogLog().update(str(i) for i in range(5000)).merge(exact).count() >= 4900
+
+
+def test_heavy_hitters_exact_while_small():
+    hh = HeavyHitters(capacity=10).update({'a': 5, 'b': 3}).update({'a': 1, 'c': 9})
+    assert hh.top(2) == [('c', 9), ('a', 6)]
+    assert hh.error == 0
+
+
+def test_heavy_hitters_error_bound():
+    rnd = random.Random(0)
+    stream = ['hot1'] * 3000 + ['hot2'] * 2000 + [f'k{rnd.randrange(20_000)}' for _ in range(20_000)]
+    rnd.shuffle(stream)
+    truth = Counter(stream)
+    hh = HeavyHitters(capacity=32)
+    for start in range(0, len(stream), 1000):
+        hh.update(Counter(stream[start:start + 1000]))
+
+    assert hh.error <= len(stream) / 33
+    for key, estimate in hh.counts.items():
+        assert truth[key] - hh.error <= estimate <= truth[key]
+    assert [key for key, _ in hh.top(2)] == ['hot1', 'hot2']
+
+
+def test_heavy_hitters_merge():
+    a = HeavyHitters(capacity=4).update({f'a{i}': 1 for i in range(20)}).update({'x': 50})
+    b = HeavyHitters(capacity=4).update({f'b{i}': 1 for i in range(20)}).update({'x': 30})
+    merged = a.merge(b)
+    assert merged.top(1)[0][0] == 'x'
+    assert 80 - merged.error <= merged.counts['x'] <= 80
@@ -0,0 +1,60 @@
+"""Online template mining"""
+from agents.sub_agents.log_analytics.templates import WILDCARD, TemplateMiner
+
+
+def test_lines_differing_in_parameters_share_a_template():
+    miner = TemplateMiner()
+    for i in range(50):
+        miner.add(f'2024-05-01T10:00:{i:02d}Z sshd[{400 + i}]: Failed password for root from 10.0.0.{i} port {2000 + i}')
+    miner.add('kernel: link is down')
+
+    top = miner.top(5)
+    assert len(top) == 2
+    assert top[0]['count'] == 50
+    assert top[0]['template'] == f'sshd[{WILDCARD}]: Failed password for root from {WILDCARD} port {WILDCARD}'
+    assert len(top[0]['examples']) == 3
+    assert top[1] == {'template': 'kernel: link is down', 'count': 1, 'examples': ['kernel: link is down']}
+
+
+def test_differing_words_become_wildcards():
+    miner = TemplateMiner()
+    miner.add('user alice logged in')
+    miner.add('user bob logged in')
+    assert miner.top(1)[0]['template'] == f'user {WILDCARD} logged in'
+
+
+def test_dissimilar_lines_stay_apart():
+    miner = TemplateMiner()
+    miner.add('disk sda is full now')
+    miner.add('cron job started for backups')
+    assert len(miner) == 2
+
+
+def test_weighted_add_counts():
+    miner = TemplateMiner()
+    miner.add('error in worker 1', count=10)
+    miner.add('error in worker 2', count=5)
+    assert miner.top(1)[0]['count'] == 15
+
+
+def test_merge_matches_single_miner():
+    lines = [f'conn {i} timeout after {i * 3} ms' for i in range(40)] + [f'job {i} done' for i in range(20)]
+    single = TemplateMiner()
+    for line in lines:
+        single.add(line)
+    left, right = TemplateMiner(), TemplateMiner()
+    for line in lines[::2]:
+        left.add(line)
+    for line in lines[1::2]:
+        right.add(line)
+    merged = left.merge(right)
+    strip = lambda top: [(t['template'], t['count']) for t in top]
+    assert strip(merged.top(10)) == strip(single.top(10))
+
+
+def test_template_count_is_bounded():
+    miner = TemplateMiner(max_templates=20)
+    for i in range(500):
+        miner.add(f'event{chr(97 + i % 26)}{chr(97 + i // 26 % 26)} happened here now')
+    assert len(miner) <= 20
+    assert sum(len(leaf) for leaf in miner._leaves.values()) <= 20
@@ -0,0 +1,41 @@
+"""Source selection when building a log report"""
+import asyncio
+
+from core.config import config
+from agents.sub_agents.log_analytics import tools
+
+
+class BrokenRollingStore:
+    retention_ns = 3600 * 1_000_000_000
+
+    async def report(self, query, start_ns, end_ns):
+        raise RuntimeError('Loki query failed: too many outstanding requests')
+
+    def schedule_warm_up(self, query, end_ns):
+        raise AssertionError('not reached')
+
+
+def test_rolling_failure_falls_back_to_metric_queries(monkeypatch):
+    async def metrics(query, start_ns, end_ns):
+        return {'source': 'metrics'}
+
+    monkeypatch.setattr(config.log_analysis, 'rolling_enabled', True)
+    monkeypatch.setattr(config.loki, 'metric_queries', True)
+    monkeypatch.setattr(tools, 'get_rolling_store', BrokenRollingStore)
+    monkeypatch.setattr(tools, 'fetch_log_metrics', metrics)
+    assert asyncio.run(tools._build_report('{job="x"}', 0, 60_000_000_000)) == {'source': 'metrics'}
+
+
+def test_metric_failure_falls_back_to_raw_lines(monkeypatch):
+    async def metrics(query, start_ns, end_ns):
+        raise RuntimeError('metric queries unsupported')
+
+    async def raw(query, start_ns, end_ns):
+        return {'source': 'raw'}
+
+    monkeypatch.setattr(config.log_analysis, 'rolling_enabled', True)
+    monkeypatch.setattr(config.loki, 'metric_queries', True)
+    monkeypatch.setattr(tools, 'get_rolling_store', BrokenRollingStore)
+    monkeypatch.setattr(tools, 'fetch_log_metrics', metrics)
+    monkeypatch.setattr(tools, '_analyze_raw_window', raw)
+    assert asyncio.run(tools._build_report('{job="x"}', 0, 60_000_000_000)) == {'source': 'raw'}
@@ -0,0 +1,112 @@
+"""Knowledge base connection and document indexing"""
+import numpy as np
+import pytest
+
+from database.core import Base, engine
+from tables.documents import Document, DocumentChunk  # registers the catalog tables
+from utils_app import document_catalog, vector_index, vector_store
+from utils_app.vector_store import (
+    KnowledgeBaseUnavailable, chunk_ids_for, delete_vectors_by_source, get_index, index_document,
+    init_knowledge_base, list_vectors_by_source, query_vectors,
+)
+
+
+@pytest.fixture
+def no_index(monkeypatch):
+    monkeypatch.setattr(vector_store, 'index', None)
+
+
+def test_pinecone_connects_on_first_use(no_index, monkeypatch):
+    calls = []
+
+    def connect():
+        calls.append(1)
+        vector_store.index = 'pinecone-index'
+
+    monkeypatch.setattr(vector_store, 'init_pinecone', connect)
+    assert get_index() == 'pinecone-index'
+    assert get_index() == 'pinecone-index'
+    assert len(calls) == 1
+
+
+def test_unreachable_pinecone_is_reported_clearly(no_index, monkeypatch):
+    monkeypatch.delenv('PINECONE_API_KEY', raising=False)
+    monkeypatch.setattr(vector_store.config.knowledge_base, 'backend', 'pinecone')
+    with pytest.raises(KnowledgeBaseUnavailable, match='PINECONE_API_KEY'):
+        init_knowledge_base()
+    monkeypatch.setattr(vector_store.config.knowledge_base, 'backend', 'local')
+    assert init_knowledge_base() == 'local'
+    monkeypatch.setattr(vector_store.config.knowledge_base, 'backend', 'pinecon')
+    with pytest.raises(KnowledgeBaseUnavailable, match='Unknown'):
+        init_knowledge_base()
+
+
+def embed(texts):
+    # Bag of letters: deterministic, and no model to load
+    vectors = np.zeros((len(texts), 26), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for char in text.lower():
+            if 'a' <= char <= 'z':
+                vectors[row, ord(char) - 97] += 1
+    return vectors
+
+
+class Encoder:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            return embed([texts])[0]
+        self.encoded.extend(texts)
+        return embed(texts)
+
+
+@pytest.fixture
+def local_kb(tmp_path, monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(vector_store.config.knowledge_base, 'backend', 'local')
+    monkeypatch.setattr(vector_store.config.knowledge_base, 'index_path', str(tmp_path / 'kb'))
+    monkeypatch.setattr(vector_index, '_local_vector_store', None)
+    encoder = Encoder()
+    monkeypatch.setattr(vector_store, 'embeddings_model', encoder)
+    yield encoder
+    for source in ('runbook.txt', 'other.txt'):
+        if document_catalog.get_document(source) is not None:
+            delete_vectors_by_source(source)
+
+
+def test_reindexing_touches_only_what_changed(local_kb):
+    chunks = ['restart the worker pool', 'rotate the database credentials', 'page the on call engineer']
+    first = index_document('runbook.txt', chunks, {'source': 'runbook.txt'}, content_hash='v1')
+    assert first == {'added': 3, 'removed': 0, 'unchanged': 0, 'skipped': False}
+    assert query_vectors('database credentials', top_k=1)[0]['text'] == 'rotate the database credentials'
+
+    # The same file again is skipped without embedding anything
+    local_kb.encoded.clear()
+    again = index_document('runbook.txt', chunks, {'source': 'runbook.txt'}, content_hash='v1')
+    assert again == {'added': 0, 'removed': 0, 'unchanged': 3, 'skipped': True}
+    assert local_kb.encoded == []
+
+    # An edit embeds only the new chunk and drops the one it replaced
+    edited = chunks[:2] + ['escalate to the platform team']
+    result = index_document('runbook.txt', edited, {'source': 'runbook.txt'}, content_hash='v2')
+    assert result == {'added': 1, 'removed': 1, 'unchanged': 2, 'skipped': False}
+    assert local_kb.encoded == ['escalate to the platform team']
+    assert sorted(v['text'] for v in list_vectors_by_source('runbook.txt')) == sorted(edited)
+    assert sorted(document_catalog.chunk_ids('runbook.txt')) == sorted(chunk_ids_for('runbook.txt', edited))
+
+    index_document('other.txt', ['unrelated notes'], {'source': 'other.txt'}, content_hash='x')
+    assert delete_vectors_by_source('runbook.txt') == 3
+    assert document_catalog.get_document('runbook.txt') is None
+    assert [hit['text'] for hit in query_vectors('database credentials', top_k=5)] == ['unrelated notes']
+
+
+def test_unreachable_pinecone_fails_before_embedding(no_index, monkeypatch):
+    monkeypatch.delenv('PINECONE_API_KEY', raising=False)
+    monkeypatch.setattr(vector_store.config.knowledge_base, 'backend', 'pinecone')
+    encoder = Encoder()
+    monkeypatch.setattr(vector_store, 'embeddings_model', encoder)
+    with pytest.raises(KnowledgeBaseUnavailable):
+        index_document('runbook.txt', ['restart the worker pool'], {'source': 'runbook.txt'}, content_hash='v1')
+    assert encoder.encoded == []